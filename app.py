@@ -1,14 +1,20 @@
 import streamlit as st
 
+from database.read_routing import restore_primary_reads
 from ui_components.navigation import load_user_settings
+from utils.config import PROMPT_CATALOG_WARMUP
 from utils.env_loader import load_environment_variables
 from utils.error_handlers import handle_error
+from utils.prompt_manager import warm_up_prompt_catalog
 from views.main_page import main_page_app
 from views.statistics_page import usage_statistics_ui
 from views.prompt_management_page import prompt_management_ui
 
 load_environment_variables()
 
+if PROMPT_CATALOG_WARMUP:
+    warm_up_prompt_catalog()
+
 st.set_page_config(
     page_title="退院時サマリ作成アプリ",
     page_icon="📋",
@@ -36,10 +42,16 @@ if "available_models" not in st.session_state:
     st.session_state.available_models = []
 if "summary_generation_time" not in st.session_state:
     st.session_state.summary_generation_time = None
+if "input_reduction" not in st.session_state:
+    st.session_state.input_reduction = None
+if "dropped_entries" not in st.session_state:
+    st.session_state.dropped_entries = []
 
 
 @handle_error
 def main():
+    restore_primary_reads(st.session_state.get("primary_reads_until", 0.0))
+
     if st.session_state.current_page == "prompt_edit":
         prompt_management_ui()
         return
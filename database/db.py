@@ -1,24 +1,90 @@
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import NullPool, StaticPool
 
-from database.models import Base
+from database.migrations import check_schema_version, migrate
+from database.pool_metrics import MeteredQueuePool
 from database.repositories import PromptRepository, UsageStatisticsRepository, SettingsRepository
 from utils.config import (
     POSTGRES_HOST, POSTGRES_PORT, POSTGRES_USER,
     POSTGRES_PASSWORD, POSTGRES_DB, POSTGRES_SSL,
-    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_PGBOUNCER_MODE
 )
 from utils.exceptions import DatabaseError
 
 
+def is_sqlite_url(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _engine_options(connection_string: str) -> dict:
+    if is_sqlite_url(connection_string):
+        options = {"connect_args": {"check_same_thread": False}}
+        # インメモリのデータベースは接続ごとに別のデータベースになるため、1つの接続を共有する
+        if connection_string in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in connection_string:
+            options["poolclass"] = StaticPool
+        return options
+
+    if DB_PGBOUNCER_MODE:
+        # PgBouncerのトランザクションプーリングでは接続の管理をPgBouncerに任せ、アプリ側ではプールしない
+        options = {"poolclass": NullPool}
+        # psycopg2はサーバー側のプリペアドステートメントを使用しないが、psycopg（v3）では自動準備を無効にする
+        if connection_string.startswith("postgresql+psycopg:"):
+            options["connect_args"] = {"prepare_threshold": None}
+        return options
+
+    return {
+        "poolclass": MeteredQueuePool,
+        "pool_pre_ping": True,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+def enable_sqlite_savepoints(engine) -> None:
+    # pysqlite は SAVEPOINT の前に BEGIN を発行しないため、トランザクションの開始をSQLAlchemy側で行う
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    def begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    event.listen(engine, "connect", disable_driver_transactions)
+    event.listen(engine, "begin", begin)
+
+
+def _normalize_database_url(database_url: str) -> str:
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+    if not is_sqlite_url(database_url):
+        if "?" in database_url:
+            database_url += "&sslmode=require"
+        else:
+            database_url += "?sslmode=require"
+
+    return database_url
+
+
+def _pool_metrics(engine) -> dict:
+    pool = engine.pool
+    metrics = {"pool_class": type(pool).__name__}
+    if isinstance(pool, MeteredQueuePool):
+        metrics.update(pool.metrics.snapshot(pool))
+    return metrics
+
+
 class DatabaseManager:
     _instance = None
     _engine = None
     _session_factory = None
     _scoped_session = None
+    _read_engine = None
+    _read_session_factory = None
 
     def __init__(self):
         if DatabaseManager._engine is not None:
@@ -28,16 +94,7 @@ class DatabaseManager:
 
         if database_url:
             try:
-                if database_url.startswith("postgres://"):
-                    database_url = database_url.replace("postgres://", "postgresql://", 1)
-
-                if "?" in database_url:
-                    database_url += "&sslmode=require"
-                else:
-                    database_url += "?sslmode=require"
-
-                connection_string = database_url
-
+                connection_string = _normalize_database_url(database_url)
             except Exception as e:
                 raise DatabaseError(f"DATABASE_URLの解析に失敗しました: {str(e)}")
         else:
@@ -50,23 +107,35 @@ class DatabaseManager:
             if POSTGRES_SSL:
                 connection_string += f"?sslmode={POSTGRES_SSL}"
 
+        backend = "SQLite" if is_sqlite_url(connection_string) else "PostgreSQL"
         try:
-            DatabaseManager._engine = create_engine(
-                connection_string,
-                poolclass=QueuePool,
-                pool_pre_ping=True,
-                pool_size=DB_POOL_SIZE,
-                max_overflow=DB_MAX_OVERFLOW,
-                pool_timeout=DB_POOL_TIMEOUT,
-                pool_recycle=DB_POOL_RECYCLE
-            )
+            DatabaseManager._engine = create_engine(connection_string, **_engine_options(connection_string))
+            if backend == "SQLite":
+                enable_sqlite_savepoints(DatabaseManager._engine)
 
             DatabaseManager._session_factory = sessionmaker(bind=DatabaseManager._engine)
             DatabaseManager._scoped_session = scoped_session(DatabaseManager._session_factory)
-            Base.metadata.create_all(DatabaseManager._engine)
+            if backend == "SQLite":
+                # SQLiteはローカル実行・ベンチマーク用のため、起動時にスキーマを作成する
+                migrate(DatabaseManager._engine, DatabaseManager._session_factory)
+            else:
+                check_schema_version(DatabaseManager._engine)
 
         except Exception as e:
-            raise DatabaseError(f"PostgreSQLへの接続に失敗しました: {str(e)}")
+            raise DatabaseError(f"{backend}への接続に失敗しました: {str(e)}")
+
+        replica_url = os.environ.get("DATABASE_REPLICA_URL")
+        if replica_url:
+            # 統計の集計とプロンプトの参照は読み取り用レプリカで行い、書き込みはプライマリで行う
+            try:
+                replica_connection_string = _normalize_database_url(replica_url)
+                DatabaseManager._read_engine = create_engine(
+                    replica_connection_string, **_engine_options(replica_connection_string))
+                if is_sqlite_url(replica_connection_string):
+                    enable_sqlite_savepoints(DatabaseManager._read_engine)
+                DatabaseManager._read_session_factory = sessionmaker(bind=DatabaseManager._read_engine)
+            except Exception as e:
+                raise DatabaseError(f"読み取り用レプリカへの接続に失敗しました: {str(e)}")
 
     @classmethod
     def get_instance(cls):
@@ -86,11 +155,29 @@ class DatabaseManager:
     def get_scoped_session():
         return DatabaseManager._scoped_session
 
+    @staticmethod
+    def get_read_engine():
+        return DatabaseManager._read_engine
+
+    @staticmethod
+    def get_read_session_factory():
+        return DatabaseManager._read_session_factory
+
+    @staticmethod
+    def get_pool_metrics() -> dict:
+        if DatabaseManager._engine is None:
+            return {}
+
+        metrics = _pool_metrics(DatabaseManager._engine)
+        if DatabaseManager._read_engine is not None:
+            metrics["replica"] = _pool_metrics(DatabaseManager._read_engine)
+        return metrics
+
     def get_prompt_repository(self) -> PromptRepository:
-        return PromptRepository(self.get_session_factory())
+        return PromptRepository(self.get_session_factory(), self.get_read_session_factory())
 
     def get_usage_statistics_repository(self) -> UsageStatisticsRepository:
-        return UsageStatisticsRepository(self.get_session_factory())
+        return UsageStatisticsRepository(self.get_session_factory(), self.get_read_session_factory())
 
     def get_settings_repository(self) -> SettingsRepository:
         return SettingsRepository(self.get_session_factory())
@@ -106,3 +193,7 @@ def get_usage_statistics_repository() -> UsageStatisticsRepository:
 
 def get_settings_repository() -> SettingsRepository:
     return DatabaseManager.get_instance().get_settings_repository()
+
+
+def get_pool_metrics() -> dict:
+    return DatabaseManager.get_instance().get_pool_metrics()
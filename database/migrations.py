@@ -0,0 +1,143 @@
+from typing import Callable, List, Tuple
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, SchemaVersion, UsageRollupCoverage
+from database.partitioning import ensure_partitions
+from database.repositories import UsageStatisticsRepository
+from utils.exceptions import DatabaseError
+
+# 複数のプロセスが同時にマイグレーションを実行しないよう、PostgreSQLのアドバイザリロックで排他する
+MIGRATION_LOCK_ID = 20250915
+
+# create_all は既存テーブルへカラムを追加しないため、後から追加したカラムをここで補完する
+ADDED_COLUMNS = {
+    'prompts': [
+        ('generation_profile', 'VARCHAR(50)'),
+    ],
+    'summary_usage': [
+        ('input_chars_saved', 'INTEGER'),
+        ('input_tokens_saved', 'INTEGER'),
+        ('continuation_count', 'INTEGER'),
+        ('request_id', 'VARCHAR(36)'),
+        ('model_family', 'VARCHAR(50)'),
+    ],
+}
+
+
+def _create_tables(engine, session_factory: sessionmaker) -> None:
+    Base.metadata.create_all(engine)
+
+
+def _add_missing_columns(engine, session_factory: sessionmaker) -> None:
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table_name, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table_name)}
+            for column_name, column_type in columns:
+                if column_name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+
+
+def _create_missing_indexes(engine, session_factory: sessionmaker) -> None:
+    # create_all は既存テーブルへインデックスを追加しないため、モデルに定義したインデックスを補完する
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def _backfill_model_family(engine, session_factory: sessionmaker) -> None:
+    UsageStatisticsRepository(session_factory).backfill_model_family()
+
+
+def _initialize_daily_rollups(engine, session_factory: sessionmaker) -> None:
+    # 既存の使用統計から日次集計を作成し、集計済みの範囲を記録する
+    # （USAGE_ROLLUPが無効でも作成しておき、後から有効にしたときに空の集計を参照しないようにする）
+    UsageRollupCoverage.__table__.create(engine, checkfirst=True)
+    repository = UsageStatisticsRepository(session_factory)
+    if repository.get_rollup_coverage() is None:
+        repository.rebuild_daily_rollups()
+
+
+# 適用済みのマイグレーションは変更せず、スキーマを変更する場合は末尾に追加する
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "テーブルの作成", _create_tables),
+    (2, "後から追加したカラムの補完", _add_missing_columns),
+    (3, "絞り込み用インデックスの補完", _create_missing_indexes),
+    (4, "model_familyの補完", _backfill_model_family),
+    (5, "日次集計の作成と集計済みの範囲の記録", _initialize_daily_rollups),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(engine) -> int:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(SchemaVersion.__tablename__):
+            return 0
+        return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def check_schema_version(engine) -> bool:
+    # 起動時はバージョンの確認のみ行い、DDLはマイグレーションコマンドから実行する
+    try:
+        version = get_schema_version(engine)
+    except Exception as e:
+        print(f"スキーマバージョンの確認に失敗しました: {str(e)}")
+        return False
+
+    if version < LATEST_SCHEMA_VERSION:
+        print(f"データベースのスキーマが最新ではありません（現在: {version}、最新: {LATEST_SCHEMA_VERSION}）。"
+              f"python scripts/migrate.py を実行してください")
+        return False
+    return True
+
+
+def _ensure_usage_partitions(engine) -> None:
+    if engine.dialect.name != 'postgresql':
+        return
+    try:
+        ensure_partitions(engine)
+    except Exception as e:
+        raise DatabaseError(f"使用統計のパーティションの作成に失敗しました: {str(e)}")
+
+
+def migrate(engine, session_factory: sessionmaker) -> List[int]:
+    applied = []
+    with engine.connect() as lock_conn:
+        use_lock = engine.dialect.name == 'postgresql'
+        if use_lock:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            lock_conn.commit()
+        try:
+            SchemaVersion.__table__.create(engine, checkfirst=True)
+            # ロックの取得待ちの間に他のプロセスが適用した分は、取得後のバージョンで除外される
+            version = get_schema_version(engine)
+
+            for migration_version, description, upgrade in MIGRATIONS:
+                if migration_version <= version:
+                    continue
+                try:
+                    upgrade(engine, session_factory)
+                except Exception as e:
+                    raise DatabaseError(
+                        f"マイグレーション{migration_version}（{description}）に失敗しました: {str(e)}"
+                    )
+                with session_factory() as session:
+                    session.add(SchemaVersion(version=migration_version, description=description))
+                    session.commit()
+                applied.append(migration_version)
+
+            _ensure_usage_partitions(engine)
+        finally:
+            if use_lock:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                lock_conn.commit()
+
+    return applied
@@ -1,4 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, UniqueConstraint
+import re
+
+from sqlalchemy import (
+    BigInteger, Column, Date, Integer, String, Text, Boolean, DateTime, Index, PrimaryKeyConstraint, UniqueConstraint
+)
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import relationship, object_session
 from sqlalchemy.sql import func
@@ -6,6 +11,23 @@ from sqlalchemy.sql import func
 Base = declarative_base()
 
 
+@compiles(PrimaryKeyConstraint, 'postgresql')
+def _compile_partitioned_primary_key(constraint, compiler, **kw):
+    # パーティションテーブルの主キーはパーティションキーを含む必要があるため、DDLでのみ追加する
+    # （SQLiteなどでは id のみを主キーとし、ORMの識別子も id のままとする）
+    ddl = compiler.visit_primary_key_constraint(constraint, **kw)
+    partition_by = constraint.table.dialect_options['postgresql']['partition_by']
+    if not ddl or not partition_by:
+        return ddl
+
+    primary_columns = {column.name for column in constraint.columns}
+    partition_columns = [name.strip() for name in re.search(r'\((.*)\)', partition_by).group(1).split(',')]
+    extra = [name for name in partition_columns if name not in primary_columns]
+    if not extra:
+        return ddl
+    return ddl[:-1] + ", " + ", ".join(extra) + ")"
+
+
 class AppSetting(Base):
     __tablename__ = 'app_settings'
 
@@ -32,6 +54,7 @@ class Prompt(Base):
     doctor = Column(String(100), nullable=False)
     content = Column(Text, nullable=False)
     selected_model = Column(String(50))
+    generation_profile = Column(String(50))
     is_default = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), default=func.now())
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
@@ -53,8 +76,9 @@ class Prompt(Base):
 class SummaryUsage(Base):
     __tablename__ = 'summary_usage'
 
+    # PostgreSQLでは作成日時の月単位でパーティションに分割し、主キーに作成日時を加えて作成する
     id = Column(Integer, primary_key=True)
-    date = Column(DateTime(timezone=True), default=func.now())
+    date = Column(DateTime(timezone=True), nullable=False, default=func.now())
     app_type = Column(String(50))
     document_types = Column(String(100))
     model_detail = Column(String(100))
@@ -64,6 +88,21 @@ class SummaryUsage(Base):
     output_tokens = Column(Integer)
     total_tokens = Column(Integer)
     processing_time = Column(Integer)
+    input_chars_saved = Column(Integer)
+    input_tokens_saved = Column(Integer)
+    continuation_count = Column(Integer)
+    request_id = Column(String(36))
+    model_family = Column(String(50))
+
+    __table_args__ = (
+        Index('ix_summary_usage_request_id_date', 'request_id', 'date', unique=True),
+        # 統計画面の絞り込み（期間＋モデル・文書名）に合わせた複合インデックス
+        Index('ix_summary_usage_family_date', 'model_family', 'date'),
+        Index('ix_summary_usage_document_family_date', 'document_types', 'model_family', 'date'),
+        # 作成日時順に追記されるため、期間のみの絞り込みは小さなBRINで済ませる
+        Index('ix_summary_usage_date_brin', 'date', postgresql_using='brin'),
+        {'postgresql_partition_by': 'RANGE (date)'},
+    )
 
     @property
     def related_prompt(self):
@@ -75,3 +114,47 @@ class SummaryUsage(Base):
                 Prompt.doctor == self.doctor
             ).first()
         return None
+
+
+class UsageDailyRollup(Base):
+    __tablename__ = 'summary_usage_daily'
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    department = Column(String(100), nullable=False)
+    doctor = Column(String(100), nullable=False)
+    document_types = Column(String(100), nullable=False)
+    model_family = Column(String(50), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    processing_time = Column(BigInteger, nullable=False, default=0)
+    processing_time_le_10 = Column(Integer, nullable=False, default=0)
+    processing_time_le_30 = Column(Integer, nullable=False, default=0)
+    processing_time_le_60 = Column(Integer, nullable=False, default=0)
+    processing_time_le_120 = Column(Integer, nullable=False, default=0)
+    processing_time_gt_120 = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('day', 'department', 'doctor', 'document_types', 'model_family',
+                         name='unique_usage_daily'),
+    )
+
+
+class UsageRollupCoverage(Base):
+    # 日次集計に漏れなく反映されている最初の日（この日以降のみ日次集計から読み込む）
+    __tablename__ = 'summary_usage_daily_coverage'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    covered_from = Column(Date, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+
+class SchemaVersion(Base):
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(200), nullable=False)
+    applied_at = Column(DateTime(timezone=True), default=func.now())
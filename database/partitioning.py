@@ -0,0 +1,201 @@
+import datetime
+import gzip
+import os
+import re
+from typing import List, Optional, Tuple
+
+import pytz
+from sqlalchemy import text
+
+from database.models import SummaryUsage
+from utils.config import USAGE_ARCHIVE_DIR, USAGE_PARTITION_MONTHS_AHEAD, USAGE_RETENTION_MONTHS
+from utils.exceptions import DatabaseError
+
+JST = pytz.timezone('Asia/Tokyo')
+PARENT_TABLE = SummaryUsage.__tablename__
+LEGACY_TABLE = f"{PARENT_TABLE}_legacy"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+PARTITION_PATTERN = re.compile(rf'^{PARENT_TABLE}_p(?P<year>\d{{4}})(?P<month>\d{{2}})$')
+# パーティション化前に作成していた、パーティションキーを含まない一意インデックス
+LEGACY_INDEXES = ['ix_summary_usage_request_id']
+
+
+def month_start(value: datetime.date) -> datetime.date:
+    return value.replace(day=1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[datetime.date]:
+    match = PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    return datetime.date(int(match.group('year')), int(match.group('month')), 1)
+
+
+def partition_bounds(month: datetime.date) -> Tuple[str, str]:
+    # 作成日時はJSTで記録しているため、月の境界もJSTの0時とする
+    start = JST.localize(datetime.datetime.combine(month, datetime.time.min))
+    end = JST.localize(datetime.datetime.combine(add_months(month, 1), datetime.time.min))
+    return start.isoformat(), end.isoformat()
+
+
+def months_between(first: datetime.date, last: datetime.date) -> List[datetime.date]:
+    months = []
+    month = month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def expired_partitions(partition_names: List[str], retention_months: int,
+                       today: Optional[datetime.date] = None) -> List[str]:
+    if retention_months <= 0:
+        return []
+
+    today = today or datetime.datetime.now(JST).date()
+    cutoff = add_months(month_start(today), -retention_months)
+    return sorted(name for name in partition_names
+                  if partition_month(name) is not None and partition_month(name) < cutoff)
+
+
+def is_partitioned(conn) -> bool:
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name)"
+    ), {"name": PARENT_TABLE}).scalar())
+
+
+def list_partitions(conn) -> List[str]:
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :name ORDER BY child.relname"
+    ), {"name": PARENT_TABLE})
+    return [row[0] for row in rows]
+
+
+def create_month_partition(conn, month: datetime.date) -> bool:
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar():
+        return False
+
+    start, end = partition_bounds(month)
+    bounds = f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    has_default = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}).scalar()
+    in_default = has_default and conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end)"
+    ), {"start": start, "end": end}).scalar()
+
+    if not in_default:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+        return True
+
+    # 既定パーティションに入った行があると同じ範囲のパーティションを追加できないため、移してから接続する
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end"
+    ), {"start": start, "end": end})
+    conn.execute(text(
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end"
+    ), {"start": start, "end": end})
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}"))
+    return True
+
+
+def ensure_partitions(engine, months_ahead: int = USAGE_PARTITION_MONTHS_AHEAD,
+                      first_month: Optional[datetime.date] = None) -> List[str]:
+    today = datetime.datetime.now(JST).date()
+    months = months_between(first_month or today, add_months(month_start(today), months_ahead))
+
+    created = []
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return created
+        for month in months:
+            if create_month_partition(conn, month):
+                created.append(partition_name(month))
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+    return created
+
+
+def convert_to_partitioned(engine, months_ahead: int = USAGE_PARTITION_MONTHS_AHEAD) -> int:
+    columns = [column.name for column in SummaryUsage.__table__.columns]
+    select_columns = ["COALESCE(date, now())" if column == "date" else column for column in columns]
+    try:
+        with engine.begin() as conn:
+            if is_partitioned(conn):
+                return 0
+
+            conn.execute(text(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE"))
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_TABLE}"))
+            conn.execute(text(f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT {PARENT_TABLE}_pkey TO {LEGACY_TABLE}_pkey"))
+            conn.execute(text(f"ALTER SEQUENCE IF EXISTS {PARENT_TABLE}_id_seq RENAME TO {LEGACY_TABLE}_id_seq"))
+            # 新しいテーブルで同名のインデックスを作成するため、移行元のインデックスは先に削除する
+            for index_name in [index.name for index in SummaryUsage.__table__.indexes] + LEGACY_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+            SummaryUsage.__table__.create(conn)
+
+            first_date = conn.execute(text(f"SELECT MIN(date) FROM {LEGACY_TABLE}")).scalar()
+            today = datetime.datetime.now(JST).date()
+            first_month = first_date.astimezone(JST).date() if first_date else today
+            for month in months_between(first_month, add_months(month_start(today), months_ahead)):
+                create_month_partition(conn, month)
+            conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+            moved = conn.execute(text(
+                f"INSERT INTO {PARENT_TABLE} ({', '.join(columns)}) "
+                f"SELECT {', '.join(select_columns)} FROM {LEGACY_TABLE}"
+            )).rowcount
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{PARENT_TABLE}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {PARENT_TABLE}), 0) + 1, false)"
+            ))
+            conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+            return moved
+
+    except Exception as e:
+        raise DatabaseError(f"使用統計テーブルのパーティション化に失敗しました: {str(e)}")
+
+
+def archive_partition(conn, name: str, archive_dir: str) -> str:
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH CSV HEADER", f)
+    finally:
+        cursor.close()
+    return path
+
+
+def apply_retention(engine, retention_months: int = USAGE_RETENTION_MONTHS,
+                    archive_dir: str = USAGE_ARCHIVE_DIR) -> List[str]:
+    # 切り離したパーティションは、保存先の指定があればCSVへ書き出して削除し、なければ別名で残す
+    archived = []
+    try:
+        with engine.begin() as conn:
+            for name in expired_partitions(list_partitions(conn), retention_months):
+                conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+                if archive_dir:
+                    os.makedirs(archive_dir, exist_ok=True)
+                    archived.append(archive_partition(conn, name, archive_dir))
+                    conn.execute(text(f"DROP TABLE {name}"))
+                else:
+                    archive_name = name.replace(f"{PARENT_TABLE}_p", f"{PARENT_TABLE}_archive_p", 1)
+                    conn.execute(text(f"ALTER TABLE {name} RENAME TO {archive_name}"))
+                    archived.append(archive_name)
+        return archived
+
+    except Exception as e:
+        raise DatabaseError(f"使用統計の古いパーティションの切り離しに失敗しました: {str(e)}")
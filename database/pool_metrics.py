@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool, QueuePool
+
+# 接続取得の待ち時間（ミリ秒）の集計区間
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+def wait_bucket(wait_ms: float) -> str:
+    for bound in WAIT_BUCKETS_MS:
+        if wait_ms <= bound:
+            return f"{bound}ms"
+    return "+Inf"
+
+
+class PoolMetrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.pre_ping_failures = 0
+        self.invalidations = 0
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_histogram = {bucket: 0 for bucket in [f"{bound}ms" for bound in WAIT_BUCKETS_MS] + ["+Inf"]}
+
+    def listen(self, pool: Pool) -> None:
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def record_wait(self, wait_seconds: float) -> None:
+        wait_ms = wait_seconds * 1000
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            self.wait_histogram[wait_bucket(wait_ms)] += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+            # pre-pingで切断を検知した接続は DisconnectionError で無効化される
+            if isinstance(exception, exc.DisconnectionError):
+                self.pre_ping_failures += 1
+
+    def snapshot(self, pool: Optional[Pool] = None) -> Dict[str, Any]:
+        with self._lock:
+            result = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "pre_ping_failures": self.pre_ping_failures,
+                "invalidations": self.invalidations,
+                "wait_count": self.wait_count,
+                "wait_avg_ms": round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "wait_histogram": dict(self.wait_histogram),
+            }
+
+        if isinstance(pool, QueuePool):
+            result.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                # overflow() は作成済みの接続がプールサイズに満たない間は負の値になる
+                "overflow": max(pool.overflow(), 0),
+            })
+        return result
+
+
+class MeteredQueuePool(QueuePool):
+
+    def __init__(self, creator, **kw):
+        super().__init__(creator, **kw)
+        self.metrics = PoolMetrics()
+        if kw.get("_dispatch") is None:
+            # dispose で作り直したプールはイベントを引き継ぐため、最初のプールでのみ登録する
+            self.metrics.listen(self)
+
+    def recreate(self) -> "MeteredQueuePool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started)
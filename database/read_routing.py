@@ -0,0 +1,26 @@
+import time
+from contextvars import ContextVar
+
+from utils.config import DB_READ_AFTER_WRITE_SECONDS
+
+# この時刻（time.monotonic）までは、読み取り用レプリカではなくプライマリから読み取る
+_primary_reads_until: ContextVar[float] = ContextVar("primary_reads_until", default=0.0)
+
+
+def mark_primary_reads(seconds: float = DB_READ_AFTER_WRITE_SECONDS) -> float:
+    deadline = time.monotonic() + seconds
+    _primary_reads_until.set(max(deadline, _primary_reads_until.get()))
+    return _primary_reads_until.get()
+
+
+def primary_reads_deadline() -> float:
+    return _primary_reads_until.get()
+
+
+def restore_primary_reads(deadline: float) -> None:
+    # Streamlitの再実行をまたいで、書き込んだセッションの読み取り先を引き継ぐ
+    _primary_reads_until.set(deadline or 0.0)
+
+
+def reads_from_primary() -> bool:
+    return time.monotonic() < _primary_reads_until.get()
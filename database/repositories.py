@@ -1,47 +1,209 @@
 import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
 
-from sqlalchemy import func, desc
+import pytz
+from sqlalchemy import bindparam, case, delete, func, desc, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
 
-from database.models import AppSetting, Prompt, SummaryUsage
+from database.models import AppSetting, Prompt, SummaryUsage, UsageDailyRollup, UsageRollupCoverage
+from database.read_routing import mark_primary_reads, reads_from_primary
+from database.rows import PROMPT_ROW_COLUMNS, USAGE_RECORD_ROW_COLUMNS, PromptRow, UsageRecordRow, to_rows
+from database.unit_of_work import current_unit_of_work
+from utils.config import USAGE_ROLLUP
+from utils.constants import DEFAULT_MODEL_FAMILY, MODEL_FAMILY_PATTERNS
 from utils.exceptions import DatabaseError
+from utils.model_family import MODEL_FAMILIES, classify_model_family
+
+PROMPT_KEY_COLUMNS = ['department', 'document_type', 'doctor']
+PROMPT_IMPORT_COLUMNS = PROMPT_KEY_COLUMNS + ['content', 'selected_model', 'generation_profile', 'is_default']
+PROMPT_UPSERT_BATCH_SIZE = 1000
+USAGE_COLUMNS = [
+    'date', 'app_type', 'document_types', 'model_detail', 'department', 'doctor',
+    'input_tokens', 'output_tokens', 'total_tokens', 'processing_time',
+    'input_chars_saved', 'input_tokens_saved', 'continuation_count', 'request_id', 'model_family'
+]
+USAGE_INSERT_BATCH_SIZE = 1000
+USAGE_SUMMARY_KEYS = ['count', 'total_input_tokens', 'total_output_tokens', 'total_tokens']
+
+JST = pytz.timezone('Asia/Tokyo')
+ROLLUP_KEY_COLUMNS = ['day', 'department', 'doctor', 'document_types', 'model_family']
+PROCESSING_TIME_BUCKETS = [
+    (10, 'processing_time_le_10'),
+    (30, 'processing_time_le_30'),
+    (60, 'processing_time_le_60'),
+    (120, 'processing_time_le_120'),
+    (None, 'processing_time_gt_120'),
+]
+ROLLUP_SUM_COLUMNS = ['count', 'input_tokens', 'output_tokens', 'total_tokens', 'processing_time'] + [
+    column for _, column in PROCESSING_TIME_BUCKETS
+]
+ROLLUP_BATCH_SIZE = 1000
+ROLLUP_COVERAGE_ID = 1
+# ON CONFLICT 句を使用するため、接続先のデータベースに合わせたINSERTを使用する
+DIALECT_INSERTS = {
+    'postgresql': pg_insert,
+    'sqlite': sqlite_insert,
+}
+
+
+def dialect_insert(session, model):
+    return DIALECT_INSERTS.get(session.get_bind().dialect.name, pg_insert)(model)
+
+
+# 頻繁に実行する参照は文を使い回し、SQLAlchemyのコンパイル済みキャッシュを利用する
+PROMPT_BY_KEYS_STATEMENT = select(*PROMPT_ROW_COLUMNS).where(
+    Prompt.__table__.c.department == bindparam('department'),
+    Prompt.__table__.c.document_type == bindparam('document_type'),
+    Prompt.__table__.c.doctor == bindparam('doctor')
+).limit(1)
+DEFAULT_PROMPT_STATEMENT = select(*PROMPT_ROW_COLUMNS).where(
+    Prompt.__table__.c.department == "default",
+    Prompt.__table__.c.is_default == True
+).limit(1)
+ALL_PROMPTS_STATEMENT = select(*PROMPT_ROW_COLUMNS).order_by(
+    Prompt.__table__.c.department,
+    Prompt.__table__.c.document_type,
+    Prompt.__table__.c.doctor
+)
+USAGE_RECORDS_STATEMENT = select(*USAGE_RECORD_ROW_COLUMNS)
+
+
+def model_family_case(column):
+    # classify_model_family と同じ判定をSQLで行い、既存行の補完に使用する
+    return case(
+        *[(column.ilike(f'%{pattern}%'), family) for pattern, family in MODEL_FAMILY_PATTERNS],
+        else_=DEFAULT_MODEL_FAMILY
+    )
+
+
+def _normalize_usage_row(usage_data: Dict[str, Any]) -> Dict[str, Any]:
+    # 作成日時はパーティションキーを兼ねるため、未指定の行も保存時点の日時で振り分ける
+    return {
+        **usage_data,
+        'date': usage_data.get('date') or datetime.datetime.now(JST),
+        'model_family': usage_data.get('model_family') or classify_model_family(usage_data.get('model_detail'))
+    }
+
+
+def _to_jst(value: datetime.datetime) -> datetime.datetime:
+    return JST.localize(value) if value.tzinfo is None else value.astimezone(JST)
+
+
+def _jst_midnight(day: datetime.date) -> datetime.datetime:
+    return JST.localize(datetime.datetime.combine(day, datetime.time.min))
+
+
+def split_rollup_range(start_date: datetime.datetime, end_date: datetime.datetime,
+                       covered_from: Optional[datetime.date] = None) -> Tuple[Optional[Tuple[datetime.date, datetime.date]],
+                                  List[Tuple[datetime.datetime, datetime.datetime]]]:
+    # 丸1日分を含む日は日次集計から、期間の端の半端な時間帯のみ明細から集計する
+    start = _to_jst(start_date)
+    end = _to_jst(end_date)
+    if start > end:
+        return None, []
+
+    epsilon = datetime.timedelta(microseconds=1)
+    one_day = datetime.timedelta(days=1)
+    first_day = start.date() if start == _jst_midnight(start.date()) else start.date() + one_day
+    last_day = (end + epsilon).date() - one_day
+    # 日次集計に反映されていない日は明細から集計する
+    if covered_from is not None:
+        first_day = max(first_day, covered_from)
+
+    if first_day > last_day:
+        return None, [(start, end)]
+
+    edges = []
+    if start < _jst_midnight(first_day):
+        edges.append((start, _jst_midnight(first_day) - epsilon))
+    last_end = _jst_midnight(last_day + one_day)
+    if end >= last_end:
+        edges.append((last_end, end))
+    return (first_day, last_day), edges
+
+
+def _processing_time_bucket(seconds: int) -> str:
+    for bound, column in PROCESSING_TIME_BUCKETS:
+        if bound is None or seconds <= bound:
+            return column
+
+
+def aggregate_daily_rollups(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rollups: Dict[Tuple, Dict[str, Any]] = {}
+    for row in rows:
+        key = (
+            _to_jst(row.get('date') or datetime.datetime.now(JST)).date(),
+            row.get('department') or 'default',
+            row.get('doctor') or 'default',
+            row.get('document_types') or '',
+            row.get('model_family') or classify_model_family(row.get('model_detail')),
+        )
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = dict(zip(ROLLUP_KEY_COLUMNS, key))
+            rollup.update({column: 0 for column in ROLLUP_SUM_COLUMNS})
+            rollups[key] = rollup
+
+        processing_time = row.get('processing_time') or 0
+        rollup['count'] += 1
+        for column in ('input_tokens', 'output_tokens', 'total_tokens'):
+            rollup[column] += row.get(column) or 0
+        rollup['processing_time'] += processing_time
+        rollup[_processing_time_bucket(processing_time)] += 1
+    return list(rollups.values())
 
 
 class BaseRepository:
 
-    def __init__(self, session_factory: sessionmaker):
+    def __init__(self, session_factory: sessionmaker, read_session_factory: Optional[sessionmaker] = None):
         self.session_factory = session_factory
+        self.read_session_factory = read_session_factory
 
     def get_session(self):
+        unit = current_unit_of_work()
+        if unit is not None:
+            shared = unit.shared_session(self.session_factory)
+            if shared is not None:
+                return shared
         return self.session_factory()
 
+    def get_read_session(self):
+        # 直前に書き込んだセッションと、書き込み中の作業単位はプライマリから読み取る
+        if self.read_session_factory is None or reads_from_primary():
+            return self.get_session()
+        unit = current_unit_of_work()
+        if unit is not None and unit.has_writes:
+            return self.get_session()
+        return self.read_session_factory()
+
 
 class PromptRepository(BaseRepository):
 
-    def get_by_keys(self, department: str, document_type: str, doctor: str) -> Optional[Prompt]:
+    def get_by_keys(self, department: str, document_type: str, doctor: str) -> Optional[PromptRow]:
         try:
-            with self.get_session() as session:
-                return session.query(Prompt).filter(
-                    Prompt.department == department,
-                    Prompt.document_type == document_type,
-                    Prompt.doctor == doctor
-                ).first()
+            with self.get_read_session() as session:
+                row = session.execute(PROMPT_BY_KEYS_STATEMENT, {
+                    'department': department,
+                    'document_type': document_type,
+                    'doctor': doctor
+                }).first()
+                return PromptRow(*row) if row else None
         except Exception as e:
             raise DatabaseError(f"プロンプトの取得に失敗しました: {str(e)}")
 
-    def get_default_prompt(self) -> Optional[Prompt]:
+    def get_default_prompt(self) -> Optional[PromptRow]:
         try:
-            with self.get_session() as session:
-                return session.query(Prompt).filter(
-                    Prompt.department == "default",
-                    Prompt.is_default == True
-                ).first()
+            with self.get_read_session() as session:
+                row = session.execute(DEFAULT_PROMPT_STATEMENT).first()
+                return PromptRow(*row) if row else None
         except Exception as e:
             raise DatabaseError(f"デフォルトプロンプトの取得に失敗しました: {str(e)}")
 
     def create_or_update(self, department: str, document_type: str, doctor: str,
-                        content: str, selected_model: Optional[str] = None) -> Tuple[bool, str]:
+                        content: str, selected_model: Optional[str] = None,
+                        generation_profile: Optional[str] = None) -> Tuple[bool, str]:
         try:
             with self.get_session() as session:
                 existing_prompt = session.query(Prompt).filter(
@@ -55,6 +217,7 @@ class PromptRepository(BaseRepository):
                 if existing_prompt:
                     existing_prompt.content = content
                     existing_prompt.selected_model = selected_model
+                    existing_prompt.generation_profile = generation_profile
                     existing_prompt.updated_at = datetime.datetime.now()
                 else:
                     new_prompt = Prompt(
@@ -63,11 +226,13 @@ class PromptRepository(BaseRepository):
                         doctor=doctor,
                         content=content,
                         selected_model=selected_model,
+                        generation_profile=generation_profile,
                         is_default=False
                     )
                     session.add(new_prompt)
 
                 session.commit()
+                mark_primary_reads()
                 action = "更新" if is_update else "新規作成"
                 return True, f"プロンプトを{action}しました"
 
@@ -91,19 +256,16 @@ class PromptRepository(BaseRepository):
 
                 session.delete(prompt)
                 session.commit()
+                mark_primary_reads()
                 return True, "プロンプトを削除しました"
 
         except Exception as e:
             raise DatabaseError(f"プロンプトの削除に失敗しました: {str(e)}")
 
-    def get_all(self) -> List[Prompt]:
+    def get_all(self) -> List[PromptRow]:
         try:
-            with self.get_session() as session:
-                return session.query(Prompt).order_by(
-                    Prompt.department,
-                    Prompt.document_type,
-                    Prompt.doctor
-                ).all()
+            with self.get_read_session() as session:
+                return to_rows(PromptRow, session.execute(ALL_PROMPTS_STATEMENT))
         except Exception as e:
             raise DatabaseError(f"プロンプト一覧の取得に失敗しました: {str(e)}")
 
@@ -125,63 +287,280 @@ class PromptRepository(BaseRepository):
                     )
                     session.add(default_prompt)
                     session.commit()
+                    mark_primary_reads()
 
         except Exception as e:
             raise DatabaseError(f"デフォルトプロンプトの作成に失敗しました: {str(e)}")
 
     def bulk_create_prompts(self, prompts_data: List[Dict[str, Any]]) -> None:
+        self.bulk_upsert_prompts(prompts_data, update_existing=False)
+
+    def bulk_upsert_prompts(self, prompts_data: List[Dict[str, Any]],
+                            update_existing: bool = False) -> int:
         try:
-            with self.get_session() as session:
-                for data in prompts_data:
-                    existing = session.query(Prompt).filter(
-                        Prompt.department == data['department'],
-                        Prompt.document_type == data['document_type'],
-                        Prompt.doctor == data['doctor']
-                    ).first()
+            rows = self._normalize_prompt_rows(prompts_data)
+            if not rows:
+                return 0
 
-                    if not existing:
-                        prompt = Prompt(**data)
-                        session.add(prompt)
+            affected = 0
+            with self.get_session() as session:
+                for start in range(0, len(rows), PROMPT_UPSERT_BATCH_SIZE):
+                    stmt = self._build_prompt_upsert(session, rows[start:start + PROMPT_UPSERT_BATCH_SIZE],
+                                                     update_existing)
+                    result = session.execute(stmt)
+                    affected += result.rowcount or 0
 
                 session.commit()
+                mark_primary_reads()
+                return affected
 
         except Exception as e:
-            raise DatabaseError(f"プロンプトの一括作成に失敗しました: {str(e)}")
+            raise DatabaseError(f"プロンプトの一括登録に失敗しました: {str(e)}")
+
+    @staticmethod
+    def _normalize_prompt_rows(prompts_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # 同一キーが複数含まれると ON CONFLICT DO UPDATE が失敗するため後勝ちで1件にまとめる
+        unique_rows: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for data in prompts_data:
+            row = {
+                'department': data['department'],
+                'document_type': data['document_type'],
+                'doctor': data['doctor'],
+                'content': data['content'],
+                'selected_model': data.get('selected_model') or None,
+                'generation_profile': data.get('generation_profile') or None,
+                'is_default': bool(data.get('is_default', False)),
+            }
+            unique_rows[(row['department'], row['document_type'], row['doctor'])] = row
+        return list(unique_rows.values())
+
+    @staticmethod
+    def _build_prompt_upsert(session, rows: List[Dict[str, Any]], update_existing: bool):
+        stmt = dialect_insert(session, Prompt).values(rows)
+
+        if update_existing:
+            return stmt.on_conflict_do_update(
+                index_elements=PROMPT_KEY_COLUMNS,
+                set_={
+                    'content': stmt.excluded.content,
+                    'selected_model': stmt.excluded.selected_model,
+                    'generation_profile': stmt.excluded.generation_profile,
+                    'updated_at': func.now(),
+                }
+            )
+
+        return stmt.on_conflict_do_nothing(index_elements=PROMPT_KEY_COLUMNS)
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        try:
+            with self.get_read_session() as session:
+                stmt = select(
+                    *[getattr(Prompt, column) for column in PROMPT_IMPORT_COLUMNS]
+                ).order_by(
+                    Prompt.department,
+                    Prompt.document_type,
+                    Prompt.doctor
+                ).execution_options(yield_per=batch_size)
+
+                for row in session.execute(stmt):
+                    yield dict(row._mapping)
+
+        except Exception as e:
+            raise DatabaseError(f"プロンプトのエクスポートに失敗しました: {str(e)}")
 
 
 class UsageStatisticsRepository(BaseRepository):
 
     def save_usage(self, usage_data: Dict[str, Any]) -> None:
         try:
+            usage_data = _normalize_usage_row(usage_data)
             with self.get_session() as session:
                 usage = SummaryUsage(**usage_data)
                 session.add(usage)
+                if USAGE_ROLLUP:
+                    self._upsert_daily_rollups(session, aggregate_daily_rollups([usage_data]))
+                else:
+                    self._advance_rollup_coverage(session, [usage_data])
                 session.commit()
 
         except Exception as e:
             raise DatabaseError(f"使用統計の保存に失敗しました: {str(e)}")
 
+    def bulk_save_usage(self, usage_rows: List[Dict[str, Any]]) -> int:
+        try:
+            # 複数行INSERTは全行が同じカラムを持つ必要があるため、欠けたカラムはNULLで補う
+            rows = [{column: data.get(column) for column in USAGE_COLUMNS}
+                    for data in map(_normalize_usage_row, usage_rows)]
+            if not rows:
+                return 0
+
+            inserted = 0
+            with self.get_session() as session:
+                if not USAGE_ROLLUP:
+                    self._advance_rollup_coverage(session, rows)
+
+                for start in range(0, len(rows), USAGE_INSERT_BATCH_SIZE):
+                    stmt = dialect_insert(session, SummaryUsage).values(
+                        rows[start:start + USAGE_INSERT_BATCH_SIZE]
+                    ).on_conflict_do_nothing(index_elements=['request_id', 'date'])
+
+                    if not USAGE_ROLLUP:
+                        result = session.execute(stmt)
+                        inserted += result.rowcount or 0
+                        continue
+
+                    # 重複として除外された行を日次集計に二重加算しないよう、追加された行のみを集計する
+                    inserted_rows = session.execute(
+                        stmt.returning(*[SummaryUsage.__table__.c[column] for column in USAGE_COLUMNS])
+                    ).all()
+                    inserted += len(inserted_rows)
+                    self._upsert_daily_rollups(
+                        session, aggregate_daily_rollups(dict(row._mapping) for row in inserted_rows)
+                    )
+
+                session.commit()
+                return inserted
+
+        except Exception as e:
+            raise DatabaseError(f"使用統計の一括保存に失敗しました: {str(e)}")
+
+    def backfill_model_family(self) -> int:
+        try:
+            with self.get_session() as session:
+                result = session.execute(
+                    update(SummaryUsage)
+                    .where(SummaryUsage.model_family.is_(None))
+                    .values(model_family=model_family_case(SummaryUsage.model_detail))
+                )
+                session.commit()
+                return result.rowcount or 0
+
+        except Exception as e:
+            raise DatabaseError(f"モデル系統の補完に失敗しました: {str(e)}")
+
+    @staticmethod
+    def _upsert_daily_rollups(session, rollups: List[Dict[str, Any]]) -> None:
+        for start in range(0, len(rollups), ROLLUP_BATCH_SIZE):
+            stmt = dialect_insert(session, UsageDailyRollup).values(rollups[start:start + ROLLUP_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=ROLLUP_KEY_COLUMNS,
+                set_={
+                    **{column: getattr(UsageDailyRollup, column) + getattr(stmt.excluded, column)
+                       for column in ROLLUP_SUM_COLUMNS},
+                    'updated_at': func.now(),
+                }
+            )
+            session.execute(stmt)
+
+    @staticmethod
+    def _get_rollup_coverage(session) -> Optional[datetime.date]:
+        return session.execute(
+            select(UsageRollupCoverage.covered_from).where(UsageRollupCoverage.id == ROLLUP_COVERAGE_ID)
+        ).scalar()
+
+    @staticmethod
+    def _set_rollup_coverage(session, covered_from: datetime.date) -> None:
+        stmt = dialect_insert(session, UsageRollupCoverage).values(id=ROLLUP_COVERAGE_ID, covered_from=covered_from)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['id'],
+            set_={'covered_from': stmt.excluded.covered_from, 'updated_at': func.now()}
+        ))
+
+    @staticmethod
+    def _advance_rollup_coverage(session, usage_rows: List[Dict[str, Any]]) -> None:
+        # 日次集計に加算せずに保存した日までは、日次集計が欠けているため明細から集計する
+        last_day = max(_to_jst(row['date']).date() for row in usage_rows)
+        session.execute(
+            update(UsageRollupCoverage)
+            .where(UsageRollupCoverage.covered_from <= last_day)
+            .values(covered_from=last_day + datetime.timedelta(days=1), updated_at=func.now())
+        )
+
+    def get_rollup_coverage(self) -> Optional[datetime.date]:
+        try:
+            with self.get_session() as session:
+                return self._get_rollup_coverage(session)
+
+        except Exception as e:
+            raise DatabaseError(f"日次集計の範囲の確認に失敗しました: {str(e)}")
+
+    def rebuild_daily_rollups(self, start_day: Optional[datetime.date] = None,
+                              end_day: Optional[datetime.date] = None) -> int:
+        try:
+            with self.get_session() as session:
+                first_day = start_day
+                if first_day is None:
+                    # 保持期間を過ぎて切り離した月の日次集計は明細から作り直せないため、残っている最初の記録の日から作り直す
+                    oldest = session.execute(select(func.min(SummaryUsage.date))).scalar()
+                    first_day = _to_jst(oldest).date() if oldest is not None else None
+
+                rollups = []
+                if first_day is not None:
+                    rollup_conditions = [UsageDailyRollup.day >= first_day]
+                    usage_conditions = [SummaryUsage.date >= _jst_midnight(first_day)]
+                    if end_day:
+                        rollup_conditions.append(UsageDailyRollup.day <= end_day)
+                        usage_conditions.append(
+                            SummaryUsage.date < _jst_midnight(end_day + datetime.timedelta(days=1))
+                        )
+
+                    session.execute(delete(UsageDailyRollup).where(*rollup_conditions))
+
+                    stmt = select(
+                        *[SummaryUsage.__table__.c[column] for column in USAGE_COLUMNS]
+                    ).where(*usage_conditions).execution_options(yield_per=ROLLUP_BATCH_SIZE)
+                    rollups = aggregate_daily_rollups(dict(row._mapping) for row in session.execute(stmt))
+
+                    self._upsert_daily_rollups(session, rollups)
+
+                # 集計済みの範囲とつながる場合のみ、日次集計から読み込む範囲を広げる
+                covered_from = self._get_rollup_coverage(session)
+                if end_day is None or (covered_from is not None
+                                       and end_day + datetime.timedelta(days=1) >= covered_from):
+                    # 範囲を指定しない場合は、明細の残っていない日も既存の日次集計をそのまま使う
+                    rebuilt_from = start_day or datetime.date.min
+                    self._set_rollup_coverage(
+                        session, rebuilt_from if covered_from is None else min(covered_from, rebuilt_from)
+                    )
+
+                session.commit()
+                return len(rollups)
+
+        except Exception as e:
+            raise DatabaseError(f"日次集計の再作成に失敗しました: {str(e)}")
+
+    def _split_range(self, session, start_date: datetime.datetime, end_date: datetime.datetime):
+        # 画面から渡される日時はタイムゾーンを持たないため、どの経路でも同じ期間となるようJSTとして扱う
+        start_date, end_date = _to_jst(start_date), _to_jst(end_date)
+        if not USAGE_ROLLUP:
+            return None, [(start_date, end_date)]
+
+        covered_from = self._get_rollup_coverage(session)
+        if covered_from is None:
+            return None, [(start_date, end_date)]
+        return split_rollup_range(start_date, end_date, covered_from)
+
+    @staticmethod
+    def _apply_rollup_filters(query, days: Tuple[datetime.date, datetime.date],
+                              model_filter: Optional[str], document_type_filter: Optional[str]):
+        query = query.filter(UsageDailyRollup.day >= days[0], UsageDailyRollup.day <= days[1])
+        if model_filter and model_filter in MODEL_FAMILIES:
+            query = query.filter(UsageDailyRollup.model_family == model_filter)
+        if document_type_filter and document_type_filter != "すべて":
+            query = query.filter(UsageDailyRollup.document_types == document_type_filter)
+        return query
+
     def _apply_date_filter(self, query, start_date: datetime.datetime, end_date: datetime.datetime):
         return query.filter(
-            SummaryUsage.date >= start_date,
-            SummaryUsage.date <= end_date
+            SummaryUsage.date >= _to_jst(start_date),
+            SummaryUsage.date <= _to_jst(end_date)
         )
 
     def _apply_model_filter(self, query, model_filter: Optional[str]):
-        if not model_filter or model_filter == "すべて":
+        if not model_filter or model_filter not in MODEL_FAMILIES:
             return query
 
-        if model_filter == "Gemini_Pro":
-            return query.filter(
-                SummaryUsage.model_detail.ilike('%gemini%'),
-                ~SummaryUsage.model_detail.ilike('%flash%')
-            )
-        elif model_filter == "Gemini_Flash":
-            return query.filter(SummaryUsage.model_detail.ilike('%flash%'))
-        elif model_filter == "Claude":
-            return query.filter(SummaryUsage.model_detail.ilike('%claude%'))
-
-        return query
+        return query.filter(SummaryUsage.model_family == model_filter)
 
     def _apply_document_type_filter(self, query, document_type_filter: Optional[str]):
         if not document_type_filter or document_type_filter == "すべて":
@@ -200,77 +579,169 @@ class UsageStatisticsRepository(BaseRepository):
                           model_filter: Optional[str] = None,
                           document_type_filter: Optional[str] = None) -> Dict[str, Any]:
         try:
-            with self.get_session() as session:
-                query = session.query(
-                    func.count(SummaryUsage.id).label('count'),
-                    func.sum(SummaryUsage.input_tokens).label('total_input_tokens'),
-                    func.sum(SummaryUsage.output_tokens).label('total_output_tokens'),
-                    func.sum(SummaryUsage.total_tokens).label('total_tokens')
-                )
-
-                query = self._apply_filters(query, start_date, end_date, model_filter, document_type_filter)
-
-                result = query.first()
-                return {
-                    'count': result.count or 0,
-                    'total_input_tokens': result.total_input_tokens or 0,
-                    'total_output_tokens': result.total_output_tokens or 0,
-                    'total_tokens': result.total_tokens or 0
-                }
+            with self.get_read_session() as session:
+                days, edges = self._split_range(session, start_date, end_date)
+                summaries = []
+                if days:
+                    summaries.append(self._get_rollup_summary(session, days, model_filter, document_type_filter))
+                for edge_start, edge_end in edges:
+                    summaries.append(self._get_raw_summary(
+                        session, edge_start, edge_end, model_filter, document_type_filter
+                    ))
+
+                return {key: sum(summary[key] for summary in summaries) for key in USAGE_SUMMARY_KEYS}
 
         except Exception as e:
             raise DatabaseError(f"使用統計の取得に失敗しました: {str(e)}")
 
+    def _get_raw_summary(self, session, start_date: datetime.datetime, end_date: datetime.datetime,
+                         model_filter: Optional[str], document_type_filter: Optional[str]) -> Dict[str, Any]:
+        query = session.query(
+            func.count(SummaryUsage.id).label('count'),
+            func.sum(SummaryUsage.input_tokens).label('total_input_tokens'),
+            func.sum(SummaryUsage.output_tokens).label('total_output_tokens'),
+            func.sum(SummaryUsage.total_tokens).label('total_tokens')
+        )
+
+        query = self._apply_filters(query, start_date, end_date, model_filter, document_type_filter)
+
+        result = query.first()
+        return {
+            'count': result.count or 0,
+            'total_input_tokens': result.total_input_tokens or 0,
+            'total_output_tokens': result.total_output_tokens or 0,
+            'total_tokens': result.total_tokens or 0
+        }
+
+    def _get_rollup_summary(self, session, days: Tuple[datetime.date, datetime.date],
+                            model_filter: Optional[str], document_type_filter: Optional[str]) -> Dict[str, Any]:
+        query = session.query(
+            func.sum(UsageDailyRollup.count).label('count'),
+            func.sum(UsageDailyRollup.input_tokens).label('total_input_tokens'),
+            func.sum(UsageDailyRollup.output_tokens).label('total_output_tokens'),
+            func.sum(UsageDailyRollup.total_tokens).label('total_tokens')
+        )
+
+        result = self._apply_rollup_filters(query, days, model_filter, document_type_filter).first()
+        return {key: int(getattr(result, key) or 0) for key in USAGE_SUMMARY_KEYS}
+
     def get_department_statistics(self, start_date: datetime.datetime, end_date: datetime.datetime,
                                   model_filter: Optional[str] = None,
                                   document_type_filter: Optional[str] = None) -> List[Dict[str, Any]]:
         try:
-            with self.get_session() as session:
-                query = session.query(
-                    func.coalesce(SummaryUsage.department, 'default').label('department'),
-                    func.coalesce(SummaryUsage.doctor, 'default').label('doctor'),
-                    SummaryUsage.document_types,
-                    func.count(SummaryUsage.id).label('count'),
-                    func.sum(SummaryUsage.input_tokens).label('input_tokens'),
-                    func.sum(SummaryUsage.output_tokens).label('output_tokens'),
-                    func.sum(SummaryUsage.total_tokens).label('total_tokens'),
-                    func.sum(SummaryUsage.processing_time).label('processing_time')
-                )
-
-                query = self._apply_filters(query, start_date, end_date, model_filter, document_type_filter)
-
-                query = query.group_by(
-                    SummaryUsage.department,
-                    SummaryUsage.doctor,
-                    SummaryUsage.document_types
-                ).order_by(desc(func.count(SummaryUsage.id)))
-
-                results = query.all()
-                return [
-                    {
-                        'department': r.department,
-                        'doctor': r.doctor,
-                        'document_types': r.document_types,
-                        'count': r.count,
-                        'input_tokens': r.input_tokens,
-                        'output_tokens': r.output_tokens,
-                        'total_tokens': r.total_tokens,
-                        'processing_time': r.processing_time
-                    }
-                    for r in results
-                ]
+            with self.get_read_session() as session:
+                days, edges = self._split_range(session, start_date, end_date)
+                statistics = []
+                if days:
+                    statistics.append(self._get_rollup_department_statistics(
+                        session, days, model_filter, document_type_filter
+                    ))
+                for edge_start, edge_end in edges:
+                    statistics.append(self._get_raw_department_statistics(
+                        session, edge_start, edge_end, model_filter, document_type_filter
+                    ))
+
+                if len(statistics) == 1:
+                    return statistics[0]
+                return self._merge_department_statistics(statistics)
 
         except Exception as e:
             raise DatabaseError(f"部門別統計の取得に失敗しました: {str(e)}")
 
+    def _get_raw_department_statistics(self, session, start_date: datetime.datetime,
+                                       end_date: datetime.datetime, model_filter: Optional[str],
+                                       document_type_filter: Optional[str]) -> List[Dict[str, Any]]:
+        query = session.query(
+            func.coalesce(SummaryUsage.department, 'default').label('department'),
+            func.coalesce(SummaryUsage.doctor, 'default').label('doctor'),
+            SummaryUsage.document_types,
+            func.count(SummaryUsage.id).label('count'),
+            func.sum(SummaryUsage.input_tokens).label('input_tokens'),
+            func.sum(SummaryUsage.output_tokens).label('output_tokens'),
+            func.sum(SummaryUsage.total_tokens).label('total_tokens'),
+            func.sum(SummaryUsage.processing_time).label('processing_time')
+        )
+
+        query = self._apply_filters(query, start_date, end_date, model_filter, document_type_filter)
+
+        query = query.group_by(
+            SummaryUsage.department,
+            SummaryUsage.doctor,
+            SummaryUsage.document_types
+        ).order_by(desc(func.count(SummaryUsage.id)))
+
+        results = query.all()
+        return [
+            {
+                'department': r.department,
+                'doctor': r.doctor,
+                'document_types': r.document_types,
+                'count': r.count,
+                'input_tokens': r.input_tokens,
+                'output_tokens': r.output_tokens,
+                'total_tokens': r.total_tokens,
+                'processing_time': r.processing_time
+            }
+            for r in results
+        ]
+
+    def _get_rollup_department_statistics(self, session, days: Tuple[datetime.date, datetime.date],
+                                          model_filter: Optional[str],
+                                          document_type_filter: Optional[str]) -> List[Dict[str, Any]]:
+        query = session.query(
+            UsageDailyRollup.department,
+            UsageDailyRollup.doctor,
+            UsageDailyRollup.document_types,
+            func.sum(UsageDailyRollup.count).label('count'),
+            func.sum(UsageDailyRollup.input_tokens).label('input_tokens'),
+            func.sum(UsageDailyRollup.output_tokens).label('output_tokens'),
+            func.sum(UsageDailyRollup.total_tokens).label('total_tokens'),
+            func.sum(UsageDailyRollup.processing_time).label('processing_time')
+        )
+
+        query = self._apply_rollup_filters(query, days, model_filter, document_type_filter)
+
+        query = query.group_by(
+            UsageDailyRollup.department,
+            UsageDailyRollup.doctor,
+            UsageDailyRollup.document_types
+        ).order_by(desc(func.sum(UsageDailyRollup.count)))
+
+        return [
+            {
+                'department': r.department,
+                'doctor': r.doctor,
+                'document_types': r.document_types or None,
+                'count': int(r.count),
+                'input_tokens': int(r.input_tokens),
+                'output_tokens': int(r.output_tokens),
+                'total_tokens': int(r.total_tokens),
+                'processing_time': int(r.processing_time)
+            }
+            for r in query.all()
+        ]
+
+    @staticmethod
+    def _merge_department_statistics(statistics: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        merged: Dict[Tuple, Dict[str, Any]] = {}
+        for stat in (stat for stats in statistics for stat in stats):
+            key = (stat['department'], stat['doctor'], stat['document_types'] or None)
+            if key not in merged:
+                merged[key] = {**stat, 'document_types': key[2]}
+                continue
+            for column in ('count', 'input_tokens', 'output_tokens', 'total_tokens', 'processing_time'):
+                merged[key][column] = (merged[key][column] or 0) + (stat[column] or 0)
+
+        return sorted(merged.values(), key=lambda stat: stat['count'], reverse=True)
+
     def get_usage_records(self, start_date: datetime.datetime, end_date: datetime.datetime,
                           model_filter: Optional[str] = None,
-                          document_type_filter: Optional[str] = None) -> List[SummaryUsage]:
+                          document_type_filter: Optional[str] = None) -> List[UsageRecordRow]:
         try:
-            with self.get_session() as session:
-                query = session.query(SummaryUsage)
-                query = self._apply_filters(query, start_date, end_date, model_filter, document_type_filter)
-                return query.order_by(desc(SummaryUsage.date)).all()
+            with self.get_read_session() as session:
+                stmt = self._apply_filters(USAGE_RECORDS_STATEMENT, start_date, end_date,
+                                           model_filter, document_type_filter)
+                return to_rows(UsageRecordRow, session.execute(stmt.order_by(desc(SummaryUsage.date))))
 
         except Exception as e:
             raise DatabaseError(f"使用履歴の取得に失敗しました: {str(e)}")
@@ -0,0 +1,54 @@
+import datetime
+from dataclasses import dataclass, fields
+from typing import Iterable, List, Optional, Type, TypeVar
+
+from database.models import Prompt, SummaryUsage
+
+RowType = TypeVar("RowType")
+
+
+# 読み取り専用の参照ではORMのインスタンスを作らず、カラムの値のみを保持する軽量な行を返す
+@dataclass(frozen=True, slots=True)
+class PromptRow:
+    id: int
+    department: str
+    document_type: str
+    doctor: str
+    content: str
+    selected_model: Optional[str]
+    generation_profile: Optional[str]
+    is_default: Optional[bool]
+    created_at: Optional[datetime.datetime]
+    updated_at: Optional[datetime.datetime]
+
+
+@dataclass(frozen=True, slots=True)
+class UsageRecordRow:
+    id: int
+    date: datetime.datetime
+    app_type: Optional[str]
+    document_types: Optional[str]
+    model_detail: Optional[str]
+    department: Optional[str]
+    doctor: Optional[str]
+    input_tokens: Optional[int]
+    output_tokens: Optional[int]
+    total_tokens: Optional[int]
+    processing_time: Optional[int]
+    input_chars_saved: Optional[int]
+    input_tokens_saved: Optional[int]
+    continuation_count: Optional[int]
+    request_id: Optional[str]
+    model_family: Optional[str]
+
+
+def row_columns(row_type: Type, model) -> list:
+    return [model.__table__.c[field.name] for field in fields(row_type)]
+
+
+def to_rows(row_type: Type[RowType], result: Iterable) -> List[RowType]:
+    return [row_type(*row) for row in result]
+
+
+PROMPT_ROW_COLUMNS = row_columns(PromptRow, Prompt)
+USAGE_RECORD_ROW_COLUMNS = row_columns(UsageRecordRow, SummaryUsage)
@@ -1,6 +1,7 @@
 import time
 
 from database.db import DatabaseManager
+from database.migrations import migrate
 from database.models import Base
 from utils.exceptions import DatabaseError
 
@@ -8,9 +9,8 @@ from utils.exceptions import DatabaseError
 def create_tables():
     try:
         db_manager = DatabaseManager.get_instance()
-        engine = db_manager.get_engine()
 
-        Base.metadata.create_all(engine)
+        migrate(db_manager.get_engine(), db_manager.get_session_factory())
 
         return True
     except Exception as e:
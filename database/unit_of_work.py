@@ -0,0 +1,108 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from utils.exceptions import DatabaseCommitError
+
+_current_unit: ContextVar[Optional["UnitOfWork"]] = ContextVar("current_unit_of_work", default=None)
+
+
+class SharedSession:
+    # リポジトリの with 文とcommitはそのままに、作業単位のセッションを使い回す
+    __slots__ = ("_unit", "_savepoint")
+
+    def __init__(self, unit: "UnitOfWork"):
+        self._unit = unit
+        self._savepoint = None
+
+    def __enter__(self) -> "SharedSession":
+        # 失敗したリポジトリの処理のみを取り消せるよう、処理ごとにセーブポイントを設ける
+        self._savepoint = self._unit.session.begin_nested()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        savepoint, self._savepoint = self._savepoint, None
+        if savepoint is None:
+            return False
+        if exc_type is not None:
+            # それまでに成功した書き込みは残し、この処理の変更のみを取り消す
+            # （flushに失敗したセーブポイントは無効になっているが、取り消すまで作業単位全体が使えなくなる）
+            savepoint.rollback()
+        elif savepoint.is_active:
+            savepoint.commit()
+        return False
+
+    def commit(self) -> None:
+        # コミットは作業単位の終了時に1回のみ行う
+        self._unit.session.flush()
+        self._unit.has_writes = True
+
+    def __getattr__(self, name):
+        return getattr(self._unit.session, name)
+
+
+class UnitOfWork:
+
+    def __init__(self):
+        self.session: Optional[Session] = None
+        self.session_factory: Optional[sessionmaker] = None
+        self.has_writes = False
+        self._token = None
+
+    def __enter__(self) -> "UnitOfWork":
+        # 入れ子になった場合は外側の作業単位にまとめる
+        outer = _current_unit.get()
+        if outer is not None:
+            return outer
+        self._token = _current_unit.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._token is None:
+            return False
+
+        _current_unit.reset(self._token)
+        self._token = None
+        if self.session is None:
+            return False
+
+        try:
+            if exc_type is None and self.has_writes:
+                self.session.commit()
+            else:
+                self.session.rollback()
+        except Exception as e:
+            raise DatabaseCommitError(f"データベースへの保存に失敗しました: {str(e)}")
+        finally:
+            self.session.close()
+            self.session = None
+        return False
+
+    def shared_session(self, session_factory: sessionmaker) -> Optional[SharedSession]:
+        # 最初に使用したリポジトリの接続先にまとめ、別の接続先のリポジトリは個別のセッションを使用する
+        if self.session is None:
+            self.session_factory = session_factory
+            self.session = session_factory()
+        elif self.session_factory is not session_factory:
+            return None
+        return SharedSession(self)
+
+    def release_connection(self) -> None:
+        # 書き込みがなければ読み取りのトランザクションを終え、接続をプールへ返す（セッションは引き続き使用できる）
+        if self.session is not None and not self.has_writes:
+            self.session.rollback()
+
+
+def unit_of_work() -> UnitOfWork:
+    return UnitOfWork()
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    return _current_unit.get()
+
+
+def release_connection() -> None:
+    unit = _current_unit.get()
+    if unit is not None:
+        unit.release_connection()
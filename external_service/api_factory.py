@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Union
+from typing import Dict, Optional, Union
 
 from external_service.base_api import BaseAPIClient
 from external_service.claude_api import ClaudeAPIClient
@@ -40,12 +40,31 @@ class APIFactory:
                                        department: str = "default",
                                        document_type: str = DEFAULT_DOCUMENT_TYPE,
                                        doctor: str = "default",
-                                       model_name: str = None):
+                                       model_name: str = None,
+                                       prefilled_sections: Optional[Dict[str, str]] = None,
+                                       generation_profile: Optional[str] = None):
         client = APIFactory.create_client(provider)
         return client.generate_summary(
             medical_text, additional_info, current_prescription,
-            department, document_type, doctor, model_name
+            department, document_type, doctor, model_name, prefilled_sections, generation_profile
         )
 
 def generate_summary(provider: str, medical_text: str, **kwargs):
     return APIFactory.generate_summary_with_provider(provider, medical_text, **kwargs)
+
+
+def generate_summary_with_usage(provider: str, medical_text: str, **kwargs):
+    # 続きの生成回数はクライアントに記録されるため、生成結果と合わせて返す
+    client = APIFactory.create_client(provider)
+    summary_text, input_tokens, output_tokens = client.generate_summary(medical_text, **kwargs)
+    return summary_text, input_tokens, output_tokens, client.continuation_count
+
+
+def regenerate_section(provider: str, section: str, medical_text: str, **kwargs):
+    client = APIFactory.create_client(provider)
+    return client.regenerate_section(section, medical_text, **kwargs)
+
+
+def refine_summary(provider: str, previous_output: str, instruction: str, medical_text: str, **kwargs):
+    client = APIFactory.create_client(provider)
+    return client.refine_summary(previous_output, instruction, medical_text, **kwargs)
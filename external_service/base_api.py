@@ -1,16 +1,33 @@
 from abc import ABC, abstractmethod
-from typing import Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 
+from database.unit_of_work import release_connection
 from utils.config import get_config
-from utils.constants import DEFAULT_DOCUMENT_TYPE
+from utils.constants import (
+    DEFAULT_DOCUMENT_TYPE,
+    DEFAULT_GENERATION_PROFILE,
+    REFINEMENT_INSTRUCTION,
+    SECTION_REGENERATION_INSTRUCTION,
+    SECTION_REGENERATION_PROFILE,
+)
 from utils.exceptions import APIError
+from utils.generation_profiles import get_provider_settings, resolve_generation_profile
+from utils.output_scaffolding import apply_output_options, build_header_prefill
 from utils.prompt_manager import get_prompt_manager
+from utils.structured_output import is_structured_output_enabled
+from utils.text_processor import extract_section_content, get_first_section
 
 
 class BaseAPIClient(ABC):
+    provider_name = ""
+
     def __init__(self, api_key: str, default_model: str):
         self.api_key = api_key
         self.default_model = default_model
+        self.structured_output = False
+        self.generation_settings = get_provider_settings(DEFAULT_GENERATION_PROFILE, self.provider_name)
+        self.output_prefill = ""
+        self.continuation_count = 0
 
     @abstractmethod
     def initialize(self) -> bool:
@@ -26,25 +43,78 @@ class BaseAPIClient(ABC):
                               current_prescription: str = "",
                               department: str = "default",
                               document_type: str = DEFAULT_DOCUMENT_TYPE,
-                              doctor: str = "default") -> str:
+                              doctor: str = "default",
+                              prefilled_sections: Optional[Dict[str, str]] = None) -> str:
+        context = self.create_context_prompt(
+            medical_text, additional_info, current_prescription, department, document_type, doctor
+        )
+        return context + self.create_prefilled_instruction(prefilled_sections)
+
+    def create_prefilled_instruction(self, prefilled_sections: Optional[Dict[str, str]] = None) -> str:
+        instruction = ""
+        if prefilled_sections:
+            instruction += "\n【作成済みの項目】以下の項目はシステムで作成済みのため、記載を省略してください。"
+            for section, content in prefilled_sections.items():
+                instruction += f"\n{section}: {content}"
+        return instruction
+    
+    def get_prompt_template(self, department: str, document_type: str, doctor: str) -> str:
         prompt_manager = get_prompt_manager()
         prompt_data = prompt_manager.get_prompt(department, document_type, doctor)
 
         if not prompt_data:
             config = get_config()
-            prompt_template = config['PROMPTS']['summary']
-        else:
-            prompt_template = prompt_data['content']
+            return config['PROMPTS']['summary']
+        return prompt_data['content']
 
-        prompt = f"{prompt_template}\n【カルテ情報】\n{medical_text}"
+    def create_context_prompt(self,
+                              medical_text: str,
+                              additional_info: str = "",
+                              current_prescription: str = "",
+                              department: str = "default",
+                              document_type: str = DEFAULT_DOCUMENT_TYPE,
+                              doctor: str = "default") -> str:
+        # 項目の再作成や修正指示で変わらないプロンプトとカルテを接頭辞にまとめ、キャッシュを再利用できるようにする
+        prompt_template = self.get_prompt_template(department, document_type, doctor)
+        context = f"{prompt_template}\n【カルテ情報】\n{medical_text}"
 
         if current_prescription.strip():
-            prompt += f"\n【退院時処方(現在の処方)】\n{current_prescription}"
+            context += f"\n【退院時処方(現在の処方)】\n{current_prescription}"
 
-        prompt += f"\n【追加情報】{additional_info}"
+        context += f"\n【追加情報】{additional_info}"
+        return context
+
+    def create_section_prompt(self,
+                              section: str,
+                              medical_text: str,
+                              additional_info: str = "",
+                              current_prescription: str = "",
+                              other_sections: Optional[Dict[str, str]] = None,
+                              department: str = "default",
+                              document_type: str = DEFAULT_DOCUMENT_TYPE,
+                              doctor: str = "default") -> Tuple[str, str]:
+        context = self.create_context_prompt(
+            medical_text, additional_info, current_prescription, department, document_type, doctor
+        )
+
+        instruction = ""
+        written = {name: content for name, content in (other_sections or {}).items() if content and name != section}
+        if written:
+            instruction += "\n【作成済みの項目】"
+            for name, content in written.items():
+                instruction += f"\n【{name}】\n{content}"
+
+        instruction += SECTION_REGENERATION_INSTRUCTION.format(section=section)
+        return context, instruction
+
+    def _generate_with_context(self, context: str, instruction: str, model_name: str) -> Tuple[str, int, int]:
+        # カルテを先頭に置き、プロバイダー側の接頭辞キャッシュが効くようにする
+        return self._generate_content(context + instruction, model_name)
+
+    def _generate_conversation(self, turns: List[Dict[str, Any]], model_name: str) -> Tuple[str, int, int]:
+        # 会話形式に対応しないクライアントでは、発話を順に連結して1つのプロンプトにする
+        return self._generate_content("\n".join(turn["content"] for turn in turns), model_name)
 
-        return prompt
-    
     def get_model_name(self,
                        department: str,
                        document_type: str,
@@ -62,22 +132,115 @@ class BaseAPIClient(ABC):
                          department: str = "default",
                          document_type: str = DEFAULT_DOCUMENT_TYPE,
                          doctor: str = "default",
-                         model_name: Optional[str] = None) -> Tuple[str, int, int]:
+                         model_name: Optional[str] = None,
+                         prefilled_sections: Optional[Dict[str, str]] = None,
+                         generation_profile: Optional[str] = None) -> Tuple[str, int, int]:
+        try:
+            self.initialize()
+            self.structured_output = is_structured_output_enabled(document_type)
+            self.generation_settings = get_provider_settings(
+                generation_profile or resolve_generation_profile(document_type), self.provider_name
+            )
+            self.output_prefill = ""
+            self.continuation_count = 0
+
+            if not model_name:
+                model_name = self.get_model_name(department, document_type, doctor)
+
+            # 項目の再作成や修正指示と同じ接頭辞にし、ここで書き込んだキャッシュを後続の呼び出しで読み込めるようにする
+            context = self.create_context_prompt(
+                medical_text, additional_info, current_prescription, department, document_type, doctor
+            )
+            instruction = self.create_prefilled_instruction(prefilled_sections)
+
+            # 構造化出力では見出しを出力しないため、見出しの指定とプリフィルは行わない
+            if not self.structured_output:
+                output_options = apply_output_options(self.generation_settings, document_type, prefilled_sections)
+                instruction += output_options["instruction"]
+                self.output_prefill = output_options["prefill"]
+                self.generation_settings["stop_sequences"] = output_options["stop_sequences"]
+
+            # 応答を待つ間はデータベースの接続を使用しないため、プールへ返しておく
+            release_connection()
+            return self._generate_with_context(context, instruction, model_name)
+
+        except APIError as e:
+            raise e
+        except Exception as e:
+            raise APIError(f"{self.__class__.__name__}でエラーが発生しました: {str(e)}")
+
+    def regenerate_section(self,
+                           section: str,
+                           medical_text: str,
+                           additional_info: str = "",
+                           current_prescription: str = "",
+                           other_sections: Optional[Dict[str, str]] = None,
+                           department: str = "default",
+                           document_type: str = DEFAULT_DOCUMENT_TYPE,
+                           doctor: str = "default",
+                           model_name: Optional[str] = None) -> Tuple[str, int, int]:
+        try:
+            self.initialize()
+            self.structured_output = False
+            self.generation_settings = get_provider_settings(SECTION_REGENERATION_PROFILE, self.provider_name)
+            self.output_prefill = build_header_prefill([section])
+            self.continuation_count = 0
+
+            if not model_name:
+                model_name = self.get_model_name(department, document_type, doctor)
+
+            context, instruction = self.create_section_prompt(
+                section, medical_text, additional_info, current_prescription, other_sections,
+                department, document_type, doctor
+            )
+
+            release_connection()
+            section_text, input_tokens, output_tokens = self._generate_with_context(context, instruction, model_name)
+            return extract_section_content(section_text, section), input_tokens, output_tokens
+
+        except APIError as e:
+            raise e
+        except Exception as e:
+            raise APIError(f"{self.__class__.__name__}でエラーが発生しました: {str(e)}")
+
+    def refine_summary(self,
+                       previous_output: str,
+                       instruction: str,
+                       medical_text: str,
+                       additional_info: str = "",
+                       current_prescription: str = "",
+                       department: str = "default",
+                       document_type: str = DEFAULT_DOCUMENT_TYPE,
+                       doctor: str = "default",
+                       model_name: Optional[str] = None,
+                       generation_profile: Optional[str] = None) -> Tuple[str, int, int]:
         try:
             self.initialize()
+            self.structured_output = False
+            self.generation_settings = get_provider_settings(
+                generation_profile or resolve_generation_profile(document_type), self.provider_name
+            )
+            self.continuation_count = 0
+
+            first_section = get_first_section(previous_output)
+            self.output_prefill = (build_header_prefill([first_section])
+                                   if first_section and self.generation_settings["prefill_header"] else "")
 
             if not model_name:
                 model_name = self.get_model_name(department, document_type, doctor)
 
-            prompt = self.create_summary_prompt(
-                medical_text,
-                additional_info,
-                current_prescription,
-                department,
-                document_type
+            context = self.create_context_prompt(
+                medical_text, additional_info, current_prescription, department, document_type, doctor
             )
 
-            return self._generate_content(prompt, model_name)
+            # カルテはキャッシュ済みの接頭辞として送り、新たな入力は修正指示のみとなるようにする
+            turns = [
+                {"role": "user", "content": context, "cache": True},
+                {"role": "assistant", "content": previous_output},
+                {"role": "user", "content": REFINEMENT_INSTRUCTION.format(instruction=instruction)},
+            ]
+            release_connection()
+            return self._generate_conversation(turns, model_name)
 
         except APIError as e:
             raise e
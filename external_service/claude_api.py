@@ -1,17 +1,22 @@
+import json
 import os
-from typing import Tuple
+from typing import Any, Dict, List, Tuple
 
 from anthropic import AnthropicBedrock
 from dotenv import load_dotenv
 
 from external_service.base_api import BaseAPIClient
+from utils.config import MAX_CONTINUATIONS
 from utils.constants import MESSAGES
 from utils.exceptions import APIError
+from utils.structured_output import SUMMARY_TOOL_NAME, build_claude_summary_tool
 
 load_dotenv()
 
 
 class ClaudeAPIClient(BaseAPIClient):
+    provider_name = "claude"
+
     def __init__(self):
         self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
         self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
@@ -39,26 +44,80 @@ class ClaudeAPIClient(BaseAPIClient):
             raise APIError(MESSAGES["API_CREDENTIALS_MISSING"])
 
     def _generate_content(self, prompt: str, model_name: str) -> Tuple[str, int, int]:
+        return self._generate_messages([{"role": "user", "content": prompt}], model_name)
+
+    def _generate_with_context(self, context: str, instruction: str, model_name: str) -> Tuple[str, int, int]:
+        # カルテ部分にキャッシュ指定を付け、続く項目の再作成や修正指示で再利用する
+        content = [{"type": "text", "text": context, "cache_control": {"type": "ephemeral"}}]
+        if instruction:
+            # 空のテキストブロックはAPIで拒否されるため、指示がある場合のみ追加する
+            content.append({"type": "text", "text": instruction})
+        return self._generate_messages([{"role": "user", "content": content}], model_name)
+
+    def _generate_conversation(self, turns: List[Dict[str, Any]], model_name: str) -> Tuple[str, int, int]:
+        messages = []
+        for turn in turns:
+            content = turn["content"]
+            if turn.get("cache"):
+                content = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+            messages.append({"role": turn["role"], "content": content})
+        return self._generate_messages(messages, model_name)
+
+    def _generate_messages(self, messages: List[Dict[str, Any]], model_name: str) -> Tuple[str, int, int]:
         try:
             bedrock_model_name = model_name if model_name else self.bedrock_model
 
-            response = self.client.messages.create(
-                model=bedrock_model_name,
-                max_tokens=6000,  # 最大出力トークン数
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+            summary_text, input_tokens, output_tokens, stop_reason = self._create_message(
+                messages, bedrock_model_name, self.output_prefill
             )
 
-            if response.content:
-                summary_text = response.content[0].text
-            else:
-                summary_text = "レスポンスが空です"
-
-            input_tokens = response.usage.input_tokens
-            output_tokens = response.usage.output_tokens
+            # 出力上限で途中終了した場合は、途中までの出力をプリフィルして続きを生成する
+            while (stop_reason == "max_tokens" and not self.structured_output
+                   and self.continuation_count < MAX_CONTINUATIONS):
+                self.continuation_count += 1
+                summary_text, continuation_input, continuation_output, stop_reason = self._create_message(
+                    messages, bedrock_model_name, summary_text.rstrip()
+                )
+                input_tokens += continuation_input
+                output_tokens += continuation_output
 
             return summary_text, input_tokens, output_tokens
 
         except Exception as e:
             raise APIError(f"Claude Bedrock API実行エラー: {str(e)}")
+
+    def _create_message(self, messages: List[Dict[str, Any]], model_name: str,
+                        prefill: str) -> Tuple[str, int, int, str]:
+        if prefill:
+            # 最初の見出し、または途中までの出力から書き始めさせる
+            messages = messages + [{"role": "assistant", "content": prefill}]
+
+        request = {
+            "model": model_name,
+            "max_tokens": self.generation_settings["max_tokens"],  # 最大出力トークン数
+            "messages": messages
+        }
+
+        if self.generation_settings["stop_sequences"]:
+            request["stop_sequences"] = list(self.generation_settings["stop_sequences"])
+
+        if self.structured_output:
+            request["tools"] = [build_claude_summary_tool()]
+            request["tool_choice"] = {"type": "tool", "name": SUMMARY_TOOL_NAME}
+
+        response = self.client.messages.create(**request)
+
+        summary_text = prefill + self._extract_response_text(response)
+
+        return summary_text, response.usage.input_tokens, response.usage.output_tokens, response.stop_reason
+
+    def _extract_response_text(self, response) -> str:
+        if not response.content:
+            return "レスポンスが空です"
+
+        if self.structured_output:
+            for block in response.content:
+                if getattr(block, "type", None) == "tool_use":
+                    return json.dumps(block.input, ensure_ascii=False)
+
+        return response.content[0].text
@@ -1,18 +1,22 @@
 import json
 import os
-from typing import Tuple
+from typing import Any, Dict, List, Tuple, Union
 
 from google import genai
 from google.genai import types
 from google.oauth2 import service_account
 
 from external_service.base_api import BaseAPIClient
-from utils.config import GEMINI_MODEL, GEMINI_THINKING_LEVEL, GOOGLE_PROJECT_ID, GOOGLE_LOCATION
-from utils.constants import MESSAGES
+from utils.config import GEMINI_MODEL, GEMINI_THINKING_LEVEL, GOOGLE_PROJECT_ID, GOOGLE_LOCATION, MAX_CONTINUATIONS
+from utils.constants import CONTINUATION_INSTRUCTION, MESSAGES
 from utils.exceptions import APIError
+from utils.structured_output import build_summary_schema
+from utils.text_processor import merge_continuation
 
 
 class GeminiAPIClient(BaseAPIClient):
+    provider_name = "gemini"
+
     def __init__(self):
         super().__init__(None, GEMINI_MODEL)
         self.client = None
@@ -62,30 +66,89 @@ class GeminiAPIClient(BaseAPIClient):
             raise APIError(MESSAGES["VERTEX_AI_INIT_ERROR"].format(error=str(e)))
 
     def _generate_content(self, prompt: str, model_name: str) -> Tuple[str, int, int]:
+        return self._generate_contents(prompt, model_name)
+
+    def _generate_conversation(self, turns: List[Dict[str, Any]], model_name: str) -> Tuple[str, int, int]:
+        # Vertex AIは先頭が共通する入力を暗黙的にキャッシュするため、カルテは最初の発話に置く
+        contents = [
+            {"role": "model" if turn["role"] == "assistant" else "user", "parts": [{"text": turn["content"]}]}
+            for turn in turns
+        ]
+        return self._generate_contents(contents, model_name)
+
+    def _generate_contents(self, contents: Union[str, List[Dict[str, Any]]], model_name: str) -> Tuple[str, int, int]:
         try:
-            thinking_level = types.ThinkingLevel.LOW if GEMINI_THINKING_LEVEL == "LOW" else types.ThinkingLevel.HIGH
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    thinking_config=types.ThinkingConfig(
-                        thinking_level=thinking_level
-                    )
+            level = (self.generation_settings["thinking_level"] or GEMINI_THINKING_LEVEL).upper()
+            thinking_level = types.ThinkingLevel.LOW if level == "LOW" else types.ThinkingLevel.HIGH
+            config_params = {
+                "thinking_config": types.ThinkingConfig(
+                    thinking_level=thinking_level
                 )
-            )
+            }
 
-            if hasattr(response, 'text'):
-                summary_text = response.text
-            else:
-                summary_text = str(response)
+            if self.generation_settings["max_tokens"]:
+                config_params["max_output_tokens"] = self.generation_settings["max_tokens"]
 
-            input_tokens = 0
-            output_tokens = 0
+            if self.generation_settings["stop_sequences"]:
+                config_params["stop_sequences"] = list(self.generation_settings["stop_sequences"])
 
-            if hasattr(response, 'usage_metadata'):
-                input_tokens = response.usage_metadata.prompt_token_count
-                output_tokens = response.usage_metadata.candidates_token_count
+            if self.structured_output:
+                config_params["response_mime_type"] = "application/json"
+                config_params["response_schema"] = build_summary_schema()
+
+            config = types.GenerateContentConfig(**config_params)
+            response = self.client.models.generate_content(
+                model=model_name,
+                contents=contents,
+                config=config
+            )
+            summary_text, input_tokens, output_tokens = self._read_response(response)
+
+            # 出力上限で途中終了した場合は、途中までの出力を会話に含めて続きを依頼する
+            while (self._is_truncated(response) and not self.structured_output
+                   and self.continuation_count < MAX_CONTINUATIONS):
+                self.continuation_count += 1
+                history = contents if isinstance(contents, list) else [{"role": "user", "parts": [{"text": contents}]}]
+                # 本文が出力される前に上限に達した場合は、空の発話を送らずに同じ依頼をやり直す
+                continuation_turns = [
+                    {"role": "model", "parts": [{"text": summary_text}]},
+                    {"role": "user", "parts": [{"text": CONTINUATION_INSTRUCTION}]},
+                ] if summary_text else []
+                response = self.client.models.generate_content(
+                    model=model_name,
+                    contents=history + continuation_turns,
+                    config=config
+                )
+                continuation, continuation_input, continuation_output = self._read_response(response)
+                summary_text = merge_continuation(summary_text, continuation)
+                input_tokens += continuation_input
+                output_tokens += continuation_output
 
             return summary_text, input_tokens, output_tokens
         except Exception as e:
             raise APIError(MESSAGES["VERTEX_AI_API_ERROR"].format(error=str(e)))
+
+    @staticmethod
+    def _read_response(response) -> Tuple[str, int, int]:
+        if hasattr(response, 'text'):
+            # 思考のみで出力上限に達した応答は本文がなく None となる
+            summary_text = response.text or ""
+        else:
+            summary_text = str(response)
+
+        input_tokens = 0
+        output_tokens = 0
+
+        if hasattr(response, 'usage_metadata'):
+            input_tokens = response.usage_metadata.prompt_token_count or 0
+            output_tokens = response.usage_metadata.candidates_token_count or 0
+
+        return summary_text, input_tokens, output_tokens
+
+    @staticmethod
+    def _is_truncated(response) -> bool:
+        candidates = getattr(response, 'candidates', None)
+        if not isinstance(candidates, list) or not candidates:
+            return False
+        finish_reason = getattr(candidates[0], 'finish_reason', None)
+        return getattr(finish_reason, 'name', finish_reason) == "MAX_TOKENS"
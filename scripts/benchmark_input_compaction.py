@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from utils.clinical_table_compactor import compact_lab_tables, compact_prescriptions  # noqa: E402
+from utils.karte_preprocessor import preprocess_karte, preprocess_prescription  # noqa: E402
+from utils.token_estimator import estimate_tokens  # noqa: E402
+
+LAB_ITEMS = [
+    ("WBC", "3.3-8.6", "10^3/μL", 9.8), ("RBC", "4.35-5.55", "10^6/μL", 3.9),
+    ("Hb", "13.7-16.8", "g/dL", 11.2), ("Ht", "40.7-50.1", "%", 34.5),
+    ("Plt", "158-348", "10^3/μL", 213), ("TP", "6.6-8.1", "g/dL", 6.2),
+    ("Alb", "4.1-5.1", "g/dL", 3.1), ("AST", "13-30", "U/L", 28),
+    ("ALT", "10-42", "U/L", 22), ("LDH", "124-222", "U/L", 260),
+    ("BUN", "8-20", "mg/dL", 32), ("Cre", "0.65-1.07", "mg/dL", 1.42),
+    ("Na", "138-145", "mEq/L", 136), ("K", "3.6-4.8", "mEq/L", 5.1),
+    ("Cl", "101-108", "mEq/L", 99), ("CRP", "0.00-0.14", "mg/dL", 1.8),
+    ("BNP", "0-18.4", "pg/mL", 1240), ("HbA1c", "4.9-6.0", "%", 7.6),
+]
+
+PRESCRIPTION_ITEMS = [
+    ("アムロジピン錠5mg「サワイ」", "1錠", "1日1回 朝食後"),
+    ("フロセミド錠20mg「NP」", "1錠", "1日1回 朝食後"),
+    ("スピロノラクトン錠25mg「トーワ」", "1錠", "1日1回 朝食後"),
+    ("ビソプロロールフマル酸塩錠2.5mg「サワイ」", "1錠", "1日1回 朝食後"),
+    ("ランソプラゾールOD錠15mg「トーワ」", "1錠", "1日1回 朝食後"),
+    ("メトホルミン塩酸塩錠250mgMT「DSEP」", "2錠", "1日2回 朝夕食後"),
+    ("酸化マグネシウム錠330mg「ヨシダ」", "2錠", "1日2回 朝夕食後"),
+    ("ロスバスタチン錠2.5mg「DSEP」", "1錠", "1日1回 夕食後"),
+]
+
+
+def _pad(text: str, width: int) -> str:
+    display = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    return text + " " * max(width - display, 1)
+
+
+def build_lab_table(days: int) -> str:
+    dates = [f"2024/04/{day:02d}" for day in range(1, days * 3, 3)]
+    lines = [_pad("検査項目", 12) + _pad("基準値", 12) + _pad("単位", 11) + "".join(_pad(d, 13) for d in dates)]
+    for name, reference, unit, value in LAB_ITEMS:
+        values = [f"{value * (1 - 0.05 * i):.1f}" + (" H" if i == 0 else "") for i in range(len(dates))]
+        lines.append(_pad(name, 12) + _pad(reference, 12) + _pad(unit, 11) + "".join(_pad(v, 13) for v in values))
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def build_prescription() -> str:
+    lines = []
+    for index, (drug, amount, usage) in enumerate(PRESCRIPTION_ITEMS, 1):
+        lines.append(f"Rp{index}  {_pad(drug, 44)}{amount}")
+        lines.append(f"     {_pad(usage, 44)}28日分")
+    return "\n".join(lines)
+
+
+def report(label: str, before: str, after: str):
+    before_tokens = estimate_tokens(before)
+    after_tokens = estimate_tokens(after)
+    reduction = (1 - after_tokens / before_tokens) * 100 if before_tokens else 0
+    print(f"{label:>14}: {len(before):>6}文字/{before_tokens:>6}トークン -> "
+          f"{len(after):>6}文字/{after_tokens:>6}トークン（{reduction:.1f}%削減）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="検査表・処方の圧縮によるトークン削減量を計測するスクリプト")
+    parser.add_argument("-d", "--days", type=int, default=6, help="検査表の採血日数")
+    parser.add_argument("--show", action="store_true", help="圧縮後のテキストを表示する")
+    args = parser.parse_args()
+
+    lab_table = build_lab_table(args.days)
+    prescription = build_prescription()
+
+    compacted_lab = compact_lab_tables(lab_table)
+    compacted_prescription = compact_prescriptions(prescription)
+
+    report("検査表", lab_table, compacted_lab)
+    report("処方", prescription, compacted_prescription)
+    report("検査表(前処理)", lab_table, preprocess_karte(lab_table)["text"])
+    report("処方(前処理)", prescription, preprocess_prescription(prescription)["text"])
+
+    if args.show:
+        print()
+        print(compacted_lab)
+        print()
+        print(compacted_prescription)
+
+
+if __name__ == "__main__":
+    main()
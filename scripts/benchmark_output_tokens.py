@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from external_service.api_factory import APIFactory  # noqa: E402
+from utils.constants import DEFAULT_DOCUMENT_TYPE, DEFAULT_GENERATION_PROFILE, GENERATION_PROFILES  # noqa: E402
+from utils.text_processor import parse_output_summary  # noqa: E402
+
+OUTPUT_OPTIONS = ("prefill_header", "scaffold_sections")
+
+VARIANTS = {
+    "baseline": (),
+    "scaffold": ("scaffold_sections",),
+    "prefill+scaffold": ("prefill_header", "scaffold_sections"),
+}
+
+
+def load_corpus(path: Path, limit: int):
+    records = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return records[:limit] if limit else records
+
+
+def register_variant(name: str, provider: str, base_profile: str) -> str:
+    # 比較対象の出力オプションのみを切り替えた一時的なプロファイルを登録する
+    settings = dict(GENERATION_PROFILES[base_profile].get(provider, {}))
+    settings.update({option: option in VARIANTS[name] for option in OUTPUT_OPTIONS})
+    profile_name = f"benchmark_{name}"
+    GENERATION_PROFILES[profile_name] = {"label": name, provider: settings}
+    return profile_name
+
+
+def replay(record: dict, provider: str, model_name: str, profile_name: str):
+    client = APIFactory.create_client(provider)
+    start = time.perf_counter()
+    summary_text, input_tokens, output_tokens = client.generate_summary(
+        record["medical_text"],
+        record.get("additional_info", ""),
+        record.get("current_prescription", ""),
+        record.get("department", "default"),
+        record.get("document_type", DEFAULT_DOCUMENT_TYPE),
+        record.get("doctor", "default"),
+        model_name,
+        generation_profile=profile_name
+    )
+    elapsed = time.perf_counter() - start
+    filled = sum(1 for content in parse_output_summary(summary_text).values() if content)
+    return output_tokens, input_tokens, elapsed, filled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="出力オプションごとの出力トークン数をカルテのリプレイで計測するスクリプト")
+    parser.add_argument("corpus", help="1行に1件のJSON（medical_text, additional_info, current_prescription, "
+                                       "department, document_type, doctor）を記載したファイル")
+    parser.add_argument("-p", "--provider", choices=["claude", "gemini"], default="claude", help="APIプロバイダー")
+    parser.add_argument("-m", "--model", default=None, help="モデル名（省略時はプロンプト設定・既定モデル）")
+    parser.add_argument("--profile", default=DEFAULT_GENERATION_PROFILE, help="基準とする生成プロファイル")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS),
+                        help="計測する出力オプションの組み合わせ")
+    parser.add_argument("-n", "--limit", type=int, default=0, help="リプレイする件数（0で全件）")
+    args = parser.parse_args()
+
+    records = load_corpus(Path(args.corpus), args.limit)
+    if not records:
+        print("リプレイするカルテがありません")
+        return
+
+    print(f"{len(records)}件 / プロバイダー: {args.provider}")
+    baseline_mean = None
+    for name in args.variants:
+        profile_name = register_variant(name, args.provider, args.profile)
+        results = [replay(record, args.provider, args.model, profile_name) for record in records]
+
+        output_tokens = [result[0] for result in results]
+        mean_output = statistics.mean(output_tokens)
+        if baseline_mean is None:
+            baseline_mean = mean_output
+        reduction = (1 - mean_output / baseline_mean) * 100 if baseline_mean else 0
+
+        print(f"{name:>22}: 出力 平均{mean_output:>7.0f} / 中央値{statistics.median(output_tokens):>7.0f}トークン"
+              f"（{reduction:.1f}%削減） 入力 平均{statistics.mean(r[1] for r in results):>7.0f}トークン "
+              f"所要 平均{statistics.mean(r[2] for r in results):>5.1f}秒 "
+              f"記載あり項目 平均{statistics.mean(r[3] for r in results):.1f}")
+
+
+if __name__ == "__main__":
+    main()
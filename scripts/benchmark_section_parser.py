@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from utils.constants import DEFAULT_SECTION_NAMES  # noqa: E402
+from utils.text_processor import parse_output_summary, section_aliases  # noqa: E402
+
+SECTION_SENTENCES = {
+    "入院期間": ["2024年4月1日～2024年4月28日（28日間）"],
+    "現病歴": [
+        "高血圧症、2型糖尿病で近医通院中の78歳男性。",
+        "入院3日前より労作時呼吸困難が出現し、徐々に増悪したため救急外来を受診した。",
+        "来院時SpO2 88%（室内気）、両側下腿浮腫を認め、うっ血性心不全の診断で入院となった。",
+    ],
+    "入院時検査": [
+        "血液検査: WBC 9800/μL, Hb 11.2 g/dL, Plt 21.3万/μL, BUN 32 mg/dL, Cr 1.42 mg/dL。",
+        "BNP 1240 pg/mL, CRP 1.8 mg/dL, HbA1c 7.6%。",
+        "胸部X線: 心拡大（CTR 62%）、両側胸水、肺うっ血像あり。",
+        "心エコー: LVEF 35%、びまん性壁運動低下、中等度MR。",
+    ],
+    "入院中の治療経過": [
+        "フロセミド静注およびカルペリチド持続静注を開始し、第5病日には酸素投与を終了した。",
+        "体重は入院時68.4kgから62.1kgまで減少し、下腿浮腫は消失した。",
+        "第10病日よりサクビトリルバルサルタン、ビソプロロール、スピロノラクトンを導入し漸増した。",
+        "心臓リハビリテーションを実施し、病棟内独歩自立となった。",
+        "糖尿病についてはSGLT2阻害薬を追加し、血糖コントロールは良好となった。",
+    ],
+    "退院申し送り": [
+        "退院後2週間で外来再診予定。体重・血圧手帳の記録を指導済み。",
+        "腎機能とカリウム値のフォローをお願いします。",
+    ],
+    "備考": ["キーパーソンは長女。介護保険申請中。"],
+}
+
+
+def build_sample_output(repeat: int) -> str:
+    lines = []
+    for section in DEFAULT_SECTION_NAMES:
+        lines.append(f"【{section}】")
+        sentences = SECTION_SENTENCES.get(section, ["特記事項なし。"])
+        times = 1 if section == "入院期間" else repeat
+        for _ in range(times):
+            lines.extend(sentences)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def legacy_parse_output_summary(summary_text):
+    # 比較用: 単一パス化以前の実装
+    sections = {section: "" for section in DEFAULT_SECTION_NAMES}
+    lines = summary_text.split('\n')
+    current_section = None
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        found_section = False
+
+        for section in DEFAULT_SECTION_NAMES:
+            if line == section or (line.startswith(section) and len(line.replace(section, "").strip()) < 100):
+                current_section = section
+                content = line.replace(section, "").replace(":", "").replace("：", "").strip()
+                if content:
+                    sections[current_section] = content
+                found_section = True
+                break
+
+        if not found_section:
+            for alias, target_section in section_aliases.items():
+                if line.startswith(alias) or line == alias:
+                    current_section = target_section
+                    content = line.replace(alias, "").replace(":", "").replace("：", "").strip()
+                    if content:
+                        sections[current_section] = content
+                    found_section = True
+                    break
+
+        if current_section and line and not found_section:
+            if sections[current_section]:
+                sections[current_section] += "\n" + line
+            else:
+                sections[current_section] = line
+
+    return sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="セクション解析処理のマイクロベンチマーク")
+    parser.add_argument("-r", "--repeat", type=int, default=20, help="各セクション本文の繰り返し回数（20で約6kトークン相当）")
+    parser.add_argument("-n", "--number", type=int, default=200, help="計測あたりの実行回数")
+    args = parser.parse_args()
+
+    sample = build_sample_output(args.repeat)
+    print(f"サンプル: {len(sample)}文字 / {sample.count(chr(10)) + 1}行（bracket見出し）")
+
+    parse_output_summary(sample)
+    for name, func in [("legacy", legacy_parse_output_summary), ("compiled", parse_output_summary)]:
+        seconds = min(timeit.repeat(lambda: func(sample), number=args.number, repeat=5))
+        print(f"{name:>9}: {seconds / args.number * 1000:.3f} ms/回")
+
+    legacy = legacy_parse_output_summary(sample)
+    compiled = parse_output_summary(sample)
+    filled_legacy = sum(1 for v in legacy.values() if v)
+    filled_compiled = sum(1 for v in compiled.values() if v)
+    print(f"抽出できたセクション数: legacy={filled_legacy}/{len(legacy)}, compiled={filled_compiled}/{len(compiled)}")
+
+
+if __name__ == "__main__":
+    main()
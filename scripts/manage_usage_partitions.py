@@ -0,0 +1,67 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db import DatabaseManager  # noqa: E402
+from database.partitioning import (  # noqa: E402
+    apply_retention, convert_to_partitioned, ensure_partitions, is_partitioned, list_partitions
+)
+from utils.config import USAGE_ARCHIVE_DIR, USAGE_PARTITION_MONTHS_AHEAD, USAGE_RETENTION_MONTHS  # noqa: E402
+from utils.exceptions import AppError  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="使用統計テーブル（summary_usage）の月別パーティションを管理するスクリプト"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="既存のテーブルを月別パーティションへ移行する")
+    convert_parser.add_argument("--months-ahead", type=int, default=USAGE_PARTITION_MONTHS_AHEAD,
+                                help="当月より先に作成しておく月数")
+
+    ensure_parser = subparsers.add_parser("ensure", help="当月以降のパーティションを作成する（定期実行用）")
+    ensure_parser.add_argument("--months-ahead", type=int, default=USAGE_PARTITION_MONTHS_AHEAD,
+                               help="当月より先に作成しておく月数")
+
+    retention_parser = subparsers.add_parser("retention", help="保存期間を過ぎたパーティションを切り離す")
+    retention_parser.add_argument("--months", type=int, default=USAGE_RETENTION_MONTHS,
+                                  help="当月を除いて残す月数（0の場合は何もしない）")
+    retention_parser.add_argument("--archive-dir", default=USAGE_ARCHIVE_DIR,
+                                  help="切り離したパーティションをCSV(gzip)で書き出すディレクトリ")
+
+    subparsers.add_parser("list", help="パーティションの一覧を表示する")
+    args = parser.parse_args()
+
+    try:
+        engine = DatabaseManager.get_instance().get_engine()
+
+        if args.command == "convert":
+            count = convert_to_partitioned(engine, args.months_ahead)
+            print(f"{count}件の使用統計をパーティションへ移行しました")
+        elif args.command == "ensure":
+            created = ensure_partitions(engine, args.months_ahead)
+            print(f"{len(created)}件のパーティションを作成しました")
+        elif args.command == "retention":
+            archived = apply_retention(engine, args.months, args.archive_dir)
+            for name in archived:
+                print(f"切り離しました: {name}")
+            print(f"{len(archived)}件のパーティションを切り離しました")
+        else:
+            with engine.connect() as conn:
+                if not is_partitioned(conn):
+                    print("summary_usage はパーティション化されていません")
+                    return 0
+                for name in list_partitions(conn):
+                    print(name)
+    except AppError as e:
+        print(f"エラーが発生しました: {str(e)}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
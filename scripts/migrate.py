@@ -0,0 +1,45 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db import DatabaseManager  # noqa: E402
+from database.migrations import LATEST_SCHEMA_VERSION, get_schema_version, migrate  # noqa: E402
+from utils.exceptions import AppError  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="データベースのスキーマを最新のバージョンへ更新するスクリプト（デプロイ時のrelease処理で実行）"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="更新は行わず、スキーマが最新でない場合に終了コード1を返す"
+    )
+    args = parser.parse_args()
+
+    try:
+        db_manager = DatabaseManager.get_instance()
+        engine = db_manager.get_engine()
+
+        if args.check:
+            version = get_schema_version(engine)
+            print(f"スキーマバージョン: {version}（最新: {LATEST_SCHEMA_VERSION}）")
+            return 0 if version >= LATEST_SCHEMA_VERSION else 1
+
+        applied = migrate(engine, db_manager.get_session_factory())
+        if applied:
+            print(f"マイグレーションを適用しました: {', '.join(str(version) for version in applied)}")
+        else:
+            print("スキーマは最新です")
+    except AppError as e:
+        print(f"エラーが発生しました: {str(e)}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
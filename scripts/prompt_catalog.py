@@ -0,0 +1,72 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db import get_prompt_repository  # noqa: E402
+from utils.exceptions import AppError  # noqa: E402
+from utils.prompt_io import detect_format, read_prompts, write_prompts  # noqa: E402
+
+
+def export_prompts(path: str, file_format: Optional[str] = None) -> int:
+    file_format = file_format or detect_format(path)
+    repository = get_prompt_repository()
+
+    if path == "-":
+        return write_prompts(repository.iter_all(), sys.stdout, file_format)
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        return write_prompts(repository.iter_all(), f, file_format)
+
+
+def import_prompts(path: str, update_existing: bool) -> int:
+    file_format = detect_format(path)
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = read_prompts(f, file_format)
+
+    return get_prompt_repository().bulk_upsert_prompts(rows, update_existing=update_existing)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="プロンプトカタログをCSV/YAMLで一括インポート・エクスポートするスクリプト"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="プロンプトをファイルへ書き出す")
+    export_parser.add_argument("path", help="出力ファイル (.csv / .yaml / .yml、- で標準出力)")
+    export_parser.add_argument(
+        "--format",
+        choices=["csv", "yaml"],
+        help="出力形式 (デフォルト: 拡張子から判定)"
+    )
+
+    import_parser = subparsers.add_parser("import", help="ファイルからプロンプトを一括登録する")
+    import_parser.add_argument("path", help="入力ファイル (.csv / .yaml / .yml)")
+    import_parser.add_argument(
+        "--update",
+        action="store_true",
+        help="既存プロンプトの内容とモデルを上書きする (デフォルト: 既存はスキップ)"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            count = export_prompts(args.path, args.format)
+            print(f"{count}件のプロンプトをエクスポートしました", file=sys.stderr)
+        else:
+            count = import_prompts(args.path, args.update)
+            print(f"{count}件のプロンプトを登録しました")
+    except AppError as e:
+        print(f"エラーが発生しました: {str(e)}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
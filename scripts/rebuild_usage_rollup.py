@@ -0,0 +1,46 @@
+import argparse
+import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db import get_usage_statistics_repository  # noqa: E402
+from database.repositories import JST  # noqa: E402
+from utils.exceptions import AppError  # noqa: E402
+
+
+def parse_date(value: str) -> datetime.date:
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="使用統計の明細から日次集計（summary_usage_daily）を作り直すスクリプト"
+    )
+    parser.add_argument("--start", type=parse_date, help="開始日 YYYY-MM-DD (デフォルト: 残っている最初の記録から。切り離した月の日次集計は残す)")
+    parser.add_argument("--end", type=parse_date, help="終了日 YYYY-MM-DD (デフォルト: 最後の記録まで)")
+    parser.add_argument(
+        "--days",
+        type=int,
+        help="今日を含む直近の日数を作り直す（定期実行用、--start/--endより優先）"
+    )
+    args = parser.parse_args()
+
+    start, end = args.start, args.end
+    if args.days:
+        end = datetime.datetime.now(JST).date()
+        start = end - datetime.timedelta(days=args.days - 1)
+
+    try:
+        count = get_usage_statistics_repository().rebuild_daily_rollups(start, end)
+        print(f"{count}件の日次集計を作成しました")
+    except AppError as e:
+        print(f"エラーが発生しました: {str(e)}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
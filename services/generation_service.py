@@ -2,15 +2,21 @@ import datetime
 import queue
 import threading
 import time
-from typing import Dict, Any
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional
 
 import streamlit as st
 
-from external_service.api_factory import generate_summary
+from external_service.api_factory import generate_summary_with_usage, refine_summary, regenerate_section
 from services.model_service import ModelService
 from services.validation_service import ValidationService
-from utils.constants import DEFAULT_DOCUMENT_TYPE
-from utils.text_processor import format_output_summary, parse_output_summary
+from utils.config import CONTEXT_SELECTION, CONTEXT_TOKEN_BUDGET, RULE_BASED_SECTIONS, SECTION_COMPLETENESS_CHECK
+from utils.constants import DEFAULT_DOCUMENT_TYPE, REQUIRED_SECTION_NAMES
+from utils.context_selector import select_context
+from utils.karte_preprocessor import preprocess_karte, preprocess_prescription
+from utils.rule_based_sections import extract_rule_based_sections
+from utils.structured_output import parse_structured_summary, render_structured_summary
+from utils.text_processor import format_output_summary, parse_output_summary, splice_section
 
 
 class GenerationService:
@@ -21,25 +27,61 @@ class GenerationService:
                              additional_info: str = "", current_prescription: str = "",
                              selected_document_type: str = DEFAULT_DOCUMENT_TYPE,
                              selected_doctor: str = "default",
-                             model_explicitly_selected: bool = False) -> None:
+                             model_explicitly_selected: bool = False,
+                             preparation: Optional[Future] = None) -> None:
         try:
-            generation_params = GenerationService.prepare_generation_parameters(
-                selected_department, selected_document_type, selected_doctor,
-                selected_model, model_explicitly_selected, input_text, additional_info
-            )
+            preparation_result = GenerationService.resolve_preparation(preparation)
+            if preparation_result is not None:
+                prepared = preparation_result["prepared"]
+                generation_params = preparation_result["generation_params"]
+            else:
+                prepared = GenerationService.prepare_input(
+                    input_text, current_prescription, additional_info, selected_department
+                )
+                generation_params = GenerationService.prepare_generation_parameters(
+                    selected_department, selected_document_type, selected_doctor,
+                    selected_model, model_explicitly_selected, prepared["input_text"], additional_info
+                )
+
+            input_text = prepared["input_text"]
+            current_prescription = prepared["current_prescription"]
+            prefilled_sections = prepared["prefilled_sections"]
 
             api_result = GenerationService.execute_api_generation(
                 generation_params['provider'], generation_params['model_name'],
                 input_text, additional_info, current_prescription,
                 generation_params['normalized_dept'], generation_params['normalized_doc_type'],
-                selected_doctor
+                selected_doctor, prefilled_sections, generation_params['generation_profile']
             )
 
             result = GenerationService.format_generation_result(
                 api_result['output_summary'], api_result['input_tokens'], api_result['output_tokens'],
                 generation_params['model_detail'], generation_params['model_switched'],
-                generation_params['original_model']
+                generation_params['original_model'], prefilled_sections
             )
+            result["input_chars_saved"] = prepared["chars_saved"]
+            result["input_tokens_saved"] = prepared["tokens_saved"]
+            result["dropped_entries"] = prepared["dropped_entries"]
+            result["continuation_count"] = api_result['continuation_count']
+            result["regenerated_sections"] = []
+
+            # 空欄の項目は全体を作り直さず、その項目のみを再作成する
+            if SECTION_COMPLETENESS_CHECK:
+                empty_sections = GenerationService.find_empty_sections(
+                    result["parsed_summary"], generation_params['normalized_doc_type'], prefilled_sections
+                )
+                for section in empty_sections:
+                    try:
+                        result = GenerationService.execute_section_regeneration(
+                            section, result, generation_params, input_text, additional_info,
+                            current_prescription, selected_doctor
+                        )
+                    except Exception as e:
+                        # 再作成に失敗しても、作成済みの文書はそのまま返す
+                        print(f"{section}の再作成に失敗しました: {str(e)}")
+                        continue
+                    if result["parsed_summary"].get(section, "").strip():
+                        result["regenerated_sections"].append(section)
 
             result_queue.put(result)
 
@@ -49,6 +91,44 @@ class GenerationService:
                 "error": str(e)
             })
 
+    @staticmethod
+    def resolve_preparation(preparation: Optional[Future]) -> Optional[Dict[str, Any]]:
+        if preparation is None:
+            return None
+
+        try:
+            return preparation.result()
+        except Exception:
+            # 事前準備で発生したエラーは作成時に改めて準備し直して表示する
+            return None
+
+    @staticmethod
+    def prepare_input(input_text: str, current_prescription: str,
+                      additional_info: str, selected_department: str) -> Dict[str, Any]:
+        preprocessing = preprocess_karte(input_text, selected_department)
+        prescription_preprocessing = preprocess_prescription(current_prescription, selected_department)
+        input_text = preprocessing["text"]
+
+        # 記載選択で日付の記載が除外される前に抽出する
+        prefilled_sections = {}
+        if RULE_BASED_SECTIONS:
+            prefilled_sections = extract_rule_based_sections(input_text, additional_info)
+
+        dropped_entries = []
+        if CONTEXT_SELECTION:
+            selection = select_context(input_text, CONTEXT_TOKEN_BUDGET)
+            input_text = selection["text"]
+            dropped_entries = selection["dropped"]
+
+        return {
+            "input_text": input_text,
+            "current_prescription": prescription_preprocessing["text"],
+            "prefilled_sections": prefilled_sections,
+            "dropped_entries": dropped_entries,
+            "chars_saved": preprocessing["chars_saved"] + prescription_preprocessing["chars_saved"],
+            "tokens_saved": preprocessing["tokens_saved"] + prescription_preprocessing["tokens_saved"],
+        }
+
     @staticmethod
     def prepare_generation_parameters(selected_department: str, selected_document_type: str,
                                     selected_doctor: str, selected_model: str,
@@ -66,6 +146,10 @@ class GenerationService:
         provider, model_name = ModelService.get_provider_and_model(final_model)
         ValidationService.validate_api_credentials_for_provider(provider)
 
+        generation_profile = ModelService.get_generation_profile(
+            normalized_dept, normalized_doc_type, selected_doctor
+        )
+
         model_detail = model_name if provider == "gemini" else final_model
 
         return {
@@ -75,15 +159,18 @@ class GenerationService:
             'model_name': model_name,
             'model_detail': model_detail,
             'model_switched': model_switched,
-            'original_model': original_model
+            'original_model': original_model,
+            'generation_profile': generation_profile
         }
 
     @staticmethod
     def execute_api_generation(provider: str, model_name: str, input_text: str,
                              additional_info: str, current_prescription: str,
                              normalized_dept: str, normalized_doc_type: str,
-                             selected_doctor: str) -> Dict[str, Any]:
-        output_summary, input_tokens, output_tokens = generate_summary(
+                             selected_doctor: str,
+                             prefilled_sections: Optional[Dict[str, str]] = None,
+                             generation_profile: Optional[str] = None) -> Dict[str, Any]:
+        output_summary, input_tokens, output_tokens, continuation_count = generate_summary_with_usage(
             provider=provider,
             medical_text=input_text,
             additional_info=additional_info,
@@ -91,21 +178,34 @@ class GenerationService:
             department=normalized_dept,
             document_type=normalized_doc_type,
             doctor=selected_doctor,
-            model_name=model_name
+            model_name=model_name,
+            prefilled_sections=prefilled_sections,
+            generation_profile=generation_profile
         )
 
         return {
             'output_summary': output_summary,
             'input_tokens': input_tokens,
-            'output_tokens': output_tokens
+            'output_tokens': output_tokens,
+            'continuation_count': continuation_count
         }
 
     @staticmethod
     def format_generation_result(output_summary: str, input_tokens: int, output_tokens: int,
                                model_detail: str, model_switched: bool,
-                               original_model: str) -> Dict[str, Any]:
-        formatted_summary = format_output_summary(output_summary)
-        parsed_summary = parse_output_summary(formatted_summary)
+                               original_model: str,
+                               prefilled_sections: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        parsed_summary = parse_structured_summary(output_summary)
+
+        if parsed_summary is not None:
+            formatted_summary = render_structured_summary(parsed_summary)
+        else:
+            formatted_summary = format_output_summary(output_summary)
+            parsed_summary = parse_output_summary(formatted_summary)
+
+        for section, content in (prefilled_sections or {}).items():
+            formatted_summary = splice_section(formatted_summary, section, content)
+            parsed_summary[section] = content
 
         return {
             "success": True,
@@ -118,6 +218,133 @@ class GenerationService:
             "original_model": original_model if model_switched else None
         }
 
+    @staticmethod
+    def find_empty_sections(parsed_summary: Dict[str, str], document_type: str,
+                            prefilled_sections: Optional[Dict[str, str]] = None) -> List[str]:
+        prefilled = prefilled_sections or {}
+        return [
+            section for section in REQUIRED_SECTION_NAMES.get(document_type, [])
+            if section not in prefilled and not parsed_summary.get(section, "").strip()
+        ]
+
+    @staticmethod
+    def execute_section_regeneration(section: str, result: Dict[str, Any],
+                                     generation_params: Dict[str, Any], input_text: str,
+                                     additional_info: str, current_prescription: str,
+                                     selected_doctor: str) -> Dict[str, Any]:
+        content, input_tokens, output_tokens = regenerate_section(
+            generation_params['provider'],
+            section,
+            input_text,
+            additional_info=additional_info,
+            current_prescription=current_prescription,
+            other_sections=result["parsed_summary"],
+            department=generation_params['normalized_dept'],
+            document_type=generation_params['normalized_doc_type'],
+            doctor=selected_doctor,
+            model_name=generation_params['model_name']
+        )
+
+        if not content.strip():
+            return {
+                **result,
+                "input_tokens": result["input_tokens"] + input_tokens,
+                "output_tokens": result["output_tokens"] + output_tokens,
+            }
+
+        parsed_summary = dict(result["parsed_summary"])
+        parsed_summary[section] = content
+
+        return {
+            **result,
+            "output_summary": splice_section(result["output_summary"], section, content),
+            "parsed_summary": parsed_summary,
+            "input_tokens": result["input_tokens"] + input_tokens,
+            "output_tokens": result["output_tokens"] + output_tokens,
+        }
+
+    @staticmethod
+    def regenerate_section_task(section: str, input_text: str, additional_info: str,
+                                current_prescription: str, output_summary: str,
+                                parsed_summary: Dict[str, str], selected_department: str,
+                                selected_model: str, selected_document_type: str = DEFAULT_DOCUMENT_TYPE,
+                                selected_doctor: str = "default",
+                                model_explicitly_selected: bool = False) -> Dict[str, Any]:
+        try:
+            prepared = GenerationService.prepare_input(
+                input_text, current_prescription, additional_info, selected_department
+            )
+
+            generation_params = GenerationService.prepare_generation_parameters(
+                selected_department, selected_document_type, selected_doctor,
+                selected_model, model_explicitly_selected, prepared["input_text"], additional_info
+            )
+
+            result = GenerationService.execute_section_regeneration(
+                section,
+                {
+                    "success": True,
+                    "output_summary": output_summary,
+                    "parsed_summary": parsed_summary,
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                    "model_detail": generation_params['model_detail'],
+                },
+                generation_params, prepared["input_text"], additional_info,
+                prepared["current_prescription"], selected_doctor
+            )
+            result["regenerated_sections"] = [section]
+            return result
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    @staticmethod
+    def refine_summary_task(instruction: str, input_text: str, additional_info: str,
+                            current_prescription: str, output_summary: str,
+                            selected_department: str, selected_model: str,
+                            selected_document_type: str = DEFAULT_DOCUMENT_TYPE,
+                            selected_doctor: str = "default",
+                            model_explicitly_selected: bool = False) -> Dict[str, Any]:
+        try:
+            prepared = GenerationService.prepare_input(
+                input_text, current_prescription, additional_info, selected_department
+            )
+
+            generation_params = GenerationService.prepare_generation_parameters(
+                selected_department, selected_document_type, selected_doctor,
+                selected_model, model_explicitly_selected, prepared["input_text"], additional_info
+            )
+
+            refined_summary, input_tokens, output_tokens = refine_summary(
+                generation_params['provider'],
+                output_summary,
+                instruction,
+                prepared["input_text"],
+                additional_info=additional_info,
+                current_prescription=prepared["current_prescription"],
+                department=generation_params['normalized_dept'],
+                document_type=generation_params['normalized_doc_type'],
+                doctor=selected_doctor,
+                model_name=generation_params['model_name'],
+                generation_profile=generation_params['generation_profile']
+            )
+
+            return GenerationService.format_generation_result(
+                refined_summary, input_tokens, output_tokens,
+                generation_params['model_detail'], generation_params['model_switched'],
+                generation_params['original_model'], prepared["prefilled_sections"]
+            )
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
     @staticmethod
     def display_progress_with_timer(thread: threading.Thread,
                                   placeholder: st.empty,
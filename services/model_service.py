@@ -4,6 +4,7 @@ from utils.config import (ANTHROPIC_MODEL, GOOGLE_CREDENTIALS_JSON,
                           GEMINI_MODEL, MAX_TOKEN_THRESHOLD)
 from utils.constants import DEFAULT_DEPARTMENT, DOCUMENT_TYPES, MESSAGES
 from utils.exceptions import APIError
+from utils.generation_profiles import resolve_generation_profile
 from utils.prompt_manager import get_prompt_manager
 
 
@@ -33,6 +34,13 @@ class ModelService:
 
         return prompt_selected_model or selected_model
 
+    @staticmethod
+    def get_generation_profile(department: str, document_type: str, doctor: str) -> str:
+        prompt_data = get_prompt_manager().get_prompt(department, document_type, doctor)
+        prompt_profile = prompt_data.get("generation_profile") if prompt_data else None
+
+        return resolve_generation_profile(document_type, prompt_profile)
+
     @staticmethod
     def check_model_switching_for_token_limit(selected_model: str, input_text: str,
                                             additional_info: str) -> Tuple[str, bool, str]:
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from services.generation_service import GenerationService
+from utils.config import MIN_INPUT_TOKENS, PREPARATION_CACHE_SIZE
+from utils.token_estimator import estimate_tokens
+
+
+class PreparationService:
+
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="preparation")
+    _cache: "OrderedDict[str, Future]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def build_key(input_text: str, additional_info: str, current_prescription: str,
+                  session_params: Dict[str, Any]) -> str:
+        parts = [
+            input_text or "",
+            additional_info or "",
+            current_prescription or "",
+            str(session_params["selected_department"]),
+            str(session_params["selected_document_type"]),
+            str(session_params["selected_doctor"]),
+            str(session_params["selected_model"]),
+            str(session_params["model_explicitly_selected"]),
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def prepare(input_text: str, additional_info: str, current_prescription: str,
+                session_params: Dict[str, Any]) -> Dict[str, Any]:
+        prepared = GenerationService.prepare_input(
+            input_text, current_prescription, additional_info, session_params["selected_department"]
+        )
+
+        generation_params = GenerationService.prepare_generation_parameters(
+            session_params["selected_department"], session_params["selected_document_type"],
+            session_params["selected_doctor"], session_params["selected_model"],
+            session_params["model_explicitly_selected"], prepared["input_text"], additional_info
+        )
+
+        return {"prepared": prepared, "generation_params": generation_params}
+
+    @staticmethod
+    def start_preparation(input_text: str, additional_info: str, current_prescription: str,
+                          session_params: Dict[str, Any]) -> Optional[Future]:
+        if estimate_tokens((input_text or "").strip()) < MIN_INPUT_TOKENS:
+            return None
+
+        key = PreparationService.build_key(input_text, additional_info, current_prescription, session_params)
+
+        with PreparationService._lock:
+            future = PreparationService._cache.get(key)
+            if future is not None:
+                PreparationService._cache.move_to_end(key)
+                return future
+
+            future = PreparationService._executor.submit(
+                PreparationService.prepare, input_text, additional_info, current_prescription, session_params
+            )
+            PreparationService._cache[key] = future
+            while len(PreparationService._cache) > PREPARATION_CACHE_SIZE:
+                PreparationService._cache.popitem(last=False)
+
+        return future
+
+    @staticmethod
+    def take_preparation(input_text: str, additional_info: str, current_prescription: str,
+                         session_params: Dict[str, Any]) -> Optional[Future]:
+        # プロンプト設定の変更後に古い準備結果を使わないよう、一度使った結果は破棄する
+        key = PreparationService.build_key(input_text, additional_info, current_prescription, session_params)
+        with PreparationService._lock:
+            return PreparationService._cache.pop(key, None)
+
+    @staticmethod
+    def clear() -> None:
+        with PreparationService._lock:
+            PreparationService._cache.clear()
@@ -1,4 +1,5 @@
 import datetime
+import uuid
 from typing import Dict, Any
 
 import pytz
@@ -6,7 +7,9 @@ import streamlit as st
 
 from database.db import get_usage_statistics_repository
 from database.repositories import UsageStatisticsRepository
-from utils.constants import APP_TYPE
+from utils.config import USAGE_RECORDER
+from utils.constants import APP_TYPE, MESSAGES
+from utils.usage_recorder import get_usage_recorder
 
 JST = pytz.timezone('Asia/Tokyo')
 
@@ -17,7 +20,6 @@ class StatisticsService:
     def save_usage_to_database(result: Dict[str, Any],
                              session_params: Dict[str, Any]) -> None:
         try:
-            usage_repo: UsageStatisticsRepository = get_usage_statistics_repository()
             now_jst = datetime.datetime.now().astimezone(JST)
 
             usage_data = {
@@ -30,9 +32,19 @@ class StatisticsService:
                 "input_tokens": result["input_tokens"],
                 "output_tokens": result["output_tokens"],
                 "total_tokens": result["input_tokens"] + result["output_tokens"],
-                "processing_time": round(result["processing_time"])
+                "processing_time": round(result["processing_time"]),
+                "input_chars_saved": result.get("input_chars_saved", 0),
+                "input_tokens_saved": result.get("input_tokens_saved", 0),
+                "continuation_count": result.get("continuation_count", 0),
+                "request_id": uuid.uuid4().hex
             }
 
+            # 使用統計の保存は作成結果の表示を待たせないよう、バックグラウンドでまとめて書き込む
+            if USAGE_RECORDER:
+                get_usage_recorder().record(usage_data)
+                return
+
+            usage_repo: UsageStatisticsRepository = get_usage_statistics_repository()
             usage_repo.save_usage(usage_data)
 
         except Exception as db_error:
@@ -43,6 +55,14 @@ class StatisticsService:
                             session_params: Dict[str, Any]) -> None:
         st.session_state.output_summary = result["output_summary"]
         st.session_state.parsed_summary = result["parsed_summary"]
+        st.session_state.input_reduction = {
+            "chars_saved": result.get("input_chars_saved", 0),
+            "tokens_saved": result.get("input_tokens_saved", 0),
+        }
+        st.session_state.dropped_entries = result.get("dropped_entries", [])
+
+        if result.get("regenerated_sections"):
+            st.info(MESSAGES["SECTIONS_REGENERATED"].format(sections="、".join(result["regenerated_sections"])))
 
         if result.get("model_switched"):
             st.info(f"⚠️ 入力テキストが長いため{result['original_model']} からGemini_Proに切り替えました")
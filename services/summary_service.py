@@ -1,15 +1,31 @@
+import contextvars
 import datetime
+from contextlib import contextmanager
 import queue
 import threading
 from typing import Dict, Any
 
 import streamlit as st
 
+from database.unit_of_work import unit_of_work
 from services.generation_service import GenerationService
+from services.preparation_service import PreparationService
 from services.statistics_service import StatisticsService
 from services.validation_service import ValidationService
+from utils.config import SPECULATIVE_PREPARATION
+from utils.constants import MESSAGES
 from utils.error_handlers import handle_error
-from utils.exceptions import APIError
+from utils.exceptions import APIError, DatabaseCommitError
+
+
+@contextmanager
+def request_unit_of_work():
+    # 作成結果は表示済みのため、最後のコミット（使用統計の保存）の失敗は警告にとどめる
+    try:
+        with unit_of_work():
+            yield
+    except DatabaseCommitError as e:
+        st.warning(f"データベース保存中にエラーが発生しました: {str(e)}")
 
 
 class SummaryService:
@@ -22,11 +38,94 @@ class SummaryService:
         ValidationService.validate_inputs(input_text)
         session_params = SummaryService.get_session_parameters()
 
-        result = SummaryService.execute_summary_generation(
-            input_text, additional_info, current_prescription, session_params
-        )
+        # プロンプトの参照から使用統計の保存までを1つのセッションで行い、最後に1回だけコミットする
+        with request_unit_of_work():
+            result = SummaryService.execute_summary_generation(
+                input_text, additional_info, current_prescription, session_params
+            )
 
-        SummaryService.handle_generation_result(result, session_params)
+            SummaryService.handle_generation_result(result, session_params)
+
+    @staticmethod
+    @handle_error
+    def process_section_regeneration(section: str) -> None:
+        session_params = SummaryService.get_session_parameters()
+        start_time = datetime.datetime.now()
+
+        with request_unit_of_work():
+            with st.spinner(MESSAGES["SECTION_REGENERATING"].format(section=section)):
+                result = GenerationService.regenerate_section_task(
+                    section,
+                    st.session_state.input_text,
+                    st.session_state.additional_info,
+                    st.session_state.current_prescription,
+                    st.session_state.output_summary,
+                    st.session_state.parsed_summary,
+                    session_params["selected_department"],
+                    session_params["selected_model"],
+                    session_params["selected_document_type"],
+                    session_params["selected_doctor"],
+                    session_params["model_explicitly_selected"]
+                )
+
+            if not result["success"]:
+                raise APIError(f"{section}の再作成中にエラーが発生しました: {result['error']}")
+
+            result["processing_time"] = (datetime.datetime.now() - start_time).total_seconds()
+            st.session_state.output_summary = result["output_summary"]
+            st.session_state.parsed_summary = result["parsed_summary"]
+            StatisticsService.save_usage_to_database(result, session_params)
+        st.rerun()
+
+    @staticmethod
+    @handle_error
+    def process_refinement(instruction: str) -> None:
+        if not instruction.strip():
+            st.warning(MESSAGES["REFINEMENT_EMPTY"])
+            return
+
+        session_params = SummaryService.get_session_parameters()
+        start_time = datetime.datetime.now()
+
+        with request_unit_of_work():
+            with st.spinner(MESSAGES["SUMMARY_REFINING"]):
+                result = GenerationService.refine_summary_task(
+                    instruction.strip(),
+                    st.session_state.input_text,
+                    st.session_state.additional_info,
+                    st.session_state.current_prescription,
+                    st.session_state.output_summary,
+                    session_params["selected_department"],
+                    session_params["selected_model"],
+                    session_params["selected_document_type"],
+                    session_params["selected_doctor"],
+                    session_params["model_explicitly_selected"]
+                )
+
+            if not result["success"]:
+                raise APIError(f"修正中にエラーが発生しました: {result['error']}")
+
+            result["processing_time"] = (datetime.datetime.now() - start_time).total_seconds()
+            st.session_state.output_summary = result["output_summary"]
+            st.session_state.parsed_summary = result["parsed_summary"]
+            st.session_state.summary_generation_time = result["processing_time"]
+            StatisticsService.save_usage_to_database(result, session_params)
+        st.rerun()
+
+    @staticmethod
+    def start_background_preparation() -> None:
+        if not SPECULATIVE_PREPARATION:
+            return
+
+        try:
+            PreparationService.start_preparation(
+                st.session_state.get("input_text", ""),
+                st.session_state.get("additional_info", ""),
+                st.session_state.get("current_prescription", ""),
+                SummaryService.get_session_parameters()
+            )
+        except Exception as e:
+            print(f"事前準備の開始に失敗しました: {str(e)}")
 
     @staticmethod
     def get_session_parameters() -> Dict[str, Any]:
@@ -64,10 +163,15 @@ class SummaryService:
         start_time = datetime.datetime.now()
         status_placeholder = st.empty()
         result_queue = queue.Queue()
+        preparation = PreparationService.take_preparation(
+            input_text, additional_info, current_prescription, session_params
+        )
 
+        # 作成用のスレッドでも呼び出し元の作業単位を使用するよう、コンテキストを引き継ぐ
         summary_thread = threading.Thread(
-            target=GenerationService.generate_summary_task,
+            target=contextvars.copy_context().run,
             args=(
+                GenerationService.generate_summary_task,
                 input_text,
                 session_params["selected_department"],
                 session_params["selected_model"],
@@ -76,7 +180,8 @@ class SummaryService:
                 current_prescription,
                 session_params["selected_document_type"],
                 session_params["selected_doctor"],
-                session_params["model_explicitly_selected"]
+                session_params["model_explicitly_selected"],
+                preparation
             ),
         )
         summary_thread.start()
@@ -0,0 +1,157 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from database.migrations import (
+    LATEST_SCHEMA_VERSION, MIGRATIONS, _add_missing_columns, _backfill_model_family, _create_missing_indexes,
+    _ensure_usage_partitions, check_schema_version, get_schema_version, migrate
+)
+from utils.exceptions import DatabaseError
+
+
+def _engine_and_factory():
+    engine = create_engine("sqlite://")
+    return engine, sessionmaker(bind=engine)
+
+
+class TestMigrate:
+
+    def test_versions_are_sequential(self):
+        assert [version for version, _, _ in MIGRATIONS] == list(range(1, LATEST_SCHEMA_VERSION + 1))
+
+    def test_applies_pending_migrations_once(self):
+        engine, session_factory = _engine_and_factory()
+        upgrades = [Mock(), Mock()]
+
+        with patch('database.migrations.MIGRATIONS', [(1, "first", upgrades[0]), (2, "second", upgrades[1])]):
+            assert migrate(engine, session_factory) == [1, 2]
+            assert migrate(engine, session_factory) == []
+
+        upgrades[0].assert_called_once_with(engine, session_factory)
+        upgrades[1].assert_called_once_with(engine, session_factory)
+        assert get_schema_version(engine) == 2
+
+    def test_failed_migration_is_not_recorded(self):
+        engine, session_factory = _engine_and_factory()
+        failing = Mock(side_effect=Exception("DDLエラー"))
+
+        with patch('database.migrations.MIGRATIONS', [(1, "first", Mock()), (2, "second", failing)]):
+            with pytest.raises(DatabaseError) as exc_info:
+                migrate(engine, session_factory)
+
+        assert "マイグレーション2（second）に失敗しました" in str(exc_info.value)
+        assert get_schema_version(engine) == 1
+
+    def test_daily_rollups_built_regardless_of_usage_rollup(self):
+        engine, session_factory = _engine_and_factory()
+        with patch('database.migrations.MIGRATIONS', MIGRATIONS[:1]):
+            migrate(engine, session_factory)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO summary_usage (date, model_detail, input_tokens, output_tokens, total_tokens, "
+                "processing_time, request_id) VALUES ('2025-03-10 12:00:00', 'claude', 100, 50, 150, 20, 'a')"
+            ))
+
+        migrate(engine, session_factory)
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT SUM(count) FROM summary_usage_daily")).scalar() == 1
+
+    @patch('database.migrations.ensure_partitions', side_effect=Exception("permission denied"))
+    def test_partition_failure_is_database_error(self, mock_ensure_partitions):
+        engine = Mock()
+        engine.dialect.name = 'postgresql'
+
+        with pytest.raises(DatabaseError) as exc_info:
+            _ensure_usage_partitions(engine)
+
+        assert "使用統計のパーティションの作成に失敗しました" in str(exc_info.value)
+
+    def test_version_is_zero_without_table(self):
+        engine, _ = _engine_and_factory()
+
+        assert get_schema_version(engine) == 0
+
+
+class TestCheckSchemaVersion:
+
+    @patch('database.migrations.get_schema_version', return_value=LATEST_SCHEMA_VERSION)
+    def test_current_schema(self, mock_version, capsys):
+        assert check_schema_version(Mock()) is True
+        assert capsys.readouterr().out == ""
+
+    @patch('database.migrations.get_schema_version', return_value=0)
+    def test_outdated_schema_is_reported_without_ddl(self, mock_version, capsys):
+        engine = Mock()
+
+        assert check_schema_version(engine) is False
+        assert "python scripts/migrate.py" in capsys.readouterr().out
+        engine.begin.assert_not_called()
+
+    @patch('database.migrations.get_schema_version', side_effect=Exception("接続エラー"))
+    def test_check_failure_does_not_raise(self, mock_version, capsys):
+        assert check_schema_version(Mock()) is False
+        assert "スキーマバージョンの確認に失敗しました" in capsys.readouterr().out
+
+
+class TestAddMissingColumns:
+
+    def test_adds_columns_to_existing_table(self):
+        engine, session_factory = _engine_and_factory()
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE summary_usage (id INTEGER PRIMARY KEY, input_tokens INTEGER)"))
+
+        _add_missing_columns(engine, session_factory)
+
+        columns = {column['name'] for column in inspect(engine).get_columns('summary_usage')}
+        assert {'input_chars_saved', 'input_tokens_saved'} <= columns
+
+    def test_existing_columns_are_left_untouched(self):
+        engine, session_factory = _engine_and_factory()
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE summary_usage (id INTEGER PRIMARY KEY, "
+                "input_chars_saved INTEGER, input_tokens_saved INTEGER)"
+            ))
+
+        _add_missing_columns(engine, session_factory)
+        _add_missing_columns(engine, session_factory)
+
+        columns = [column['name'] for column in inspect(engine).get_columns('summary_usage')]
+        assert columns.count('input_chars_saved') == 1
+
+
+class TestCreateMissingIndexes:
+
+    def test_adds_indexes_and_backfills_existing_table(self):
+        engine, session_factory = _engine_and_factory()
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE summary_usage (id INTEGER PRIMARY KEY, date DATETIME, "
+                "document_types VARCHAR(100), model_detail VARCHAR(100))"
+            ))
+            conn.execute(text(
+                "INSERT INTO summary_usage (model_detail) VALUES "
+                "('Claude'), ('gemini-2.5-pro'), ('gemini-2.5-flash'), (NULL)"
+            ))
+
+        _add_missing_columns(engine, session_factory)
+        _create_missing_indexes(engine, session_factory)
+        _backfill_model_family(engine, session_factory)
+
+        indexes = {index['name'] for index in inspect(engine).get_indexes('summary_usage')}
+        assert {'ix_summary_usage_request_id_date', 'ix_summary_usage_family_date',
+                'ix_summary_usage_date_brin'} <= indexes
+
+        with engine.connect() as conn:
+            families = conn.execute(text("SELECT model_family FROM summary_usage ORDER BY id")).scalars().all()
+        assert families == ['Claude', 'Gemini_Pro', 'Gemini_Flash', 'Gemini_Pro']
+
+    def test_missing_table_is_skipped(self, capsys):
+        engine, session_factory = _engine_and_factory()
+
+        _create_missing_indexes(engine, session_factory)
+
+        assert capsys.readouterr().out == ""
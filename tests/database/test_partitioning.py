@@ -0,0 +1,146 @@
+import datetime
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from database.models import SummaryUsage
+from database.partitioning import (
+    add_months, apply_retention, create_month_partition, ensure_partitions, expired_partitions,
+    partition_bounds, partition_month, partition_name
+)
+from utils.exceptions import DatabaseError
+
+
+def _mock_engine(conn):
+    engine = Mock()
+    engine.begin.return_value.__enter__ = Mock(return_value=conn)
+    engine.begin.return_value.__exit__ = Mock(return_value=None)
+    return engine
+
+
+def _executed_sql(conn):
+    return [str(call[0][0]) for call in conn.execute.call_args_list]
+
+
+class TestPartitionNames:
+
+    def test_partition_name_round_trip(self):
+        name = partition_name(datetime.date(2025, 3, 1))
+
+        assert name == "summary_usage_p202503"
+        assert partition_month(name) == datetime.date(2025, 3, 1)
+        assert partition_month("summary_usage_default") is None
+
+    def test_add_months_crosses_year(self):
+        assert add_months(datetime.date(2025, 11, 1), 3) == datetime.date(2026, 2, 1)
+        assert add_months(datetime.date(2025, 1, 1), -1) == datetime.date(2024, 12, 1)
+
+    def test_partition_bounds_use_jst_midnight(self):
+        assert partition_bounds(datetime.date(2025, 12, 1)) == (
+            "2025-12-01T00:00:00+09:00", "2026-01-01T00:00:00+09:00"
+        )
+
+    def test_expired_partitions(self):
+        names = ["summary_usage_p202501", "summary_usage_p202502", "summary_usage_p202503",
+                 "summary_usage_default"]
+
+        assert expired_partitions(names, 1, today=datetime.date(2025, 3, 15)) == ["summary_usage_p202501"]
+        assert expired_partitions(names, 0, today=datetime.date(2025, 3, 15)) == []
+
+
+class TestPartitionedTable:
+
+    def test_table_is_partitioned_by_date(self):
+        ddl = str(CreateTable(SummaryUsage.__table__).compile(dialect=postgresql.dialect()))
+
+        assert "PRIMARY KEY (id, date)" in ddl
+        assert "PARTITION BY RANGE (date)" in ddl
+
+    def test_create_month_partition(self):
+        conn = Mock()
+        conn.execute.return_value.scalar.side_effect = [False, False]
+
+        assert create_month_partition(conn, datetime.date(2025, 3, 1)) is True
+
+        assert _executed_sql(conn)[-1] == (
+            "CREATE TABLE summary_usage_p202503 PARTITION OF summary_usage "
+            "FOR VALUES FROM ('2025-03-01T00:00:00+09:00') TO ('2025-04-01T00:00:00+09:00')"
+        )
+
+    def test_create_month_partition_moves_rows_from_default(self):
+        conn = Mock()
+        conn.execute.return_value.scalar.side_effect = [False, True, True]
+
+        assert create_month_partition(conn, datetime.date(2025, 3, 1)) is True
+
+        statements = _executed_sql(conn)
+        assert statements[3].startswith("CREATE TABLE summary_usage_p202503 (LIKE summary_usage")
+        assert statements[4].startswith("INSERT INTO summary_usage_p202503 SELECT * FROM summary_usage_default")
+        assert statements[5].startswith("DELETE FROM summary_usage_default")
+        assert statements[6].startswith("ALTER TABLE summary_usage ATTACH PARTITION summary_usage_p202503")
+
+    def test_create_month_partition_existing(self):
+        conn = Mock()
+        conn.execute.return_value.scalar.return_value = True
+
+        assert create_month_partition(conn, datetime.date(2025, 3, 1)) is False
+        conn.execute.assert_called_once()
+
+    @patch('database.partitioning.create_month_partition', return_value=True)
+    @patch('database.partitioning.is_partitioned', return_value=True)
+    def test_ensure_partitions(self, mock_is_partitioned, mock_create):
+        conn = Mock()
+
+        created = ensure_partitions(_mock_engine(conn), months_ahead=2)
+
+        months = [call[0][1] for call in mock_create.call_args_list]
+        assert created == [partition_name(month) for month in months]
+        assert months[1:] == [add_months(months[0], 1), add_months(months[0], 2)]
+        assert "summary_usage_default PARTITION OF summary_usage DEFAULT" in _executed_sql(conn)[-1]
+
+    @patch('database.partitioning.create_month_partition')
+    @patch('database.partitioning.is_partitioned', return_value=False)
+    def test_ensure_partitions_skips_unpartitioned_table(self, mock_is_partitioned, mock_create):
+        conn = Mock()
+
+        assert ensure_partitions(_mock_engine(conn)) == []
+        mock_create.assert_not_called()
+        conn.execute.assert_not_called()
+
+
+class TestRetention:
+
+    @patch('database.partitioning.expired_partitions', return_value=["summary_usage_p202401"])
+    @patch('database.partitioning.list_partitions', return_value=["summary_usage_p202401"])
+    def test_apply_retention_keeps_detached_table(self, mock_list, mock_expired):
+        conn = Mock()
+
+        archived = apply_retention(_mock_engine(conn), retention_months=12, archive_dir="")
+
+        assert archived == ["summary_usage_archive_p202401"]
+        assert _executed_sql(conn) == [
+            "ALTER TABLE summary_usage DETACH PARTITION summary_usage_p202401",
+            "ALTER TABLE summary_usage_p202401 RENAME TO summary_usage_archive_p202401",
+        ]
+
+    @patch('database.partitioning.expired_partitions', return_value=["summary_usage_p202401"])
+    @patch('database.partitioning.list_partitions', return_value=["summary_usage_p202401"])
+    def test_apply_retention_archives_to_file(self, mock_list, mock_expired, tmp_path):
+        conn = Mock()
+        cursor = MagicMock()
+        cursor.copy_expert.side_effect = lambda sql, f: f.write("id,date\n1,2024-01-01\n")
+        conn.connection.dbapi_connection.cursor.return_value = cursor
+
+        archived = apply_retention(_mock_engine(conn), retention_months=12, archive_dir=str(tmp_path))
+
+        assert archived == [str(tmp_path / "summary_usage_p202401.csv.gz")]
+        assert cursor.copy_expert.call_args[0][0] == "COPY summary_usage_p202401 TO STDOUT WITH CSV HEADER"
+        assert _executed_sql(conn)[-1] == "DROP TABLE summary_usage_p202401"
+
+    @patch('database.partitioning.list_partitions', side_effect=Exception("接続エラー"))
+    def test_apply_retention_exception(self, mock_list):
+        with pytest.raises(DatabaseError) as exc_info:
+            apply_retention(_mock_engine(Mock()), retention_months=12)
+        assert "古いパーティションの切り離しに失敗しました" in str(exc_info.value)
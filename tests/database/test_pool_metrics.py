@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from database.pool_metrics import MeteredQueuePool, PoolMetrics, wait_bucket
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", poolclass=MeteredQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    yield engine
+    engine.dispose()
+
+
+def test_wait_bucket():
+    assert wait_bucket(0.5) == "1ms"
+    assert wait_bucket(1) == "1ms"
+    assert wait_bucket(42) == "50ms"
+    assert wait_bucket(10000) == "+Inf"
+
+
+def test_checkout_and_checkin_are_counted(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        metrics = engine.pool.metrics.snapshot(engine.pool)
+        assert metrics["checked_out"] == 1
+
+    metrics = engine.pool.metrics.snapshot(engine.pool)
+    assert metrics["connects"] == 1
+    assert metrics["checkouts"] == 1
+    assert metrics["checkins"] == 1
+    assert metrics["checked_out"] == 0
+    assert metrics["pool_size"] == 1
+    assert metrics["overflow"] == 0
+    assert metrics["wait_count"] == 1
+    assert sum(metrics["wait_histogram"].values()) == 1
+
+
+def test_timeout_is_counted(engine):
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    metrics = engine.pool.metrics.snapshot(engine.pool)
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_count"] == 2
+    assert metrics["wait_max_ms"] >= 50
+
+
+def test_pre_ping_failure_is_counted():
+    metrics = PoolMetrics()
+
+    metrics._on_invalidate(None, None, exc.DisconnectionError())
+    metrics._on_invalidate(None, None, None)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["invalidations"] == 2
+    assert snapshot["pre_ping_failures"] == 1
+    assert "pool_size" not in snapshot
+
+
+def test_metrics_survive_dispose(engine):
+    metrics = engine.pool.metrics
+    with engine.connect():
+        pass
+
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    assert engine.pool.metrics is metrics
+    assert metrics.snapshot()["checkouts"] == 2
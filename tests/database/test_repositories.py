@@ -2,11 +2,24 @@ import datetime
 from unittest.mock import Mock, patch
 
 import pytest
-
-from database.models import Prompt, AppSetting
-from database.repositories import BaseRepository, PromptRepository, UsageStatisticsRepository, SettingsRepository
+from sqlalchemy import create_engine, delete
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.migrations import migrate
+
+from database.models import Prompt, AppSetting, SummaryUsage
+from database.repositories import (BaseRepository, PromptRepository, UsageStatisticsRepository, SettingsRepository,
+                                   ALL_PROMPTS_STATEMENT, JST, PROMPT_BY_KEYS_STATEMENT, USAGE_RECORDS_STATEMENT,
+                                   aggregate_daily_rollups, split_rollup_range)
+from database.read_routing import restore_primary_reads
+from database.rows import PromptRow, UsageRecordRow
+from database.unit_of_work import unit_of_work
 from utils.exceptions import DatabaseError
 
+PROMPT_VALUES = (1, "内科", "退院時サマリ", "default", "プロンプト", None, None, False, None, None)
+
 
 class TestBaseRepository:
     
@@ -35,24 +48,29 @@ class TestPromptRepository:
 
     def test_get_by_keys_success(self):
         mock_session = Mock()
-        mock_prompt = Mock(spec=Prompt)
-        mock_query = Mock()
-        mock_filter = Mock()
-        
-        mock_session.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.first.return_value = mock_prompt
+        mock_session.execute.return_value.first.return_value = PROMPT_VALUES
         self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
         self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
-        
+
         result = self.repo.get_by_keys("dept", "doc_type", "doctor")
-        
-        assert result is mock_prompt
-        mock_session.query.assert_called_once_with(Prompt)
+
+        assert result == PromptRow(*PROMPT_VALUES)
+        stmt, params = mock_session.execute.call_args[0]
+        assert stmt is PROMPT_BY_KEYS_STATEMENT
+        assert params == {"department": "dept", "document_type": "doc_type", "doctor": "doctor"}
+        mock_session.query.assert_not_called()
+
+    def test_get_by_keys_not_found(self):
+        mock_session = Mock()
+        mock_session.execute.return_value.first.return_value = None
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        assert self.repo.get_by_keys("dept", "doc_type", "doctor") is None
 
     def test_get_by_keys_exception(self):
         mock_session = Mock()
-        mock_session.query.side_effect = Exception("Database error")
+        mock_session.execute.side_effect = Exception("Database error")
         self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
         self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
         
@@ -62,23 +80,17 @@ class TestPromptRepository:
 
     def test_get_default_prompt_success(self):
         mock_session = Mock()
-        mock_prompt = Mock(spec=Prompt)
-        mock_query = Mock()
-        mock_filter = Mock()
-        
-        mock_session.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.first.return_value = mock_prompt
+        mock_session.execute.return_value.first.return_value = PROMPT_VALUES
         self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
         self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
-        
+
         result = self.repo.get_default_prompt()
-        
-        assert result is mock_prompt
+
+        assert result == PromptRow(*PROMPT_VALUES)
 
     def test_get_default_prompt_exception(self):
         mock_session = Mock()
-        mock_session.query.side_effect = Exception("Database error")
+        mock_session.execute.side_effect = Exception("Database error")
         self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
         self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
         
@@ -204,21 +216,98 @@ class TestPromptRepository:
 
     def test_get_all_success(self):
         mock_session = Mock()
-        mock_prompts = [Mock(spec=Prompt) for _ in range(3)]
-        mock_query = Mock()
-        mock_order_by = Mock()
-        
-        mock_session.query.return_value = mock_query
-        mock_query.order_by.return_value = mock_order_by
-        mock_order_by.all.return_value = mock_prompts
-        
+        mock_session.execute.return_value = [PROMPT_VALUES, PROMPT_VALUES[:1] + ("外科",) + PROMPT_VALUES[2:]]
         self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
         self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
-        
+
         result = self.repo.get_all()
-        
-        assert result == mock_prompts
-        mock_session.query.assert_called_once_with(Prompt)
+
+        assert [prompt.department for prompt in result] == ["内科", "外科"]
+        assert all(isinstance(prompt, PromptRow) for prompt in result)
+        mock_session.execute.assert_called_once_with(ALL_PROMPTS_STATEMENT)
+
+    def _compile(self, stmt):
+        return str(stmt.compile(dialect=postgresql.dialect()))
+
+    def test_bulk_upsert_prompts_single_statement(self):
+        mock_session = Mock()
+        mock_session.execute.return_value.rowcount = 40
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        prompts_data = [
+            {'department': '内科', 'document_type': '退院時サマリ', 'doctor': f'医師{i}', 'content': 'content'}
+            for i in range(40)
+        ]
+
+        result = self.repo.bulk_upsert_prompts(prompts_data)
+
+        assert result == 40
+        mock_session.execute.assert_called_once()
+        mock_session.commit.assert_called_once()
+        mock_session.query.assert_not_called()
+        sql = self._compile(mock_session.execute.call_args[0][0])
+        assert "ON CONFLICT (department, document_type, doctor) DO NOTHING" in sql
+
+    def test_bulk_upsert_prompts_update_existing(self):
+        mock_session = Mock()
+        mock_session.execute.return_value.rowcount = 1
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        self.repo.bulk_upsert_prompts([
+            {'department': '内科', 'document_type': '現病歴', 'doctor': 'default',
+             'content': 'new', 'selected_model': 'Claude'}
+        ], update_existing=True)
+
+        sql = self._compile(mock_session.execute.call_args[0][0])
+        assert "ON CONFLICT (department, document_type, doctor) DO UPDATE" in sql
+        assert "content = excluded.content" in sql
+        assert "selected_model = excluded.selected_model" in sql
+
+    def test_bulk_upsert_prompts_deduplicates_keys(self):
+        rows = PromptRepository._normalize_prompt_rows([
+            {'department': '内科', 'document_type': '現病歴', 'doctor': 'default', 'content': 'old'},
+            {'department': '内科', 'document_type': '現病歴', 'doctor': 'default', 'content': 'new'},
+        ])
+
+        assert len(rows) == 1
+        assert rows[0]['content'] == 'new'
+        assert rows[0]['is_default'] is False
+        assert rows[0]['selected_model'] is None
+
+    def test_bulk_upsert_prompts_empty(self):
+        result = self.repo.bulk_upsert_prompts([])
+
+        assert result == 0
+        self.mock_session_factory.assert_not_called()
+
+    def test_bulk_upsert_prompts_exception(self):
+        mock_session = Mock()
+        mock_session.execute.side_effect = Exception("Database error")
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        with pytest.raises(DatabaseError) as exc_info:
+            self.repo.bulk_upsert_prompts([
+                {'department': 'd', 'document_type': 't', 'doctor': 'x', 'content': 'c'}
+            ])
+        assert "プロンプトの一括登録に失敗しました" in str(exc_info.value)
+
+    def test_iter_all_streams_rows(self):
+        mock_session = Mock()
+        row = Mock()
+        row._mapping = {'department': '内科', 'document_type': '現病歴', 'doctor': 'default',
+                        'content': 'c', 'selected_model': None, 'is_default': False}
+        mock_session.execute.return_value = iter([row])
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        result = list(self.repo.iter_all(batch_size=10))
+
+        assert result == [row._mapping]
+        stmt = mock_session.execute.call_args[0][0]
+        assert stmt.get_execution_options()['yield_per'] == 10
 
 
 class TestUsageStatisticsRepository:
@@ -261,6 +350,75 @@ class TestUsageStatisticsRepository:
             self.repo.save_usage(usage_data)
         assert "使用統計の保存に失敗しました" in str(exc_info.value)
 
+    @patch('database.repositories.USAGE_ROLLUP', False)
+    def test_bulk_save_usage_dedupes_by_request_id(self):
+        mock_session = Mock()
+        mock_session.execute.return_value.rowcount = 2
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        result = self.repo.bulk_save_usage([
+            {"model_detail": "claude", "input_tokens": 100, "request_id": "a"},
+            {"model_detail": "gemini", "request_id": "b"},
+        ])
+
+        assert result == 2
+        assert mock_session.execute.call_count == 2
+        mock_session.commit.assert_called_once()
+        coverage_sql = str(mock_session.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()))
+        assert coverage_sql.startswith("UPDATE summary_usage_daily_coverage")
+        stmt = mock_session.execute.call_args[0][0]
+        assert "ON CONFLICT (request_id, date) DO NOTHING" in str(stmt.compile(dialect=postgresql.dialect()))
+
+    @patch('database.repositories.USAGE_ROLLUP', False)
+    def test_bulk_save_usage_classifies_model_family(self):
+        mock_session = Mock()
+        mock_session.execute.return_value.rowcount = 2
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        self.repo.bulk_save_usage([
+            {"model_detail": "gemini-2.5-flash", "request_id": "a"},
+            {"model_detail": "Claude", "request_id": "b", "model_family": "Claude"},
+        ])
+
+        params = mock_session.execute.call_args[0][0].compile(dialect=postgresql.dialect()).params
+        assert params["model_family_m0"] == "Gemini_Flash"
+        assert params["model_family_m1"] == "Claude"
+
+    def test_save_usage_classifies_model_family(self):
+        mock_session = Mock()
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        self.repo.save_usage({"model_detail": "gemini-2.5-pro"})
+
+        assert mock_session.add.call_args[0][0].model_family == "Gemini_Pro"
+
+    def test_backfill_model_family(self):
+        mock_session = Mock()
+        mock_session.execute.return_value.rowcount = 3
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+
+        assert self.repo.backfill_model_family() == 3
+
+        sql = str(mock_session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "WHERE summary_usage.model_family IS NULL" in sql
+        assert "CASE WHEN" in sql
+        mock_session.commit.assert_called_once()
+
+    def test_bulk_save_usage_empty(self):
+        assert self.repo.bulk_save_usage([]) == 0
+        self.mock_session_factory.assert_not_called()
+
+    def test_bulk_save_usage_exception(self):
+        self.mock_session_factory.side_effect = Exception("Database error")
+
+        with pytest.raises(DatabaseError) as exc_info:
+            self.repo.bulk_save_usage([{"request_id": "a"}])
+        assert "使用統計の一括保存に失敗しました" in str(exc_info.value)
+
     def test_apply_date_filter(self):
         start_date = datetime.datetime(2023, 1, 1)
         end_date = datetime.datetime(2023, 12, 31)
@@ -297,6 +455,7 @@ class TestUsageStatisticsRepository:
         
         assert result is mock_query
 
+    @patch('database.repositories.USAGE_ROLLUP', False)
     def test_get_usage_summary_success(self):
         mock_session = Mock()
         mock_query = Mock()
@@ -327,6 +486,181 @@ class TestUsageStatisticsRepository:
         assert result == expected
 
 
+class TestUsageDailyRollup:
+
+    def setup_method(self):
+        self.mock_session = Mock()
+        self.mock_session_factory = Mock()
+        self.mock_session_factory.return_value.__enter__ = Mock(return_value=self.mock_session)
+        self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
+        self.repo = UsageStatisticsRepository(self.mock_session_factory)
+
+    def test_split_full_days_only(self):
+        days, edges = split_rollup_range(
+            datetime.datetime(2024, 4, 1), datetime.datetime.combine(datetime.date(2024, 4, 7), datetime.time.max)
+        )
+
+        assert days == (datetime.date(2024, 4, 1), datetime.date(2024, 4, 7))
+        assert edges == []
+
+    def test_split_partial_edges(self):
+        days, edges = split_rollup_range(datetime.datetime(2024, 4, 1, 12), datetime.datetime(2024, 4, 4, 9))
+
+        assert days == (datetime.date(2024, 4, 2), datetime.date(2024, 4, 3))
+        assert edges[0][0] == JST.localize(datetime.datetime(2024, 4, 1, 12))
+        assert edges[0][1] == JST.localize(datetime.datetime.combine(datetime.date(2024, 4, 1), datetime.time.max))
+        assert edges[1] == (JST.localize(datetime.datetime(2024, 4, 4)), JST.localize(datetime.datetime(2024, 4, 4, 9)))
+
+    def test_split_within_single_day(self):
+        days, edges = split_rollup_range(datetime.datetime(2024, 4, 1, 9), datetime.datetime(2024, 4, 1, 18))
+
+        assert days is None
+        assert len(edges) == 1
+
+    def test_aggregate_daily_rollups(self):
+        rows = [
+            {"date": JST.localize(datetime.datetime(2024, 4, 1, 23, 30)), "department": "内科", "doctor": None,
+             "document_types": "退院時サマリ", "model_detail": "Claude", "input_tokens": 100,
+             "output_tokens": 50, "total_tokens": 150, "processing_time": 8},
+            {"date": datetime.datetime(2024, 4, 1, 14, 0, tzinfo=datetime.timezone.utc), "department": "内科",
+             "doctor": "default", "document_types": "退院時サマリ", "model_family": "Claude", "input_tokens": 200,
+             "output_tokens": 100, "total_tokens": 300, "processing_time": 45},
+        ]
+
+        rollups = aggregate_daily_rollups(rows)
+
+        assert len(rollups) == 1
+        rollup = rollups[0]
+        assert rollup["day"] == datetime.date(2024, 4, 1)
+        assert rollup["count"] == 2
+        assert rollup["total_tokens"] == 450
+        assert rollup["processing_time"] == 53
+        assert rollup["processing_time_le_10"] == 1
+        assert rollup["processing_time_le_60"] == 1
+        assert rollup["doctor"] == "default"
+
+    def test_aggregate_uses_jst_day(self):
+        rollups = aggregate_daily_rollups([
+            {"date": datetime.datetime(2024, 4, 1, 16, 0, tzinfo=datetime.timezone.utc), "model_detail": "Claude"}
+        ])
+
+        assert rollups[0]["day"] == datetime.date(2024, 4, 2)
+        assert rollups[0]["document_types"] == ""
+        assert rollups[0]["processing_time_le_10"] == 1
+
+    def test_bulk_save_usage_updates_rollup_for_inserted_rows(self):
+        inserted = Mock()
+        inserted._mapping = {"date": JST.localize(datetime.datetime(2024, 4, 1, 10)), "model_family": "Claude",
+                             "processing_time": 200}
+        self.mock_session.execute.return_value.all.return_value = [inserted]
+
+        result = self.repo.bulk_save_usage([
+            {"model_detail": "Claude", "request_id": "a"},
+            {"model_detail": "Claude", "request_id": "duplicate"},
+        ])
+
+        assert result == 1
+        insert_sql = str(self.mock_session.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()))
+        assert "RETURNING" in insert_sql
+        rollup_stmt = self.mock_session.execute.call_args_list[1][0][0]
+        rollup_sql = str(rollup_stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (day, department, doctor, document_types, model_family) DO UPDATE" in rollup_sql
+        assert "count = (summary_usage_daily.count + excluded.count)" in rollup_sql
+        assert rollup_stmt.compile(dialect=postgresql.dialect()).params["processing_time_gt_120_m0"] == 1
+        self.mock_session.commit.assert_called_once()
+
+    def test_get_usage_summary_reads_rollup_and_edges(self):
+        rollup_result = Mock(count=10, total_input_tokens=1000, total_output_tokens=500, total_tokens=1500)
+        raw_result = Mock(count=2, total_input_tokens=20, total_output_tokens=10, total_tokens=30)
+        self.mock_session.query.return_value.filter.return_value.first.return_value = rollup_result
+        self.mock_session.execute.return_value.scalar.return_value = datetime.date(2024, 1, 1)
+
+        with patch.object(self.repo, '_apply_filters') as mock_filters:
+            mock_filters.return_value.first.return_value = raw_result
+            result = self.repo.get_usage_summary(datetime.datetime(2024, 4, 1, 12), datetime.datetime(2024, 4, 8))
+
+        assert result == {'count': 14, 'total_input_tokens': 1040, 'total_output_tokens': 520, 'total_tokens': 1560}
+        assert mock_filters.call_count == 2
+
+    def test_get_usage_summary_full_days_skip_raw(self):
+        rollup_result = Mock(count=None, total_input_tokens=None, total_output_tokens=None, total_tokens=None)
+        self.mock_session.query.return_value.filter.return_value.first.return_value = rollup_result
+        self.mock_session.execute.return_value.scalar.return_value = datetime.date(2024, 1, 1)
+
+        with patch.object(self.repo, '_apply_filters') as mock_filters:
+            result = self.repo.get_usage_summary(
+                datetime.datetime(2024, 4, 1), datetime.datetime.combine(datetime.date(2024, 4, 7), datetime.time.max)
+            )
+
+        assert result == {'count': 0, 'total_input_tokens': 0, 'total_output_tokens': 0, 'total_tokens': 0}
+        mock_filters.assert_not_called()
+
+    def test_merge_department_statistics(self):
+        merged = UsageStatisticsRepository._merge_department_statistics([
+            [{'department': '内科', 'doctor': 'default', 'document_types': None, 'count': 1,
+              'input_tokens': 10, 'output_tokens': 5, 'total_tokens': 15, 'processing_time': None}],
+            [{'department': '内科', 'doctor': 'default', 'document_types': None, 'count': 2,
+              'input_tokens': 20, 'output_tokens': 10, 'total_tokens': 30, 'processing_time': 9},
+             {'department': '外科', 'doctor': 'default', 'document_types': '退院時サマリ', 'count': 5,
+              'input_tokens': 50, 'output_tokens': 25, 'total_tokens': 75, 'processing_time': 40}],
+        ])
+
+        assert [stat['department'] for stat in merged] == ['外科', '内科']
+        assert merged[1]['count'] == 3
+        assert merged[1]['processing_time'] == 9
+
+    def test_rebuild_daily_rollups(self):
+        row = Mock()
+        row._mapping = {"date": JST.localize(datetime.datetime(2024, 4, 1, 10)), "model_family": "Claude"}
+        coverage = Mock()
+        coverage.scalar.return_value = datetime.date(2024, 5, 1)
+        self.mock_session.execute.side_effect = [Mock(), [row], Mock(), coverage, Mock()]
+
+        result = self.repo.rebuild_daily_rollups(datetime.date(2024, 4, 1), datetime.date(2024, 4, 30))
+
+        assert result == 1
+        delete_sql = str(self.mock_session.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()))
+        assert delete_sql.startswith("DELETE FROM summary_usage_daily")
+        coverage_stmt = self.mock_session.execute.call_args_list[4][0][0].compile(dialect=postgresql.dialect())
+        assert coverage_stmt.params["covered_from"] == datetime.date(2024, 4, 1)
+        self.mock_session.commit.assert_called_once()
+
+    def test_split_range_before_coverage_reads_raw(self):
+        days, edges = split_rollup_range(
+            datetime.datetime(2024, 4, 1), datetime.datetime.combine(datetime.date(2024, 4, 7), datetime.time.max),
+            covered_from=datetime.date(2024, 4, 5)
+        )
+
+        assert days == (datetime.date(2024, 4, 5), datetime.date(2024, 4, 7))
+        assert edges == [(JST.localize(datetime.datetime(2024, 4, 1)),
+                          JST.localize(datetime.datetime.combine(datetime.date(2024, 4, 4), datetime.time.max)))]
+
+    def test_split_range_without_coverage_reads_raw(self):
+        self.mock_session.execute.return_value.scalar.return_value = None
+
+        days, edges = self.repo._split_range(self.mock_session, datetime.datetime(2024, 4, 1),
+                                             datetime.datetime(2024, 4, 8))
+
+        assert days is None
+        assert edges == [(JST.localize(datetime.datetime(2024, 4, 1)), JST.localize(datetime.datetime(2024, 4, 8)))]
+
+    def test_split_range_without_rollup_uses_jst(self):
+        with patch('database.repositories.USAGE_ROLLUP', False):
+            days, edges = self.repo._split_range(self.mock_session, datetime.datetime(2024, 4, 1),
+                                                 datetime.datetime(2024, 4, 8))
+
+        # 日次集計を使う場合と同じく、タイムゾーンのない日時はJSTとして扱う
+        assert days is None
+        assert edges == [(JST.localize(datetime.datetime(2024, 4, 1)), JST.localize(datetime.datetime(2024, 4, 8)))]
+        self.mock_session.execute.assert_not_called()
+
+    def test_rebuild_daily_rollups_exception(self):
+        self.mock_session.execute.side_effect = Exception("Database error")
+
+        with pytest.raises(DatabaseError, match="日次集計の再作成に失敗しました"):
+            self.repo.rebuild_daily_rollups()
+
+
 class TestSettingsRepository:
     
     def setup_method(self):
@@ -452,7 +786,7 @@ class TestUsageStatisticsRepositoryFiltering:
 
         assert result is mock_filtered_query
         mock_query.filter.assert_called_once()
-        # ilike('%claude%')が呼ばれることを確認
+        # model_familyの一致条件が呼ばれることを確認
         args = mock_query.filter.call_args[0]
         assert len(args) == 1
 
@@ -466,9 +800,11 @@ class TestUsageStatisticsRepositoryFiltering:
 
         assert result is mock_filtered_query
         mock_query.filter.assert_called_once()
-        # geminiを含み、flashは含まない条件
+        # 書き込み時に分類したmodel_familyの一致条件
         args = mock_query.filter.call_args[0]
-        assert len(args) == 2  # gemini条件 + not flash条件
+        assert len(args) == 1
+        assert str(args[0].compile(compile_kwargs={"literal_binds": True})) == \
+            "summary_usage.model_family = 'Gemini_Pro'"
 
     def test_apply_model_filter_gemini_flash(self):
         """Gemini_Flashモデルフィルターのテスト"""
@@ -571,6 +907,7 @@ class TestUsageStatisticsRepositoryFiltering:
             mock_model_filter.assert_called_once_with(mock_query, "Claude")
             mock_doc_filter.assert_called_once_with(mock_query, "退院時サマリ")
 
+    @patch('database.repositories.USAGE_ROLLUP', False)
     def test_get_department_statistics_success(self):
         """部門別統計取得成功のテスト"""
         mock_session = Mock()
@@ -660,15 +997,10 @@ class TestUsageStatisticsRepositoryFiltering:
     def test_get_usage_records_success(self):
         """使用記録取得成功のテスト"""
         mock_session = Mock()
-        mock_query = Mock()
         mock_filtered_query = Mock()
-        mock_ordered_query = Mock()
-        
-        mock_records = [Mock() for _ in range(5)]
-        
-        mock_session.query.return_value = mock_query
-        mock_filtered_query.order_by.return_value = mock_ordered_query
-        mock_ordered_query.all.return_value = mock_records
+        values = (1, datetime.datetime(2024, 6, 1), "app", "入院記録", "gemini-2.5-pro", "内科", "default",
+                  100, 50, 150, 10, None, None, 0, "a", "Gemini_Pro")
+        mock_session.execute.return_value = [values]
 
         self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
         self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
@@ -676,18 +1008,27 @@ class TestUsageStatisticsRepositoryFiltering:
         start_date = datetime.datetime(2024, 1, 1)
         end_date = datetime.datetime(2024, 12, 31)
 
-        with patch.object(self.repo, '_apply_filters', return_value=mock_filtered_query):
+        with patch.object(self.repo, '_apply_filters', return_value=mock_filtered_query) as mock_apply:
             result = self.repo.get_usage_records(
                 start_date, end_date, "Gemini_Pro", "入院記録"
             )
 
-        assert result == mock_records
+        assert result == [UsageRecordRow(*values)]
+        assert mock_apply.call_args[0][0] is USAGE_RECORDS_STATEMENT
         mock_filtered_query.order_by.assert_called_once()
 
+    def test_get_usage_records_filters_compile(self):
+        stmt = self.repo._apply_filters(USAGE_RECORDS_STATEMENT, datetime.datetime(2024, 1, 1),
+                                        datetime.datetime(2024, 12, 31), "Claude", "入院記録")
+
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "summary_usage.model_family = " in sql
+        assert "summary_usage.document_types = " in sql
+
     def test_get_usage_records_exception(self):
         """使用記録取得時の例外テスト"""
         mock_session = Mock()
-        mock_session.query.side_effect = Exception("Query failed")
+        mock_session.execute.side_effect = Exception("Query failed")
 
         self.mock_session_factory.return_value.__enter__ = Mock(return_value=mock_session)
         self.mock_session_factory.return_value.__exit__ = Mock(return_value=None)
@@ -698,6 +1039,7 @@ class TestUsageStatisticsRepositoryFiltering:
         with pytest.raises(DatabaseError, match="使用記録の取得に失敗しました"):
             self.repo.get_usage_records(start_date, end_date)
 
+    @patch('database.repositories.USAGE_ROLLUP', False)
     def test_get_usage_summary_null_values(self):
         """使用統計での NULL値処理のテスト"""
         mock_session = Mock()
@@ -757,6 +1099,7 @@ class TestUsageStatisticsRepositoryFiltering:
         assert result2 is mock_query  # フィルター適用されない
         # result3のみフィルターが適用される
 
+    @patch('database.repositories.USAGE_ROLLUP', False)
     def test_complex_filtering_scenario(self):
         """複雑なフィルタリングシナリオのテスト"""
         start_date = datetime.datetime(2024, 6, 1)
@@ -788,7 +1131,7 @@ class TestUsageStatisticsRepositoryFiltering:
             )
 
             # すべてのフィルターが適用されることを確認
-            mock_date.assert_called_once_with(mock_query, start_date, end_date)
+            mock_date.assert_called_once_with(mock_query, JST.localize(start_date), JST.localize(end_date))
             mock_model.assert_called_once_with(mock_query, model_filter)
             mock_doc.assert_called_once_with(mock_query, document_type_filter)
 
@@ -798,4 +1141,121 @@ class TestUsageStatisticsRepositoryFiltering:
             'total_output_tokens': 2500,
             'total_tokens': 7500
         }
-        assert result == expected
\ No newline at end of file
+        assert result == expected
+
+
+class TestSQLiteBackend:
+
+    def setup_method(self):
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        self.session_factory = sessionmaker(bind=engine)
+        migrate(engine, self.session_factory)
+
+    def test_bulk_upsert_prompts(self):
+        repo = PromptRepository(self.session_factory)
+        prompt = {"department": "内科", "document_type": "退院時サマリ", "doctor": "default", "content": "旧"}
+
+        assert repo.bulk_upsert_prompts([prompt]) == 1
+        assert repo.bulk_upsert_prompts([{**prompt, "content": "新"}]) == 0
+        repo.bulk_upsert_prompts([{**prompt, "content": "新"}], update_existing=True)
+
+        assert repo.get_by_keys("内科", "退院時サマリ", "default").content == "新"
+
+    def test_usage_is_deduplicated_and_rolled_up(self):
+        repo = UsageStatisticsRepository(self.session_factory)
+        date = JST.localize(datetime.datetime(2025, 3, 10, 12, 0))
+        row = {"date": date, "model_detail": "claude", "document_types": "退院時サマリ",
+               "input_tokens": 100, "output_tokens": 50, "total_tokens": 150,
+               "processing_time": 20, "request_id": "a"}
+
+        assert repo.bulk_save_usage([row, {**row, "request_id": "b"}]) == 2
+        assert repo.bulk_save_usage([row]) == 0
+
+        summary = repo.get_usage_summary(JST.localize(datetime.datetime(2025, 3, 1)),
+                                         JST.localize(datetime.datetime(2025, 4, 1)))
+        assert summary == {"count": 2, "total_input_tokens": 200, "total_output_tokens": 100,
+                           "total_tokens": 300}
+
+    def test_usage_saved_without_rollup_is_read_from_details(self):
+        repo = UsageStatisticsRepository(self.session_factory)
+        date = JST.localize(datetime.datetime(2025, 3, 10, 12, 0))
+        row = {"date": date, "model_detail": "claude", "input_tokens": 100, "output_tokens": 50,
+               "total_tokens": 150, "processing_time": 20, "request_id": "a"}
+
+        repo.bulk_save_usage([row])
+        with patch('database.repositories.USAGE_ROLLUP', False):
+            repo.bulk_save_usage([{**row, "request_id": "b"}])
+
+        assert repo.get_rollup_coverage() == datetime.date(2025, 3, 11)
+        summary = repo.get_usage_summary(JST.localize(datetime.datetime(2025, 3, 1)),
+                                         JST.localize(datetime.datetime(2025, 4, 1)))
+        assert summary["count"] == 2
+
+        repo.rebuild_daily_rollups()
+        assert repo.get_rollup_coverage() == datetime.date.min
+
+    def test_rebuild_keeps_rollups_of_removed_months(self):
+        repo = UsageStatisticsRepository(self.session_factory)
+        row = {"model_detail": "claude", "input_tokens": 100, "output_tokens": 50, "total_tokens": 150,
+               "processing_time": 20}
+        repo.bulk_save_usage([
+            {**row, "date": JST.localize(datetime.datetime(2025, 1, 10, 12, 0)), "request_id": "a"},
+            {**row, "date": JST.localize(datetime.datetime(2025, 3, 10, 12, 0)), "request_id": "b"},
+        ])
+        # 保持期間を過ぎた月の明細を切り離した状態
+        with self.session_factory() as session:
+            session.execute(delete(SummaryUsage).where(SummaryUsage.request_id == "a"))
+            session.commit()
+
+        assert repo.rebuild_daily_rollups() == 1
+
+        summary = repo.get_usage_summary(JST.localize(datetime.datetime(2025, 1, 1)),
+                                         JST.localize(datetime.datetime(2025, 4, 1)))
+        assert summary["count"] == 2
+
+
+class TestReadReplicaRouting:
+
+    def setup_method(self):
+        self.primary_factory = self._migrated_session_factory()
+        self.replica_factory = self._migrated_session_factory()
+        restore_primary_reads(0.0)
+
+    def teardown_method(self):
+        restore_primary_reads(0.0)
+
+    @staticmethod
+    def _migrated_session_factory():
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        session_factory = sessionmaker(bind=engine)
+        migrate(engine, session_factory)
+        return session_factory
+
+    def test_reads_use_replica_and_writes_use_primary(self):
+        repo = PromptRepository(self.primary_factory, self.replica_factory)
+        repo.create_or_update("内科", "退院時サマリ", "default", "内容")
+        restore_primary_reads(0.0)
+
+        assert repo.get_by_keys("内科", "退院時サマリ", "default") is None
+        assert PromptRepository(self.primary_factory).get_by_keys("内科", "退院時サマリ", "default") is not None
+
+    def test_reads_after_write_use_primary(self):
+        repo = PromptRepository(self.primary_factory, self.replica_factory)
+        repo.create_or_update("内科", "退院時サマリ", "default", "内容")
+
+        assert repo.get_by_keys("内科", "退院時サマリ", "default").content == "内容"
+        assert len(repo.get_all()) == 1
+
+    def test_unit_of_work_with_writes_reads_primary(self):
+        repo = UsageStatisticsRepository(self.primary_factory, self.replica_factory)
+        date = JST.localize(datetime.datetime(2025, 3, 10, 12, 0))
+        start = JST.localize(datetime.datetime(2025, 3, 1))
+        end = JST.localize(datetime.datetime(2025, 4, 1))
+
+        with unit_of_work():
+            repo.save_usage({"date": date, "model_detail": "claude", "input_tokens": 100,
+                             "output_tokens": 50, "total_tokens": 150, "request_id": "a"})
+            assert len(repo.get_usage_records(start, end)) == 1
+
+        assert repo.get_usage_records(start, end) == []
+        assert repo.get_usage_summary(start, end)["count"] == 0
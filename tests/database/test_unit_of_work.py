@@ -0,0 +1,145 @@
+import contextvars
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from database.db import enable_sqlite_savepoints
+from database.migrations import migrate
+from database.repositories import PromptRepository, SettingsRepository
+from database.unit_of_work import current_unit_of_work, release_connection, unit_of_work
+from utils.exceptions import DatabaseError
+
+PROMPT = {"department": "内科", "document_type": "退院時サマリ", "doctor": "default", "content": "プロンプト"}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", poolclass=QueuePool)
+    enable_sqlite_savepoints(engine)
+    factory = sessionmaker(bind=engine)
+    migrate(engine, factory)
+    return factory
+
+
+def _count_checkouts(session_factory):
+    checkouts = []
+    event.listen(session_factory.kw["bind"].pool, "checkout", lambda *args: checkouts.append(1))
+    return checkouts
+
+
+class TestUnitOfWork:
+
+    def test_repositories_share_one_checkout(self, session_factory):
+        prompts = PromptRepository(session_factory)
+        settings = SettingsRepository(session_factory)
+        checkouts = _count_checkouts(session_factory)
+
+        with unit_of_work():
+            prompts.get_by_keys("内科", "退院時サマリ", "default")
+            prompts.get_default_prompt()
+            settings.save_user_settings("user", "app", "内科", "Claude", "退院時サマリ", "default")
+            prompts.bulk_upsert_prompts([PROMPT])
+
+        assert len(checkouts) == 1
+        assert prompts.get_by_keys("内科", "退院時サマリ", "default").content == "プロンプト"
+        assert settings.load_user_settings("user").selected_model == "Claude"
+
+    def test_writes_are_committed_once_at_the_end(self, session_factory):
+        prompts = PromptRepository(session_factory)
+        other_session = session_factory()
+
+        with unit_of_work():
+            prompts.bulk_upsert_prompts([PROMPT])
+            assert other_session.execute(text("SELECT COUNT(*) FROM prompts")).scalar() == 0
+            other_session.close()
+
+        assert len(prompts.get_all()) == 1
+
+    def test_exception_rolls_back(self, session_factory):
+        prompts = PromptRepository(session_factory)
+
+        with pytest.raises(RuntimeError):
+            with unit_of_work():
+                prompts.bulk_upsert_prompts([PROMPT])
+                raise RuntimeError("作成に失敗")
+
+        assert prompts.get_all() == []
+        assert current_unit_of_work() is None
+
+    def test_failed_repository_call_keeps_earlier_writes(self, session_factory):
+        prompts = PromptRepository(session_factory)
+
+        with unit_of_work():
+            prompts.bulk_upsert_prompts([PROMPT])
+            with pytest.raises(DatabaseError):
+                prompts.bulk_upsert_prompts([{**PROMPT, "department": None}])
+            prompts.bulk_upsert_prompts([{**PROMPT, "department": "外科"}])
+
+        assert sorted(prompt.department for prompt in prompts.get_all()) == ["内科", "外科"]
+
+    def test_failed_flush_keeps_earlier_writes(self, session_factory):
+        prompts = PromptRepository(session_factory)
+
+        with unit_of_work():
+            prompts.create_or_update("内科", "退院時サマリ", "default", "プロンプト")
+            # ORMのflushで失敗するとセーブポイントが無効になるため、取り消しのみを確認する
+            with pytest.raises(DatabaseError):
+                prompts.create_or_update("外科", "退院時サマリ", "default", None)
+            prompts.create_or_update("眼科", "退院時サマリ", "default", "プロンプト")
+
+        assert sorted(prompt.department for prompt in prompts.get_all()) == ["内科", "眼科"]
+
+    def test_failed_first_write_is_not_committed(self, session_factory):
+        prompts = PromptRepository(session_factory)
+
+        with unit_of_work() as unit:
+            with pytest.raises(DatabaseError):
+                prompts.bulk_upsert_prompts([{**PROMPT, "department": None}])
+            assert unit.has_writes is False
+
+        assert prompts.get_all() == []
+
+    def test_nested_unit_joins_outer(self, session_factory):
+        with unit_of_work() as outer:
+            with unit_of_work() as inner:
+                assert inner is outer
+            assert current_unit_of_work() is outer
+
+    def test_other_session_factory_uses_own_session(self, session_factory, tmp_path):
+        other_engine = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+        other_factory = sessionmaker(bind=other_engine)
+        migrate(other_engine, other_factory)
+
+        with unit_of_work() as unit:
+            PromptRepository(session_factory).get_all()
+            PromptRepository(other_factory).bulk_upsert_prompts([PROMPT])
+            assert unit.session_factory is session_factory
+
+        assert len(PromptRepository(other_factory).get_all()) == 1
+
+    def test_release_connection_returns_connection_to_pool(self, session_factory):
+        prompts = PromptRepository(session_factory)
+        pool = session_factory.kw["bind"].pool
+
+        with unit_of_work():
+            prompts.get_all()
+            assert pool.checkedout() == 1
+            release_connection()
+            assert pool.checkedout() == 0
+            prompts.bulk_upsert_prompts([PROMPT])
+
+        assert len(prompts.get_all()) == 1
+
+    def test_context_is_shared_with_worker_thread(self, session_factory):
+        seen = []
+
+        with unit_of_work() as unit:
+            thread = threading.Thread(target=contextvars.copy_context().run,
+                                      args=(lambda: seen.append(current_unit_of_work()),))
+            thread.start()
+            thread.join()
+
+        assert seen == [unit]
@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import Mock, patch
 from enum import Enum
 
-from external_service.api_factory import APIFactory, APIProvider, generate_summary
+from external_service.api_factory import APIFactory, APIProvider, generate_summary, generate_summary_with_usage
 from external_service.base_api import BaseAPIClient
 from external_service.claude_api import ClaudeAPIClient
 from external_service.gemini_api import GeminiAPIClient
@@ -80,7 +80,7 @@ class TestAPIFactory:
             assert result == ("summary", 100, 200)
             mock_create_client.assert_called_once_with(APIProvider.CLAUDE)
             mock_client.generate_summary.assert_called_once_with(
-                "medical_text", "info", "prescription", "dept", "doc_type", "doctor", "model"
+                "medical_text", "info", "prescription", "dept", "doc_type", "doctor", "model", None, None
             )
 
     def test_generate_summary_with_provider_string(self):
@@ -109,7 +109,7 @@ class TestAPIFactory:
             )
             
             mock_client.generate_summary.assert_called_once_with(
-                "medical_text", "", "", "default", "退院時サマリ", "default", None
+                "medical_text", "", "", "default", "退院時サマリ", "default", None, None, None
             )
 
     def test_generate_summary_with_provider_all_parameters(self):
@@ -131,7 +131,7 @@ class TestAPIFactory:
             
             mock_client.generate_summary.assert_called_once_with(
                 "medical_text", "additional", "prescription", 
-                "department", "document_type", "doctor", "model_name"
+                "department", "document_type", "doctor", "model_name", None, None
             )
 
     def test_generate_summary_with_provider_client_exception(self):
@@ -213,4 +213,16 @@ class TestGenerateSummaryFunction:
             
             with pytest.raises(APIError) as exc_info:
                 generate_summary("claude", "medical_text")
-            assert "Test error" in str(exc_info.value)
\ No newline at end of file
+            assert "Test error" in str(exc_info.value)
+
+    def test_generate_summary_with_usage_returns_continuation_count(self):
+        mock_client = Mock()
+        mock_client.generate_summary.return_value = ("summary", 100, 200)
+        mock_client.continuation_count = 1
+
+        with patch.object(APIFactory, 'create_client', return_value=mock_client) as mock_create:
+            result = generate_summary_with_usage("claude", "medical_text", document_type="退院時サマリ")
+
+        assert result == ("summary", 100, 200, 1)
+        mock_create.assert_called_once_with("claude")
+        mock_client.generate_summary.assert_called_once_with("medical_text", document_type="退院時サマリ")
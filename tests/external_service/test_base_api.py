@@ -169,7 +169,7 @@ class TestBaseAPIClient:
 
     def test_generate_summary_success(self):
         with patch.object(self.client, 'initialize') as mock_init, \
-             patch.object(self.client, 'create_summary_prompt') as mock_create_prompt, \
+             patch.object(self.client, 'create_context_prompt') as mock_create_prompt, \
              patch.object(self.client, '_generate_content') as mock_generate:
             
             mock_init.return_value = True
@@ -189,14 +189,14 @@ class TestBaseAPIClient:
             assert result == ("Summary", 100, 200)
             mock_init.assert_called_once()
             mock_create_prompt.assert_called_once_with(
-                "medical_text", "info", "prescription", "dept", "doc_type"
+                "medical_text", "info", "prescription", "dept", "doc_type", "doctor"
             )
             mock_generate.assert_called_once_with("Generated prompt", "custom_model")
 
     def test_generate_summary_no_model_name(self):
         with patch.object(self.client, 'initialize') as mock_init, \
              patch.object(self.client, 'get_model_name') as mock_get_model_name, \
-             patch.object(self.client, 'create_summary_prompt') as mock_create_prompt, \
+             patch.object(self.client, 'create_context_prompt') as mock_create_prompt, \
              patch.object(self.client, '_generate_content') as mock_generate:
             
             mock_init.return_value = True
@@ -230,7 +230,7 @@ class TestBaseAPIClient:
     def test_generate_summary_create_prompt_exception(self):
         with patch.object(self.client, 'initialize') as mock_init, \
              patch('external_service.base_api.get_prompt_manager') as mock_get_manager, \
-             patch.object(self.client, 'create_summary_prompt') as mock_create_prompt:
+             patch.object(self.client, 'create_context_prompt') as mock_create_prompt:
             
             mock_init.return_value = True
             mock_manager = Mock()
@@ -246,7 +246,7 @@ class TestBaseAPIClient:
     def test_generate_summary_generate_content_exception(self):
         with patch.object(self.client, 'initialize') as mock_init, \
              patch('external_service.base_api.get_prompt_manager') as mock_get_manager, \
-             patch.object(self.client, 'create_summary_prompt') as mock_create_prompt, \
+             patch.object(self.client, 'create_context_prompt') as mock_create_prompt, \
              patch.object(self.client, '_generate_content') as mock_generate:
             
             mock_init.return_value = True
@@ -264,7 +264,7 @@ class TestBaseAPIClient:
     def test_generate_summary_with_default_document_type(self):
         with patch.object(self.client, 'initialize') as mock_init, \
              patch('external_service.base_api.get_prompt_manager') as mock_get_manager, \
-             patch.object(self.client, 'create_summary_prompt') as mock_create_prompt, \
+             patch.object(self.client, 'create_context_prompt') as mock_create_prompt, \
              patch.object(self.client, '_generate_content') as mock_generate, \
              patch('external_service.base_api.DEFAULT_DOCUMENT_TYPE', '退院時サマリ'):
             
@@ -278,5 +278,123 @@ class TestBaseAPIClient:
             self.client.generate_summary("medical_text")
 
             mock_create_prompt.assert_called_once_with(
-                "medical_text", "", "", "default", "退院時サマリ"
-            )
\ No newline at end of file
+                "medical_text", "", "", "default", "退院時サマリ", "default"
+            )
+
+    def test_create_summary_prompt_with_prefilled_sections(self):
+        with patch('external_service.base_api.get_prompt_manager') as mock_get_manager:
+            mock_manager = Mock()
+            mock_manager.get_prompt.return_value = {"content": "Template"}
+            mock_get_manager.return_value = mock_manager
+
+            result = self.client.create_summary_prompt(
+                "Medical text",
+                prefilled_sections={"入院期間": "2024年4月1日～2024年4月28日（28日間）"}
+            )
+
+            assert result.endswith(
+                "\n【作成済みの項目】以下の項目はシステムで作成済みのため、記載を省略してください。"
+                "\n入院期間: 2024年4月1日～2024年4月28日（28日間）"
+            )
+
+    def test_generate_summary_sets_structured_output(self):
+        with patch.object(self.client, 'create_context_prompt', return_value="prompt"), \
+             patch('external_service.base_api.is_structured_output_enabled', return_value=True) as mock_enabled:
+
+            self.client.generate_summary("Medical text", document_type="退院時サマリ", model_name="model")
+
+            assert self.client.structured_output is True
+            mock_enabled.assert_called_once_with("退院時サマリ")
+
+    def test_generate_summary_applies_generation_profile(self):
+        with patch.object(self.client, 'create_context_prompt', return_value="prompt"):
+            self.client.generate_summary("Medical text", document_type="現病歴", model_name="model")
+            resolved = self.client.generation_settings
+
+            self.client.generate_summary(
+                "Medical text", document_type="退院時サマリ", model_name="model", generation_profile="short"
+            )
+
+            assert resolved == self.client.generation_settings
+
+    def test_generate_summary_applies_output_options(self):
+        client = ConcreteAPIClient("fake_api_key", "fake_model")
+        client.provider_name = "claude"
+
+        with patch.object(client, 'create_context_prompt', return_value="prompt"), \
+             patch.object(client, '_generate_content', return_value=("Summary", 100, 200)) as mock_generate, \
+             patch('external_service.base_api.is_structured_output_enabled', return_value=False):
+
+            client.generate_summary("Medical text", document_type="退院時サマリ", model_name="model",
+                                    prefilled_sections={"入院期間": "2024年4月1日～2024年4月28日（28日間）"},
+                                    generation_profile="standard")
+
+            prompt = mock_generate.call_args[0][0]
+            assert "【出力形式】" in prompt
+            assert "【入院期間】" not in prompt
+            assert client.output_prefill == "【現病歴】"
+            assert client.generation_settings["stop_sequences"] == []
+
+    def test_generate_summary_structured_output_skips_output_options(self):
+        client = ConcreteAPIClient("fake_api_key", "fake_model")
+        client.provider_name = "claude"
+
+        with patch.object(client, 'create_context_prompt', return_value="prompt"), \
+             patch.object(client, '_generate_content', return_value=("{}", 100, 200)) as mock_generate, \
+             patch('external_service.base_api.is_structured_output_enabled', return_value=True):
+
+            client.generate_summary("Medical text", document_type="退院時サマリ", model_name="model",
+                                    generation_profile="standard")
+
+            mock_generate.assert_called_once_with("prompt", "model")
+            assert client.output_prefill == ""
+
+    def test_create_section_prompt(self):
+        with patch.object(self.client, 'get_prompt_template', return_value="テンプレート"):
+            context, instruction = self.client.create_section_prompt(
+                "備考", "カルテ", "追加", "処方", {"現病歴": "高血圧", "備考": "古い内容", "入院時検査": ""}
+            )
+
+        assert context == "テンプレート\n【カルテ情報】\nカルテ\n【退院時処方(現在の処方)】\n処方\n【追加情報】追加"
+        assert instruction.startswith("\n【作成済みの項目】\n【現病歴】\n高血圧\n")
+        assert "古い内容" not in instruction
+        assert "【入院時検査】" not in instruction
+        assert "【備考】の項目のみを作成" in instruction
+
+    def test_regenerate_section(self):
+        with patch.object(self.client, 'create_section_prompt', return_value=("context", "instruction")), \
+             patch.object(self.client, '_generate_content', return_value=("【備考】\nキーパーソンは長女。", 80, 10)) \
+                as mock_generate:
+
+            result = self.client.regenerate_section("備考", "Medical text", model_name="model")
+
+        assert result == ("キーパーソンは長女。", 80, 10)
+        mock_generate.assert_called_once_with("contextinstruction", "model")
+        assert self.client.output_prefill == "【備考】"
+
+    def test_refine_summary_continues_conversation(self):
+        client = ConcreteAPIClient("fake_api_key", "fake_model")
+        client.provider_name = "claude"
+
+        with patch.object(client, 'create_context_prompt', return_value="context"), \
+             patch.object(client, '_generate_conversation', return_value=("【現病歴】\n短縮版", 30, 40)) as mock_generate:
+
+            result = client.refine_summary("【現病歴】\n元の記載", "もっと簡潔に", "Medical text",
+                                           model_name="model", generation_profile="standard")
+
+        assert result == ("【現病歴】\n短縮版", 30, 40)
+        turns = mock_generate.call_args[0][0]
+        assert [turn["role"] for turn in turns] == ["user", "assistant", "user"]
+        assert turns[0] == {"role": "user", "content": "context", "cache": True}
+        assert turns[1]["content"] == "【現病歴】\n元の記載"
+        assert turns[2]["content"].startswith("【修正指示】もっと簡潔に\n")
+        assert client.output_prefill == "【現病歴】"
+        assert client.structured_output is False
+
+    def test_generate_conversation_default_joins_turns(self):
+        with patch.object(self.client, '_generate_content', return_value=("Summary", 1, 2)) as mock_generate:
+            self.client._generate_conversation(
+                [{"role": "user", "content": "A"}, {"role": "assistant", "content": "B"}], "model"
+            )
+
+        mock_generate.assert_called_once_with("A\nB", "model")
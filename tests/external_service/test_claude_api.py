@@ -1,3 +1,4 @@
+import json
 from unittest.mock import Mock, patch
 
 import pytest
@@ -170,6 +171,157 @@ class TestClaudeAPIClient:
         # Verify max_tokens is set to 6000
         call_args = mock_client.messages.create.call_args[1]
         assert call_args['max_tokens'] == 6000
+        assert 'stop_sequences' not in call_args
+
+    def test_generate_content_uses_generation_profile(self):
+        mock_response = Mock()
+        mock_content = Mock()
+        mock_content.text = "Generated text"
+        mock_response.content = [mock_content]
+        mock_response.usage = Mock(input_tokens=100, output_tokens=200)
+
+        mock_client = Mock()
+        mock_client.messages.create.return_value = mock_response
+        self.client.client = mock_client
+        self.client.generation_settings = {"max_tokens": 2000, "thinking_level": None, "stop_sequences": ["【"]}
+
+        self.client._generate_content("Test prompt", "apac.anthropic.claude-sonnet-4-20250514-v1:0")
+
+        call_args = mock_client.messages.create.call_args[1]
+        assert call_args['max_tokens'] == 2000
+        assert call_args['stop_sequences'] == ["【"]
+
+    def test_generate_content_with_header_prefill(self):
+        mock_content = Mock()
+        mock_content.text = "\n高血圧で通院中。\n【入院時検査】\nCRP 1.8"
+        mock_response = Mock(content=[mock_content], usage=Mock(input_tokens=100, output_tokens=20))
+
+        mock_client = Mock()
+        mock_client.messages.create.return_value = mock_response
+        self.client.client = mock_client
+        self.client.output_prefill = "【現病歴】"
+
+        result = self.client._generate_content("Test prompt", "apac.anthropic.claude-sonnet-4-20250514-v1:0")
+
+        assert result[0] == "【現病歴】\n高血圧で通院中。\n【入院時検査】\nCRP 1.8"
+        call_args = mock_client.messages.create.call_args[1]
+        assert call_args['messages'][-1] == {"role": "assistant", "content": "【現病歴】"}
+
+    @patch('external_service.claude_api.MAX_CONTINUATIONS', 2)
+    def test_generate_content_continues_after_max_tokens(self):
+        first = Mock(content=[Mock(text="【現病歴】\n高血圧で通院中。 ")], stop_reason="max_tokens",
+                     usage=Mock(input_tokens=100, output_tokens=50))
+        second = Mock(content=[Mock(text="\n【備考】\nなし")], stop_reason="end_turn",
+                      usage=Mock(input_tokens=150, output_tokens=10))
+
+        mock_client = Mock()
+        mock_client.messages.create.side_effect = [first, second]
+        self.client.client = mock_client
+
+        result = self.client._generate_content("Test prompt", "apac.anthropic.claude-sonnet-4-20250514-v1:0")
+
+        assert result == ("【現病歴】\n高血圧で通院中。\n【備考】\nなし", 250, 60)
+        assert self.client.continuation_count == 1
+        continuation_messages = mock_client.messages.create.call_args_list[1][1]['messages']
+        assert continuation_messages[-1] == {"role": "assistant", "content": "【現病歴】\n高血圧で通院中。"}
+
+    @patch('external_service.claude_api.MAX_CONTINUATIONS', 1)
+    def test_generate_content_continuation_limit(self):
+        truncated = Mock(content=[Mock(text="途中")], stop_reason="max_tokens",
+                         usage=Mock(input_tokens=100, output_tokens=50))
+
+        mock_client = Mock()
+        mock_client.messages.create.return_value = truncated
+        self.client.client = mock_client
+
+        result = self.client._generate_content("Test prompt", "apac.anthropic.claude-sonnet-4-20250514-v1:0")
+
+        assert mock_client.messages.create.call_count == 2
+        assert result[0] == "途中途中"
+        assert self.client.continuation_count == 1
+
+    def test_generate_content_structured_output_not_continued(self):
+        truncated = Mock(content=[Mock(type="tool_use", input={"現病歴": "途中"})], stop_reason="max_tokens",
+                         usage=Mock(input_tokens=100, output_tokens=50))
+
+        mock_client = Mock()
+        mock_client.messages.create.return_value = truncated
+        self.client.client = mock_client
+        self.client.structured_output = True
+
+        self.client._generate_content("Test prompt", "apac.anthropic.claude-sonnet-4-20250514-v1:0")
+
+        assert mock_client.messages.create.call_count == 1
+
+    def test_generate_with_context_caches_karte(self):
+        mock_response = Mock(content=[Mock(text="\nキーパーソンは長女。")], stop_reason="end_turn",
+                             usage=Mock(input_tokens=20, output_tokens=10))
+
+        mock_client = Mock()
+        mock_client.messages.create.return_value = mock_response
+        self.client.client = mock_client
+        self.client.output_prefill = "【備考】"
+
+        result = self.client._generate_with_context("context", "instruction", "model")
+
+        assert result == ("【備考】\nキーパーソンは長女。", 20, 10)
+        content = mock_client.messages.create.call_args[1]['messages'][0]['content']
+        assert content[0] == {"type": "text", "text": "context", "cache_control": {"type": "ephemeral"}}
+        assert content[1] == {"type": "text", "text": "instruction"}
+
+    def test_generate_with_context_without_instruction(self):
+        mock_client = Mock()
+        mock_client.messages.create.return_value = Mock(content=[Mock(text="出力")], stop_reason="end_turn",
+                                                        usage=Mock(input_tokens=20, output_tokens=10))
+        self.client.client = mock_client
+
+        self.client._generate_with_context("context", "", "model")
+
+        content = mock_client.messages.create.call_args[1]['messages'][0]['content']
+        assert content == [{"type": "text", "text": "context", "cache_control": {"type": "ephemeral"}}]
+
+    def test_summary_and_refinement_share_cached_prefix(self):
+        mock_client = Mock()
+        mock_client.messages.create.return_value = Mock(content=[Mock(text="出力")], stop_reason="end_turn",
+                                                        usage=Mock(input_tokens=20, output_tokens=10))
+        self.client.client = mock_client
+
+        with patch.object(self.client, 'initialize'), \
+             patch.object(self.client, 'get_prompt_template', return_value="テンプレート"), \
+             patch('external_service.base_api.is_structured_output_enabled', return_value=False), \
+             patch('external_service.base_api.release_connection'):
+            self.client.generate_summary("カルテ", "追加", "処方", document_type="退院時サマリ", model_name="model",
+                                         prefilled_sections={"入院期間": "28日間"})
+            self.client.refine_summary("【現病歴】\n出力", "簡潔に", "カルテ", "追加", "処方",
+                                       document_type="退院時サマリ", model_name="model")
+
+        summary_call, refine_call = mock_client.messages.create.call_args_list
+        summary_prefix = summary_call[1]['messages'][0]['content'][0]
+        assert summary_prefix["cache_control"] == {"type": "ephemeral"}
+        assert "【作成済みの項目】" not in summary_prefix["text"]
+        assert refine_call[1]['messages'][0]['content'][0] == summary_prefix
+
+    def test_generate_conversation_caches_marked_turns(self):
+        mock_response = Mock(content=[Mock(text="修正版")], stop_reason="end_turn",
+                             usage=Mock(input_tokens=20, output_tokens=10))
+
+        mock_client = Mock()
+        mock_client.messages.create.return_value = mock_response
+        self.client.client = mock_client
+
+        self.client._generate_conversation([
+            {"role": "user", "content": "karte", "cache": True},
+            {"role": "assistant", "content": "前回の出力"},
+            {"role": "user", "content": "修正指示"},
+        ], "model")
+
+        messages = mock_client.messages.create.call_args[1]['messages']
+        assert messages[0] == {
+            "role": "user",
+            "content": [{"type": "text", "text": "karte", "cache_control": {"type": "ephemeral"}}]
+        }
+        assert messages[1] == {"role": "assistant", "content": "前回の出力"}
+        assert messages[2] == {"role": "user", "content": "修正指示"}
 
     def test_generate_content_message_format(self):
         mock_response = Mock()
@@ -258,4 +410,43 @@ class TestClaudeAPIClient:
         # Should use default bedrock model
         call_args = mock_client.messages.create.call_args[1]
         assert call_args['model'] == 'apac.anthropic.claude-sonnet-4-20250514-v1:0'
-        assert result == ("Default model response", 100, 200)
\ No newline at end of file
+        assert result == ("Default model response", 100, 200)
+    def test_generate_content_structured_output(self):
+        mock_tool_block = Mock()
+        mock_tool_block.type = "tool_use"
+        mock_tool_block.input = {"入院期間": "2024/04/01～2024/04/10", "備考": ""}
+        mock_response = Mock()
+        mock_response.content = [mock_tool_block]
+        mock_response.usage.input_tokens = 100
+        mock_response.usage.output_tokens = 50
+
+        mock_client = Mock()
+        mock_client.messages.create.return_value = mock_response
+        self.client.client = mock_client
+        self.client.structured_output = True
+
+        result = self.client._generate_content("Test prompt", "claude-model")
+
+        assert json.loads(result[0]) == mock_tool_block.input
+        assert "2024/04/01" in result[0]
+        call_args = mock_client.messages.create.call_args[1]
+        assert call_args['tools'][0]['name'] == "record_discharge_summary"
+        assert call_args['tool_choice'] == {"type": "tool", "name": "record_discharge_summary"}
+
+    def test_generate_content_structured_output_without_tool_use(self):
+        mock_text_block = Mock()
+        mock_text_block.type = "text"
+        mock_text_block.text = "入院期間\n2024/04/01"
+        mock_response = Mock()
+        mock_response.content = [mock_text_block]
+        mock_response.usage.input_tokens = 100
+        mock_response.usage.output_tokens = 50
+
+        mock_client = Mock()
+        mock_client.messages.create.return_value = mock_response
+        self.client.client = mock_client
+        self.client.structured_output = True
+
+        result = self.client._generate_content("Test prompt", "claude-model")
+
+        assert result[0] == "入院期間\n2024/04/01"
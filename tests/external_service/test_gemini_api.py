@@ -3,6 +3,7 @@ import pytest
 from unittest.mock import Mock, patch
 
 from external_service.gemini_api import GeminiAPIClient
+from utils.constants import DEFAULT_SECTION_NAMES
 from utils.exceptions import APIError
 
 
@@ -159,6 +160,97 @@ class TestGeminiAPIClient:
             config=mock_generate_config
         )
 
+    @patch('external_service.gemini_api.GEMINI_THINKING_LEVEL', 'HIGH')
+    @patch('external_service.gemini_api.types')
+    def test_generate_content_uses_generation_profile(self, mock_types):
+        mock_thinking_config = Mock()
+        mock_types.ThinkingConfig.return_value = mock_thinking_config
+        mock_types.ThinkingLevel.LOW = 'LOW'
+
+        mock_response = Mock()
+        mock_response.text = "Generated summary text"
+        mock_response.usage_metadata = Mock(prompt_token_count=150, candidates_token_count=300)
+
+        mock_client = Mock()
+        mock_client.models.generate_content.return_value = mock_response
+        self.client.client = mock_client
+        self.client.generation_settings = {"max_tokens": 4000, "thinking_level": "LOW", "stop_sequences": []}
+
+        self.client._generate_content("Test prompt", "gemini-pro")
+
+        mock_types.ThinkingConfig.assert_called_once_with(thinking_level='LOW')
+        mock_types.GenerateContentConfig.assert_called_once_with(
+            thinking_config=mock_thinking_config,
+            max_output_tokens=4000
+        )
+
+    @patch('external_service.gemini_api.MAX_CONTINUATIONS', 2)
+    @patch('external_service.gemini_api.types')
+    def test_generate_content_continues_after_max_tokens(self, mock_types):
+        max_tokens_reason = Mock()
+        max_tokens_reason.name = "MAX_TOKENS"
+        truncated = Mock(text="【現病歴】\n高血圧で通院中の78歳男性。",
+                         usage_metadata=Mock(prompt_token_count=100, candidates_token_count=50),
+                         candidates=[Mock(finish_reason=max_tokens_reason)])
+        finished = Mock(text="通院中の78歳男性。\n【備考】\nなし",
+                        usage_metadata=Mock(prompt_token_count=160, candidates_token_count=20),
+                        candidates=[Mock(finish_reason="STOP")])
+
+        mock_client = Mock()
+        mock_client.models.generate_content.side_effect = [truncated, finished]
+        self.client.client = mock_client
+
+        result = self.client._generate_content("Test prompt", "gemini-pro")
+
+        assert result == ("【現病歴】\n高血圧で通院中の78歳男性。\n【備考】\nなし", 260, 70)
+        assert self.client.continuation_count == 1
+        contents = mock_client.models.generate_content.call_args_list[1][1]['contents']
+        assert [content["role"] for content in contents] == ["user", "model", "user"]
+        assert contents[1]["parts"][0]["text"] == "【現病歴】\n高血圧で通院中の78歳男性。"
+
+    @patch('external_service.gemini_api.types')
+    def test_generate_content_truncated_without_text(self, mock_types):
+        max_tokens_reason = Mock()
+        max_tokens_reason.name = "MAX_TOKENS"
+        truncated = Mock(text=None,
+                         usage_metadata=Mock(prompt_token_count=100, candidates_token_count=None),
+                         candidates=[Mock(finish_reason=max_tokens_reason)])
+        finished = Mock(text="【現病歴】\n高血圧で通院中。",
+                        usage_metadata=Mock(prompt_token_count=110, candidates_token_count=20),
+                        candidates=[Mock(finish_reason="STOP")])
+
+        mock_client = Mock()
+        mock_client.models.generate_content.side_effect = [truncated, finished]
+        self.client.client = mock_client
+
+        result = self.client._generate_content("Test prompt", "gemini-pro")
+
+        assert result == ("【現病歴】\n高血圧で通院中。", 210, 20)
+        contents = mock_client.models.generate_content.call_args_list[1][1]['contents']
+        assert [content["role"] for content in contents] == ["user"]
+
+    @patch('external_service.gemini_api.types')
+    def test_generate_conversation_maps_roles(self, mock_types):
+        mock_response = Mock(text="修正版", usage_metadata=Mock(prompt_token_count=10, candidates_token_count=5))
+
+        mock_client = Mock()
+        mock_client.models.generate_content.return_value = mock_response
+        self.client.client = mock_client
+
+        result = self.client._generate_conversation([
+            {"role": "user", "content": "karte", "cache": True},
+            {"role": "assistant", "content": "前回の出力"},
+            {"role": "user", "content": "修正指示"},
+        ], "gemini-pro")
+
+        assert result == ("修正版", 10, 5)
+        contents = mock_client.models.generate_content.call_args[1]['contents']
+        assert contents == [
+            {"role": "user", "parts": [{"text": "karte"}]},
+            {"role": "model", "parts": [{"text": "前回の出力"}]},
+            {"role": "user", "parts": [{"text": "修正指示"}]},
+        ]
+
     def test_generate_content_no_text_attribute(self):
         mock_response = Mock()
         delattr(mock_response, 'text')  # Remove text attribute
@@ -323,4 +415,22 @@ class TestGeminiAPIClient:
         result = self.client._generate_content("Test prompt", "gemini-pro")
         
         assert result == ("Mock string conversion", 75, 150)
-        mock_response.__str__.assert_called_once()
\ No newline at end of file
+        mock_response.__str__.assert_called_once()
+    @patch('external_service.gemini_api.types')
+    def test_generate_content_structured_output(self, mock_types):
+        mock_response = Mock()
+        mock_response.text = '{"入院期間": ""}'
+        mock_response.usage_metadata.prompt_token_count = 10
+        mock_response.usage_metadata.candidates_token_count = 5
+
+        mock_client = Mock()
+        mock_client.models.generate_content.return_value = mock_response
+        self.client.client = mock_client
+        self.client.structured_output = True
+
+        result = self.client._generate_content("Test prompt", "gemini-pro")
+
+        assert result == ('{"入院期間": ""}', 10, 5)
+        config_kwargs = mock_types.GenerateContentConfig.call_args[1]
+        assert config_kwargs['response_mime_type'] == "application/json"
+        assert config_kwargs['response_schema']['required'] == DEFAULT_SECTION_NAMES
@@ -1,9 +1,12 @@
 import datetime
+import json
 import queue
 import threading
+from concurrent.futures import Future
 from unittest.mock import Mock, patch
 
 from services.generation_service import GenerationService
+from utils.constants import DEFAULT_SECTION_NAMES
 
 
 class TestGenerationService:
@@ -12,11 +15,13 @@ class TestGenerationService:
         with patch('services.generation_service.ModelService.normalize_selection_params') as mock_normalize, \
              patch('services.generation_service.ModelService.determine_final_model') as mock_determine, \
              patch('services.generation_service.ModelService.get_provider_and_model') as mock_get_provider, \
-             patch('services.generation_service.ValidationService.validate_api_credentials_for_provider') as mock_validate:
+             patch('services.generation_service.ValidationService.validate_api_credentials_for_provider') as mock_validate, \
+             patch('services.generation_service.ModelService.get_generation_profile') as mock_get_profile:
             
             mock_normalize.return_value = ("normalized_dept", "normalized_doc_type")
             mock_determine.return_value = ("final_model", True, "original_model")
             mock_get_provider.return_value = ("gemini", "gemini-pro")
+            mock_get_profile.return_value = "short"
             
             result = GenerationService.prepare_generation_parameters(
                 "dept", "doc_type", "doctor", "model", True, "input", "info"
@@ -29,7 +34,8 @@ class TestGenerationService:
                 'model_name': "gemini-pro",
                 'model_detail': "gemini-pro",
                 'model_switched': True,
-                'original_model': "original_model"
+                'original_model': "original_model",
+                'generation_profile': "short"
             }
             
             assert result == expected
@@ -40,12 +46,14 @@ class TestGenerationService:
             )
             mock_get_provider.assert_called_once_with("final_model")
             mock_validate.assert_called_once_with("gemini")
+            mock_get_profile.assert_called_once_with("normalized_dept", "normalized_doc_type", "doctor")
 
     def test_prepare_generation_parameters_claude_provider(self):
         with patch('services.generation_service.ModelService.normalize_selection_params') as mock_normalize, \
              patch('services.generation_service.ModelService.determine_final_model') as mock_determine, \
              patch('services.generation_service.ModelService.get_provider_and_model') as mock_get_provider, \
-             patch('services.generation_service.ValidationService.validate_api_credentials_for_provider') as mock_validate:
+             patch('services.generation_service.ValidationService.validate_api_credentials_for_provider') as mock_validate, \
+             patch('services.generation_service.ModelService.get_generation_profile'):
             
             mock_normalize.return_value = ("normalized_dept", "normalized_doc_type")
             mock_determine.return_value = ("Claude", False, "Claude")
@@ -58,8 +66,8 @@ class TestGenerationService:
             assert result['model_detail'] == "Claude"  # For Claude, use final_model not model_name
 
     def test_execute_api_generation(self):
-        with patch('services.generation_service.generate_summary') as mock_generate:
-            mock_generate.return_value = ("summary", 100, 200)
+        with patch('services.generation_service.generate_summary_with_usage') as mock_generate:
+            mock_generate.return_value = ("summary", 100, 200, 1)
             
             result = GenerationService.execute_api_generation(
                 "gemini", "gemini-pro", "input", "info", "prescription",
@@ -69,7 +77,8 @@ class TestGenerationService:
             expected = {
                 'output_summary': "summary",
                 'input_tokens': 100,
-                'output_tokens': 200
+                'output_tokens': 200,
+                'continuation_count': 1
             }
             
             assert result == expected
@@ -81,7 +90,9 @@ class TestGenerationService:
                 department="dept",
                 document_type="doc_type",
                 doctor="doctor",
-                model_name="gemini-pro"
+                model_name="gemini-pro",
+                prefilled_sections=None,
+                generation_profile=None
             )
 
     def test_format_generation_result(self):
@@ -110,6 +121,18 @@ class TestGenerationService:
             mock_format.assert_called_once_with("raw_summary")
             mock_parse.assert_called_once_with("formatted_summary")
 
+    def test_format_generation_result_with_prefilled_sections(self):
+        output = "【入院期間】\nモデルの記載\n\n【現病歴】\n心不全で入院"
+        period = "2024年4月1日～2024年4月28日（28日間）"
+
+        result = GenerationService.format_generation_result(
+            output, 100, 200, "claude", False, None, {"入院期間": period}
+        )
+
+        assert result["parsed_summary"]["入院期間"] == period
+        assert result["parsed_summary"]["現病歴"] == "心不全で入院"
+        assert result["output_summary"] == f"【入院期間】\n{period}\n\n【現病歴】\n心不全で入院"
+
     def test_format_generation_result_no_model_switch(self):
         with patch('services.generation_service.format_output_summary') as mock_format, \
              patch('services.generation_service.parse_output_summary') as mock_parse:
@@ -124,6 +147,26 @@ class TestGenerationService:
             assert result["model_switched"] is False
             assert result["original_model"] is None
 
+    def test_format_generation_result_structured_output(self):
+        sections = {name: f"{name}の内容" for name in DEFAULT_SECTION_NAMES}
+
+        with patch('services.generation_service.parse_output_summary') as mock_parse:
+            result = GenerationService.format_generation_result(
+                json.dumps(sections, ensure_ascii=False), 100, 200, "claude", False, "Claude"
+            )
+
+        assert result["parsed_summary"] == sections
+        assert result["output_summary"].startswith("【入院期間】\n入院期間の内容")
+        mock_parse.assert_not_called()
+
+    def test_format_generation_result_invalid_json_falls_back(self):
+        result = GenerationService.format_generation_result(
+            '{"入院期間": "2024/04/01"}', 100, 200, "claude", False, "Claude"
+        )
+
+        assert result["output_summary"] == '{"入院期間": "2024/04/01"}'
+        assert result["parsed_summary"]["入院期間"] == ""
+
     def test_generate_summary_task_success(self):
         mock_queue = Mock(spec=queue.Queue)
         
@@ -138,18 +181,21 @@ class TestGenerationService:
                 'normalized_doc_type': 'doc_type',
                 'model_detail': 'gemini-pro',
                 'model_switched': False,
-                'original_model': 'gemini-pro'
+                'original_model': 'gemini-pro',
+                'generation_profile': 'standard'
             }
             
             mock_execute.return_value = {
                 'output_summary': 'summary',
                 'input_tokens': 100,
-                'output_tokens': 200
+                'output_tokens': 200,
+                'continuation_count': 1
             }
             
             mock_format.return_value = {
                 'success': True,
                 'output_summary': 'formatted',
+                'parsed_summary': {},
                 'input_tokens': 100,
                 'output_tokens': 200
             }
@@ -164,6 +210,239 @@ class TestGenerationService:
             mock_queue.put.assert_called_once()
             result_call = mock_queue.put.call_args[0][0]
             assert result_call['success'] is True
+            assert result_call['input_chars_saved'] == 0
+            assert result_call['input_tokens_saved'] == 0
+            assert result_call['dropped_entries'] == []
+            assert result_call['continuation_count'] == 1
+            assert result_call['regenerated_sections'] == []
+
+    @patch('services.generation_service.SECTION_COMPLETENESS_CHECK', False)
+    def test_generate_summary_task_preprocesses_input(self):
+        mock_queue = Mock(spec=queue.Queue)
+        note = "看護記録: 夜間は良眠、疼痛の訴えなし。バイタル安定、食事は全量摂取。"
+        input_text = f"{note}\n\n{note}\n\n{note}"
+
+        with patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare, \
+             patch('services.generation_service.GenerationService.execute_api_generation') as mock_execute, \
+             patch('services.generation_service.GenerationService.format_generation_result') as mock_format:
+
+            mock_prepare.return_value = {
+                'provider': 'claude',
+                'model_name': 'claude-model',
+                'normalized_dept': 'default',
+                'normalized_doc_type': '退院時サマリ',
+                'model_detail': 'claude-model',
+                'model_switched': False,
+                'original_model': None,
+                'generation_profile': 'standard'
+            }
+            mock_execute.return_value = {'output_summary': 'summary', 'input_tokens': 10, 'output_tokens': 20,
+                                         'continuation_count': 0}
+            mock_format.return_value = {'success': True, 'parsed_summary': {}}
+
+            GenerationService.generate_summary_task(input_text, "default", "Claude", mock_queue)
+
+            assert mock_prepare.call_args[0][5] == note
+            assert mock_execute.call_args[0][2] == note
+
+            result_call = mock_queue.put.call_args[0][0]
+            assert result_call['input_chars_saved'] == len(input_text) - len(note)
+            assert result_call['input_tokens_saved'] > 0
+
+    @patch('services.generation_service.SECTION_COMPLETENESS_CHECK', False)
+    @patch('services.generation_service.CONTEXT_TOKEN_BUDGET', 80)
+    @patch('services.generation_service.CONTEXT_SELECTION', True)
+    def test_generate_summary_task_context_selection(self):
+        mock_queue = Mock(spec=queue.Queue)
+        entries = [f"4/{day} 経過観察。特記事項なし、病棟内で安静に過ごしている状態。{day}" for day in range(1, 8)]
+        input_text = "\n".join(entries)
+
+        with patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare, \
+             patch('services.generation_service.GenerationService.execute_api_generation') as mock_execute, \
+             patch('services.generation_service.GenerationService.format_generation_result') as mock_format:
+
+            mock_prepare.return_value = {
+                'provider': 'claude',
+                'model_name': 'claude-model',
+                'normalized_dept': 'default',
+                'normalized_doc_type': '退院時サマリ',
+                'model_detail': 'claude-model',
+                'model_switched': False,
+                'original_model': None,
+                'generation_profile': 'standard'
+            }
+            mock_execute.return_value = {'output_summary': 'summary', 'input_tokens': 10, 'output_tokens': 20,
+                                         'continuation_count': 0}
+            mock_format.return_value = {'success': True, 'parsed_summary': {}}
+
+            GenerationService.generate_summary_task(input_text, "default", "Claude", mock_queue)
+
+            selected_text = mock_prepare.call_args[0][5]
+            assert entries[0] in selected_text
+            assert entries[-1] in selected_text
+            assert len(selected_text) < len(input_text)
+
+            result_call = mock_queue.put.call_args[0][0]
+            assert result_call['dropped_entries']
+            assert result_call['dropped_entries'][0]['date'] == "4/2"
+
+    @patch('services.generation_service.SECTION_COMPLETENESS_CHECK', True)
+    def test_generate_summary_task_regenerates_empty_sections(self):
+        mock_queue = Mock(spec=queue.Queue)
+
+        with patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare, \
+             patch('services.generation_service.GenerationService.execute_api_generation') as mock_execute, \
+             patch('services.generation_service.regenerate_section') as mock_regenerate:
+
+            mock_prepare.return_value = {
+                'provider': 'claude',
+                'model_name': 'claude-model',
+                'normalized_dept': 'default',
+                'normalized_doc_type': '退院時サマリ',
+                'model_detail': 'claude-model',
+                'model_switched': False,
+                'original_model': None,
+                'generation_profile': 'standard'
+            }
+            mock_execute.return_value = {
+                'output_summary': "【現病歴】\n高血圧\n【入院時検査】\nCRP 1.8\n【退院申し送り】\n外来フォロー",
+                'input_tokens': 1000,
+                'output_tokens': 200,
+                'continuation_count': 0
+            }
+            mock_regenerate.return_value = ("利尿薬で改善", 50, 20)
+
+            GenerationService.generate_summary_task("4/1 入院", "default", "Claude", mock_queue)
+
+            result_call = mock_queue.put.call_args[0][0]
+            assert result_call['regenerated_sections'] == ["入院中の治療経過"]
+            assert result_call['parsed_summary']["入院中の治療経過"] == "利尿薬で改善"
+            assert "【入院中の治療経過】\n利尿薬で改善\n" in result_call['output_summary']
+            assert result_call['input_tokens'] == 1050
+            assert result_call['output_tokens'] == 220
+            assert mock_regenerate.call_args[0][:2] == ('claude', "入院中の治療経過")
+            assert mock_regenerate.call_args[1]['other_sections']["現病歴"] == "高血圧"
+
+    @patch('services.generation_service.SECTION_COMPLETENESS_CHECK', True)
+    def test_generate_summary_task_keeps_summary_when_regeneration_fails(self):
+        mock_queue = Mock(spec=queue.Queue)
+
+        with patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare, \
+             patch('services.generation_service.GenerationService.execute_api_generation') as mock_execute, \
+             patch('services.generation_service.regenerate_section') as mock_regenerate:
+
+            mock_prepare.return_value = {
+                'provider': 'claude',
+                'model_name': 'claude-model',
+                'normalized_dept': 'default',
+                'normalized_doc_type': '退院時サマリ',
+                'model_detail': 'claude-model',
+                'model_switched': False,
+                'original_model': None,
+                'generation_profile': 'standard'
+            }
+            output_summary = "【現病歴】\n高血圧\n【退院申し送り】\n外来フォロー"
+            mock_execute.return_value = {
+                'output_summary': output_summary,
+                'input_tokens': 1000,
+                'output_tokens': 200,
+                'continuation_count': 0
+            }
+            mock_regenerate.side_effect = [Exception("ThrottlingException"), ("", 50, 5)]
+
+            GenerationService.generate_summary_task("4/1 入院", "default", "Claude", mock_queue)
+
+            result_call = mock_queue.put.call_args[0][0]
+            assert result_call['success'] is True
+            assert result_call['regenerated_sections'] == []
+            assert result_call['output_summary'] == output_summary
+            assert result_call['input_tokens'] == 1050
+            assert result_call['output_tokens'] == 205
+
+    def test_find_empty_sections(self):
+        parsed_summary = {"入院期間": "", "現病歴": "高血圧", "入院時検査": " ", "入院中の治療経過": "",
+                          "退院申し送り": "外来", "備考": ""}
+
+        assert GenerationService.find_empty_sections(parsed_summary, "退院時サマリ") == ["入院時検査", "入院中の治療経過"]
+        assert GenerationService.find_empty_sections(
+            parsed_summary, "退院時サマリ", {"入院時検査": "CRP 1.8"}
+        ) == ["入院中の治療経過"]
+        assert GenerationService.find_empty_sections({}, "現病歴") == []
+
+    def test_regenerate_section_task(self):
+        with patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare, \
+             patch('services.generation_service.regenerate_section') as mock_regenerate:
+
+            mock_prepare.return_value = {
+                'provider': 'gemini',
+                'model_name': 'gemini-pro',
+                'normalized_dept': 'default',
+                'normalized_doc_type': '退院時サマリ',
+                'model_detail': 'gemini-pro',
+                'model_switched': False,
+                'original_model': None,
+                'generation_profile': 'standard'
+            }
+            mock_regenerate.return_value = ("外来で腎機能をフォロー", 30, 10)
+
+            result = GenerationService.regenerate_section_task(
+                "退院申し送り", "4/1 入院", "", "", "【現病歴】\n高血圧\n【退院申し送り】\n誤った内容",
+                {"現病歴": "高血圧", "退院申し送り": "誤った内容"}, "default", "Gemini_Pro"
+            )
+
+            assert result['success'] is True
+            assert result['output_summary'] == "【現病歴】\n高血圧\n【退院申し送り】\n外来で腎機能をフォロー"
+            assert result['parsed_summary']["退院申し送り"] == "外来で腎機能をフォロー"
+            assert result['input_tokens'] == 30
+            assert result['model_detail'] == 'gemini-pro'
+            assert result['regenerated_sections'] == ["退院申し送り"]
+
+    def test_refine_summary_task(self):
+        with patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare, \
+             patch('services.generation_service.refine_summary') as mock_refine:
+
+            mock_prepare.return_value = {
+                'provider': 'claude',
+                'model_name': 'claude-model',
+                'normalized_dept': 'default',
+                'normalized_doc_type': '退院時サマリ',
+                'model_detail': 'Claude',
+                'model_switched': False,
+                'original_model': None,
+                'generation_profile': 'standard'
+            }
+            mock_refine.return_value = ("【現病歴】\n**高血圧**で通院中", 40, 60)
+
+            result = GenerationService.refine_summary_task(
+                "もっと簡潔に", "4/1 入院", "", "", "【現病歴】\n元の記載", "default", "Claude"
+            )
+
+            assert result['success'] is True
+            assert result['output_summary'] == "【現病歴】\n高血圧で通院中"
+            assert result['parsed_summary']["現病歴"] == "高血圧で通院中"
+            assert result['input_tokens'] == 40
+            assert mock_refine.call_args[0][:3] == ('claude', "【現病歴】\n元の記載", "もっと簡潔に")
+            assert mock_refine.call_args[1]['generation_profile'] == 'standard'
+
+    def test_refine_summary_task_exception(self):
+        with patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare:
+            mock_prepare.side_effect = Exception("Test error")
+
+            result = GenerationService.refine_summary_task("短く", "4/1 入院", "", "", "", "default", "Claude")
+
+            assert result['success'] is False
+            assert "Test error" in result['error']
+
+    def test_regenerate_section_task_exception(self):
+        with patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare:
+            mock_prepare.side_effect = Exception("Test error")
+
+            result = GenerationService.regenerate_section_task(
+                "備考", "4/1 入院", "", "", "", {}, "default", "Claude"
+            )
+
+            assert result['success'] is False
+            assert "Test error" in result['error']
 
     def test_generate_summary_task_exception(self):
         mock_queue = Mock(spec=queue.Queue)
@@ -180,6 +459,44 @@ class TestGenerationService:
             assert result_call['success'] is False
             assert "Test error" in result_call['error']
 
+    @patch('services.generation_service.SECTION_COMPLETENESS_CHECK', False)
+    def test_generate_summary_task_reuses_preparation(self):
+        mock_queue = Mock(spec=queue.Queue)
+        preparation = Future()
+        preparation.set_result({
+            "prepared": {
+                "input_text": "事前処理済み", "current_prescription": "処方",
+                "prefilled_sections": {}, "dropped_entries": [], "chars_saved": 5, "tokens_saved": 2
+            },
+            "generation_params": {
+                'provider': 'claude', 'model_name': 'claude-model', 'normalized_dept': 'default',
+                'normalized_doc_type': '退院時サマリ', 'model_detail': 'Claude', 'model_switched': False,
+                'original_model': 'Claude', 'generation_profile': 'standard'
+            }
+        })
+
+        with patch('services.generation_service.GenerationService.prepare_input') as mock_input, \
+             patch('services.generation_service.GenerationService.prepare_generation_parameters') as mock_prepare, \
+             patch('services.generation_service.generate_summary_with_usage',
+                   return_value=("入院期間: 記載", 10, 20, 0)) as mock_generate:
+            GenerationService.generate_summary_task(
+                "元のカルテ", "default", "Claude", mock_queue, preparation=preparation
+            )
+
+        mock_input.assert_not_called()
+        mock_prepare.assert_not_called()
+        assert mock_generate.call_args.kwargs['medical_text'] == "事前処理済み"
+        result = mock_queue.put.call_args[0][0]
+        assert result['success'] is True
+        assert result['input_chars_saved'] == 5
+
+    def test_resolve_preparation_failure_falls_back(self):
+        preparation = Future()
+        preparation.set_exception(Exception("準備エラー"))
+
+        assert GenerationService.resolve_preparation(preparation) is None
+        assert GenerationService.resolve_preparation(None) is None
+
     @patch('services.generation_service.time.sleep')
     @patch('services.generation_service.datetime')
     @patch('services.generation_service.st')
@@ -66,6 +66,21 @@ class TestModelService:
             
             assert result == "Claude"
 
+    def test_get_generation_profile_from_prompt(self):
+        with patch('services.model_service.get_prompt_manager') as mock_get_manager:
+            mock_get_manager.return_value.get_prompt.return_value = {"generation_profile": "short"}
+
+            result = ModelService.get_generation_profile("dept", "退院時サマリ", "doctor")
+
+            assert result == "short"
+
+    def test_get_generation_profile_falls_back_to_document_type(self):
+        with patch('services.model_service.get_prompt_manager') as mock_get_manager:
+            mock_get_manager.return_value.get_prompt.return_value = None
+
+            assert ModelService.get_generation_profile("dept", "現病歴", "doctor") == "short"
+            assert ModelService.get_generation_profile("dept", "退院時サマリ", "doctor") == "standard"
+
     @patch('services.model_service.MAX_TOKEN_THRESHOLD', 1000)
     def test_check_model_switching_for_token_limit_no_switch_needed(self):
         input_text = "short text"
@@ -0,0 +1,99 @@
+from concurrent.futures import Future
+from unittest.mock import patch
+
+import pytest
+
+from services.preparation_service import PreparationService
+
+SESSION_PARAMS = {
+    "selected_department": "default",
+    "selected_document_type": "退院時サマリ",
+    "selected_doctor": "default",
+    "selected_model": "Claude",
+    "model_explicitly_selected": False
+}
+
+LONG_TEXT = "4/1 うっ血性心不全の診断で入院となった。" * 10
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    PreparationService.clear()
+    yield
+    PreparationService.clear()
+
+
+def _completed_future(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class TestPreparationService:
+
+    def test_build_key_changes_with_inputs(self):
+        key = PreparationService.build_key(LONG_TEXT, "", "", SESSION_PARAMS)
+
+        assert key == PreparationService.build_key(LONG_TEXT, "", "", SESSION_PARAMS)
+        assert key != PreparationService.build_key(LONG_TEXT, "追加", "", SESSION_PARAMS)
+        assert key != PreparationService.build_key(
+            LONG_TEXT, "", "", {**SESSION_PARAMS, "selected_model": "Gemini_Pro"}
+        )
+
+    def test_prepare_runs_preprocessing_and_routing(self):
+        with patch('services.preparation_service.GenerationService.prepare_input') as mock_input, \
+             patch('services.preparation_service.GenerationService.prepare_generation_parameters') as mock_params:
+            mock_input.return_value = {"input_text": "処理済み"}
+            mock_params.return_value = {"provider": "claude"}
+
+            result = PreparationService.prepare(LONG_TEXT, "追加", "処方", SESSION_PARAMS)
+
+        mock_input.assert_called_once_with(LONG_TEXT, "処方", "追加", "default")
+        assert mock_params.call_args[0][5] == "処理済み"
+        assert result == {"prepared": {"input_text": "処理済み"}, "generation_params": {"provider": "claude"}}
+
+    def test_start_preparation_skips_short_input(self):
+        with patch.object(PreparationService, '_executor') as mock_executor:
+            assert PreparationService.start_preparation("短い", "", "", SESSION_PARAMS) is None
+        mock_executor.submit.assert_not_called()
+
+    def test_start_preparation_counts_tokens(self):
+        # 英数字は約4文字で1トークンのため、文字数が下限を超えても見積もりトークン数で判定する
+        with patch.object(PreparationService, '_executor') as mock_executor:
+            assert PreparationService.start_preparation("BP 120/80 " * 20, "", "", SESSION_PARAMS) is None
+        mock_executor.submit.assert_not_called()
+
+    def test_start_preparation_reuses_pending_work(self):
+        with patch.object(PreparationService, '_executor') as mock_executor:
+            mock_executor.submit.return_value = Future()
+
+            first = PreparationService.start_preparation(LONG_TEXT, "", "", SESSION_PARAMS)
+            second = PreparationService.start_preparation(LONG_TEXT, "", "", SESSION_PARAMS)
+
+        assert first is second
+        mock_executor.submit.assert_called_once()
+
+    @patch('services.preparation_service.PREPARATION_CACHE_SIZE', 2)
+    def test_cache_is_bounded(self):
+        with patch.object(PreparationService, '_executor') as mock_executor:
+            mock_executor.submit.side_effect = lambda *args: Future()
+            for suffix in ["1", "2", "3"]:
+                PreparationService.start_preparation(LONG_TEXT + suffix, "", "", SESSION_PARAMS)
+
+        assert PreparationService.take_preparation(LONG_TEXT + "1", "", "", SESSION_PARAMS) is None
+        assert PreparationService.take_preparation(LONG_TEXT + "3", "", "", SESSION_PARAMS) is not None
+
+    def test_take_preparation_consumes_entry(self):
+        with patch.object(PreparationService, '_executor') as mock_executor:
+            mock_executor.submit.return_value = _completed_future({"prepared": {}})
+            future = PreparationService.start_preparation(LONG_TEXT, "", "", SESSION_PARAMS)
+
+        assert PreparationService.take_preparation(LONG_TEXT, "", "", SESSION_PARAMS) is future
+        assert PreparationService.take_preparation(LONG_TEXT, "", "", SESSION_PARAMS) is None
+
+    def test_take_preparation_hash_mismatch(self):
+        with patch.object(PreparationService, '_executor') as mock_executor:
+            mock_executor.submit.return_value = Future()
+            PreparationService.start_preparation(LONG_TEXT, "", "", SESSION_PARAMS)
+
+        assert PreparationService.take_preparation(LONG_TEXT + "追記", "", "", SESSION_PARAMS) is None
@@ -5,6 +5,13 @@ from services.statistics_service import StatisticsService
 import pytz
 
 
+@pytest.fixture(autouse=True)
+def synchronous_usage_saving():
+    with patch('services.statistics_service.USAGE_RECORDER', False), \
+         patch('services.statistics_service.uuid.uuid4', return_value=Mock(hex="request-id")):
+        yield
+
+
 class TestStatisticsService:
 
     @patch('services.statistics_service.get_usage_statistics_repository')
@@ -26,7 +33,10 @@ class TestStatisticsService:
             "model_detail": "claude-3-sonnet",
             "input_tokens": 100,
             "output_tokens": 200,
-            "processing_time": 5.75
+            "processing_time": 5.75,
+            "input_chars_saved": 1200,
+            "input_tokens_saved": 900,
+            "continuation_count": 1
         }
         
         session_params = {
@@ -49,7 +59,11 @@ class TestStatisticsService:
             "input_tokens": 100,
             "output_tokens": 200,
             "total_tokens": 300,
-            "processing_time": 6  # 四捨五入される
+            "processing_time": 6,  # 四捨五入される
+            "input_chars_saved": 1200,
+            "input_tokens_saved": 900,
+            "continuation_count": 1,
+            "request_id": "request-id"
         }
         
         mock_repo.save_usage.assert_called_once_with(expected_usage_data)
@@ -121,7 +135,11 @@ class TestStatisticsService:
             "input_tokens": 0,
             "output_tokens": 0,
             "total_tokens": 0,
-            "processing_time": 1
+            "processing_time": 1,
+            "input_chars_saved": 0,
+            "input_tokens_saved": 0,
+            "continuation_count": 0,
+            "request_id": "request-id"
         }
         
         mock_repo.save_usage.assert_called_once_with(expected_usage_data)
@@ -163,7 +181,11 @@ class TestStatisticsService:
             "input_tokens": 50000,
             "output_tokens": 25000,
             "total_tokens": 75000,
-            "processing_time": 120  # 四捨五入
+            "processing_time": 120,  # 四捨五入
+            "input_chars_saved": 0,
+            "input_tokens_saved": 0,
+            "continuation_count": 0,
+            "request_id": "request-id"
         }
         
         mock_repo.save_usage.assert_called_once_with(expected_usage_data)
@@ -342,4 +364,22 @@ class TestStatisticsService:
             # save_usageが呼ばれた引数を取得
             call_args = mock_repo.save_usage.call_args[0][0]
             assert call_args["processing_time"] == expected_rounded, \
-                f"processing_time={processing_time} should round to {expected_rounded}, got {call_args['processing_time']}"
\ No newline at end of file
+                f"processing_time={processing_time} should round to {expected_rounded}, got {call_args['processing_time']}"
+
+    @patch('services.statistics_service.USAGE_RECORDER', True)
+    @patch('services.statistics_service.get_usage_statistics_repository')
+    @patch('services.statistics_service.get_usage_recorder')
+    def test_save_usage_to_database_uses_recorder(self, mock_get_recorder, mock_get_repo):
+        result = {"model_detail": "claude", "input_tokens": 10, "output_tokens": 20, "processing_time": 1.0}
+        session_params = {
+            "selected_document_type": "退院時サマリ",
+            "selected_department": "内科",
+            "selected_doctor": "田中医師"
+        }
+
+        StatisticsService.save_usage_to_database(result, session_params)
+
+        usage_data = mock_get_recorder.return_value.record.call_args[0][0]
+        assert usage_data["request_id"] == "request-id"
+        assert usage_data["total_tokens"] == 30
+        mock_get_repo.assert_not_called()
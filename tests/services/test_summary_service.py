@@ -1,8 +1,9 @@
 import pytest
 import datetime
 from unittest.mock import Mock, patch, MagicMock
+from database.unit_of_work import current_unit_of_work
 from services.summary_service import SummaryService
-from utils.exceptions import APIError
+from utils.exceptions import APIError, DatabaseCommitError
 
 
 class TestSummaryService:
@@ -51,6 +52,36 @@ class TestSummaryService:
                 mock_get_params.return_value
             )
 
+    def test_process_summary_runs_in_one_unit_of_work(self):
+        units = []
+
+        with patch('services.summary_service.ValidationService.validate_inputs'), \
+             patch.object(SummaryService, 'get_session_parameters', return_value={}), \
+             patch.object(SummaryService, 'execute_summary_generation',
+                          side_effect=lambda *args: units.append(current_unit_of_work()) or {"success": True}), \
+             patch.object(SummaryService, 'handle_generation_result',
+                          side_effect=lambda *args: units.append(current_unit_of_work())):
+            SummaryService.process_summary("患者の診療記録")
+
+        assert units[0] is not None
+        assert units[0] is units[1]
+        assert current_unit_of_work() is None
+
+    def test_process_summary_commit_failure_is_warning(self):
+        with patch('services.summary_service.ValidationService.validate_inputs'), \
+             patch.object(SummaryService, 'get_session_parameters', return_value={}), \
+             patch.object(SummaryService, 'execute_summary_generation', return_value={"success": True}), \
+             patch.object(SummaryService, 'handle_generation_result'), \
+             patch('database.unit_of_work.UnitOfWork.__exit__',
+                   side_effect=DatabaseCommitError("データベースへの保存に失敗しました")), \
+             patch('streamlit.warning') as mock_warning, \
+             patch('streamlit.error') as mock_error:
+            SummaryService.process_summary("患者の診療記録")
+
+        mock_warning.assert_called_once()
+        assert "データベースへの保存に失敗しました" in mock_warning.call_args[0][0]
+        mock_error.assert_not_called()
+
     def test_process_summary_validation_error(self):
         """入力検証エラーのテスト"""
         with patch('services.summary_service.ValidationService.validate_inputs', 
@@ -0,0 +1,100 @@
+import unicodedata
+
+from utils.clinical_table_compactor import compact_lab_tables, compact_prescriptions
+
+
+def _aligned(cells, widths):
+    def width(text):
+        return sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    return "".join(cell + " " * (w - width(cell)) for cell, w in zip(cells, widths)).rstrip()
+
+
+WIDTHS = [12, 12, 11, 13, 13, 13]
+LAB_TABLE = "\n".join([
+    _aligned(["検査項目", "基準値", "単位", "2024/04/01", "2024/04/05", "2024/04/10"], WIDTHS),
+    _aligned(["WBC", "3.3-8.6", "10^3/μL", "9.8 H", "7.2", "6.1"], WIDTHS),
+    _aligned(["Hb", "13.7-16.8", "g/dL", "11.2 L", "11.0 L", "11.5 L"], WIDTHS),
+    _aligned(["CRP", "0.00-0.14", "mg/dL", "1.80 H", "", "0.12"], WIDTHS),
+])
+
+
+class TestCompactLabTables:
+
+    def test_aligned_table(self):
+        text = f"血液検査\n{LAB_TABLE}\n\n4/12 退院予定"
+
+        assert compact_lab_tables(text) == "\n".join([
+            "血液検査",
+            "検査項目 (2024/4/1 | 2024/4/5 | 2024/4/10)",
+            "WBC: 9.8H | 7.2 | 6.1 (10^3/μL)",
+            "Hb: 11.2L | 11.0L | 11.5L (g/dL)",
+            "CRP: 1.80H | - | 0.12 (mg/dL)",
+            "",
+            "4/12 退院予定",
+        ])
+
+    def test_tab_separated_table(self):
+        text = "\n".join([
+            "項目\t単位\t4/1\t4/5",
+            "Na\tmEq/L\t140\t",
+            "K\tmEq/L\t5.2 H\t4.1",
+        ])
+
+        assert compact_lab_tables(text) == "\n".join([
+            "項目 (4/1 | 4/5)",
+            "Na: 140 | - (mEq/L)",
+            "K: 5.2H | 4.1 (mEq/L)",
+        ])
+
+    def test_compacted_table_is_shorter(self):
+        assert len(compact_lab_tables(LAB_TABLE)) < len(LAB_TABLE)
+
+    def test_narrative_text_unchanged(self):
+        text = "4/1 入院。\n入院日  2024/4/1\n4/5 CRP 1.8 と改善傾向。"
+        assert compact_lab_tables(text) == text
+
+    def test_header_without_rows_unchanged(self):
+        text = "検査項目    2024/04/01    2024/04/05\n\n特記事項なし"
+        assert compact_lab_tables(text) == text
+
+
+class TestCompactPrescriptions:
+
+    PRESCRIPTION = "\n".join([
+        "Rp1  アムロジピン錠5mg「サワイ」      1錠",
+        "     1日1回 朝食後                  28日分",
+        "Rp2  フロセミド錠20mg「NP」   1錠",
+        "1日1回 朝食後  28日分",
+        "ランソプラゾールOD錠15mg     1錠",
+    ])
+
+    def test_groups_rp_lines(self):
+        assert compact_prescriptions(self.PRESCRIPTION) == "\n".join([
+            "1) アムロジピン錠5mg 1錠 1日1回 朝食後 28日分",
+            "2) フロセミド錠20mg 1錠 1日1回 朝食後 28日分",
+            "ランソプラゾールOD錠15mg 1錠",
+        ])
+
+    def test_numbered_markers(self):
+        text = "1) カロナール錠200mg 2錠\n   疼痛時 頓用 10回分"
+        assert compact_prescriptions(text) == "1) カロナール錠200mg 2錠 疼痛時 頓用 10回分"
+
+    def test_rp_only_leaves_other_lines(self):
+        text = "経過:\n1) 肺炎   改善\nRp1 セフトリアキソン 1g\n  1日1回 点滴"
+
+        assert compact_prescriptions(text, rp_only=True) == "\n".join([
+            "経過:",
+            "1) 肺炎   改善",
+            "1) セフトリアキソン 1g 1日1回 点滴",
+        ])
+
+    def test_caution_on_continuation_line_kept(self):
+        text = "Rp1 ワーファリン錠1mg「エーザイ」 2錠\n  1日1回 朝食後\n  ※「黒色便」出現時は中止"
+
+        assert compact_prescriptions(text, rp_only=True) == \
+            "1) ワーファリン錠1mg 2錠 1日1回 朝食後 ※「黒色便」出現時は中止"
+
+    def test_quote_on_free_text_line_kept(self):
+        text = "Rp1 ロキソプロフェン錠60mg「サワイ」 1錠\n\n患者「痛みが強い」と訴えあり"
+
+        assert compact_prescriptions(text) == "1) ロキソプロフェン錠60mg 1錠\n\n患者「痛みが強い」と訴えあり"
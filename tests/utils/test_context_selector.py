@@ -0,0 +1,99 @@
+from utils.context_selector import BM25Index, select_context, split_entries, tokenize
+from utils.token_estimator import estimate_tokens
+
+ROUTINE_NOTE = "看護記録: 夜間は良眠、疼痛の訴えなし。食事は全量摂取。"
+
+
+def _build_karte(days: int = 20) -> str:
+    entries = ["患者: 78歳男性\n既往歴: 高血圧症", "4/1 主訴 呼吸困難。うっ血性心不全の診断で入院となった。"]
+    for day in range(2, days):
+        if day == 8:
+            entries.append(f"4/{day} 冠動脈造影施行、PCIを実施した。")
+        elif day == 10:
+            entries.append(f"4/{day} 採血にてCRP改善、利尿薬を減量し経過良好。")
+        else:
+            entries.append(f"4/{day} {ROUTINE_NOTE}{day}")
+    entries.append(f"4/{days} 退院予定。外来で腎機能をフォローする。")
+    return "\n".join(entries)
+
+
+class TestTokenize:
+
+    def test_japanese_bigrams_and_ascii_words(self):
+        assert tokenize("CRP改善") == ["crp", "改善"]
+        assert tokenize("心不全") == ["心不", "不全"]
+
+
+class TestBM25Index:
+
+    def test_matching_document_scores_higher(self):
+        index = BM25Index([tokenize("CRP改善"), tokenize("良眠"), tokenize("食事摂取")])
+        scores = index.score(tokenize("改善"))
+
+        assert scores[0] > 0
+        assert scores[1] == 0
+        assert scores[2] == 0
+
+    def test_empty_index(self):
+        assert BM25Index([]).score(["改善"]) == []
+
+
+class TestSplitEntries:
+
+    def test_splits_on_dated_lines(self):
+        entries = split_entries("冒頭\n4/1 入院\n詳細\n2024/4/2 経過\n1/2錠 内服")
+
+        assert [entry["date"] for entry in entries] == [None, "4/1", "2024/4/2"]
+        assert entries[1]["text"] == "4/1 入院\n詳細"
+        assert entries[2]["text"] == "2024/4/2 経過\n1/2錠 内服"
+        assert entries[1]["tokens"] == estimate_tokens("4/1 入院\n詳細")
+
+    def test_bracketed_dates(self):
+        entries = split_entries("【4/1】入院\n(4/2) 経過")
+        assert [entry["date"] for entry in entries] == ["4/1", "4/2"]
+
+
+class TestSelectContext:
+
+    def test_within_budget_unchanged(self):
+        text = _build_karte(5)
+        result = select_context(text, 100000)
+
+        assert result["text"] == text
+        assert result["applied"] is False
+        assert result["dropped"] == []
+
+    def test_keeps_admission_procedure_and_recent_entries(self):
+        text = _build_karte()
+        budget = estimate_tokens(text) // 2
+        result = select_context(text, budget)
+
+        assert result["applied"] is True
+        assert result["selected_tokens"] <= budget
+        assert "既往歴" in result["text"]
+        assert "入院となった" in result["text"]
+        assert "PCIを実施" in result["text"]
+        assert "退院予定" in result["text"]
+        assert f"{ROUTINE_NOTE}19" in result["text"]
+        assert result["dropped"]
+        assert all(entry["date"] for entry in result["dropped"])
+
+    def test_relevant_entries_preferred_over_routine(self):
+        text = _build_karte()
+        result = select_context(text, estimate_tokens(text) // 2)
+
+        assert "CRP改善" in result["text"]
+
+    def test_preserves_original_order(self):
+        result = select_context(_build_karte(), 300)
+        dates = [entry["date"] for entry in split_entries(result["text"])]
+
+        assert dates == sorted(dates, key=lambda date: int(date.split("/")[1]) if date else 0)
+
+    def test_dropped_entries_audit(self):
+        text = _build_karte()
+        result = select_context(text, estimate_tokens(text) // 2)
+        dropped = result["dropped"][0]
+
+        assert set(dropped) == {"date", "preview", "tokens", "score"}
+        assert dropped["preview"] in text.replace("\n", " ") or dropped["preview"].endswith("…")
@@ -0,0 +1,35 @@
+from utils.generation_profiles import get_profile_label, get_provider_settings, resolve_generation_profile
+
+
+class TestGenerationProfiles:
+
+    def test_resolve_uses_document_type_mapping(self):
+        assert resolve_generation_profile("退院時サマリ") == "standard"
+        assert resolve_generation_profile("現病歴") == "short"
+
+    def test_resolve_prompt_profile_takes_precedence(self):
+        assert resolve_generation_profile("退院時サマリ", "short") == "short"
+
+    def test_resolve_unknown_profile_falls_back(self):
+        assert resolve_generation_profile("現病歴", "unknown") == "short"
+        assert resolve_generation_profile("未知の文書") == "standard"
+
+    def test_provider_settings(self):
+        assert get_provider_settings("short", "claude")["max_tokens"] == 2000
+        assert get_provider_settings("short", "gemini")["thinking_level"] == "LOW"
+        assert get_provider_settings("short", "gemini")["max_tokens"] is None
+
+    def test_provider_settings_defaults(self):
+        settings = get_provider_settings("unknown", "other")
+
+        assert settings == {
+            "max_tokens": None,
+            "thinking_level": None,
+            "stop_sequences": [],
+            "prefill_header": False,
+            "scaffold_sections": False,
+        }
+
+    def test_profile_label(self):
+        assert get_profile_label("standard")
+        assert get_profile_label("unknown") == "unknown"
@@ -0,0 +1,175 @@
+from unittest.mock import patch
+
+from utils.karte_preprocessor import (
+    SHINGLE_SIZE,
+    _HASH_BASE,
+    _HASH_MOD,
+    _build_result,
+    collapse_whitespace,
+    get_preprocessing_settings,
+    normalize_text,
+    preprocess_karte,
+    preprocess_prescription,
+    remove_duplicate_units,
+    shingle_hashes,
+)
+from utils.token_estimator import estimate_tokens
+
+NURSING_NOTE = "看護記録: 夜間は良眠、疼痛の訴えなし。バイタル安定、食事は全量摂取。"
+
+
+class TestEstimateTokens:
+
+    def test_empty(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens(None) == 0
+
+    def test_japanese_counts_per_char(self):
+        assert estimate_tokens("入院時検査") == 5
+
+    def test_ascii_rounds_up(self):
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+    def test_mixed(self):
+        assert estimate_tokens("BT 36.5℃") == 3
+
+
+class TestNormalization:
+
+    def test_nfkc_unifies_width(self):
+        assert normalize_text("ＢＴ３６．５　ｶﾛﾅｰﾙ") == "BT36.5 カロナール"
+
+    def test_collapse_whitespace(self):
+        text = "  体温   36.5\t度  \r\n\r\n\r\n\r\n脈拍  72 "
+        assert collapse_whitespace(text) == "体温 36.5 度\n\n脈拍 72"
+
+
+class TestShingleHashes:
+
+    def test_identical_text_has_identical_hashes(self):
+        assert shingle_hashes(NURSING_NOTE) == shingle_hashes(NURSING_NOTE)
+
+    def test_rolling_hash_matches_direct_hash(self):
+        text = "あいうえおかきくけこ"
+        expected = set()
+        for i in range(len(text) - SHINGLE_SIZE + 1):
+            value = 0
+            for char in text[i:i + SHINGLE_SIZE]:
+                value = (value * _HASH_BASE + ord(char)) % _HASH_MOD
+            expected.add(value)
+
+        assert shingle_hashes(text) == expected
+
+    def test_short_text(self):
+        assert len(shingle_hashes("abc")) == 1
+
+
+class TestRemoveDuplicateUnits:
+
+    def test_exact_duplicates_keep_latest(self):
+        units = [NURSING_NOTE, "4/2 " + NURSING_NOTE + "追記あり", NURSING_NOTE]
+        kept, removed = remove_duplicate_units(units, 1.0, 10)
+
+        assert removed == 1
+        assert kept == ["4/2 " + NURSING_NOTE + "追記あり", NURSING_NOTE]
+
+    def test_near_duplicates_removed(self):
+        older = NURSING_NOTE + "排便あり。"
+        newer = NURSING_NOTE + "排便あり、軟便。"
+        kept, removed = remove_duplicate_units([older, newer], 0.75, 10)
+
+        assert removed == 1
+        assert kept == [newer]
+
+    def test_units_with_different_values_kept(self):
+        older = "10/1 " + NURSING_NOTE + "本日K 3.1。"
+        newer = "10/2 " + NURSING_NOTE + "本日K 5.9。"
+        kept, removed = remove_duplicate_units([older, newer], 0.75, 10)
+
+        assert removed == 0
+        assert kept == [older, newer]
+
+    def test_default_removes_exact_duplicates_only(self):
+        older = "10/1 " + NURSING_NOTE + "本日K 3.1。"
+        newer = "10/1 " + NURSING_NOTE + "本日K 3.1。追記"
+
+        assert preprocess_karte(f"{older}\n\n{newer}")["removed_units"] == 0
+
+    def test_distinct_units_kept(self):
+        units = [NURSING_NOTE, "胸部X線: 心拡大（CTR 62%）、両側胸水、肺うっ血像あり。"]
+        kept, removed = remove_duplicate_units(units, 0.9, 10)
+
+        assert removed == 0
+        assert kept == units
+
+    def test_short_units_never_removed(self):
+        kept, removed = remove_duplicate_units(["BT 36.5", "BT 36.5"], 0.9, 20)
+
+        assert removed == 0
+        assert kept == ["BT 36.5", "BT 36.5"]
+
+
+class TestPreprocessKarte:
+
+    def test_removes_copy_forward_blocks(self):
+        text = f"{NURSING_NOTE}\n\n\n{NURSING_NOTE}\n\n4/3 退院調整開始。\n\n{NURSING_NOTE}"
+        result = preprocess_karte(text)
+
+        assert result["text"] == f"4/3 退院調整開始。\n\n{NURSING_NOTE}"
+        assert result["removed_units"] == 2
+        assert result["original_chars"] == len(text)
+        assert result["processed_chars"] == len(result["text"])
+        assert result["chars_saved"] == len(text) - len(result["text"])
+        assert result["tokens_saved"] > 0
+
+    def test_deterministic(self):
+        text = "\n\n".join([NURSING_NOTE + str(i % 3) for i in range(30)])
+        assert preprocess_karte(text) == preprocess_karte(text)
+
+    def test_empty_input(self):
+        result = preprocess_karte("")
+
+        assert result["text"] == ""
+        assert result["chars_saved"] == 0
+        assert result["tokens_saved"] == 0
+
+    def test_department_override(self):
+        settings = {"default": get_preprocessing_settings(), "眼科": {"remove_duplicates": False}}
+        text = f"{NURSING_NOTE}\n\n{NURSING_NOTE}"
+
+        with patch('utils.karte_preprocessor.KARTE_PREPROCESSING_SETTINGS', settings):
+            assert preprocess_karte(text, "眼科")["text"] == text
+            assert preprocess_karte(text, "内科")["text"] == NURSING_NOTE
+
+    def test_line_unit(self):
+        settings = {"default": dict(get_preprocessing_settings(), dedupe_unit="line")}
+        text = f"{NURSING_NOTE}\n{NURSING_NOTE}\n退院"
+
+        with patch('utils.karte_preprocessor.KARTE_PREPROCESSING_SETTINGS', settings):
+            assert preprocess_karte(text)["text"] == f"{NURSING_NOTE}\n退院"
+
+    def test_lab_table_compacted_before_normalization(self):
+        text = "検査項目    単位    ４/１    ４/５\nＣＲＰ        mg/dL   1.80 H    0.12"
+        assert preprocess_karte(text)["text"] == "検査項目 (4/1 | 4/5)\nCRP: 1.80H | 0.12 (mg/dL)"
+
+    def test_prescription_compacted(self):
+        text = "Rp1  アムロジピン錠５mg「サワイ」      1錠\n     1日1回 朝食後     28日分"
+        result = preprocess_prescription(text)
+
+        assert result["text"] == "1) アムロジピン錠5mg 1錠 1日1回 朝食後 28日分"
+        assert result["tokens_saved"] > 0
+
+    def test_chars_saved_not_negative(self):
+        result = _build_result("Rp1 A錠", "1) A錠 (unit)")
+
+        assert result["chars_saved"] == 0
+        assert result["tokens_saved"] == 0
+
+    @patch('utils.karte_preprocessor.KARTE_PREPROCESSING', False)
+    def test_globally_disabled(self):
+        text = f"ＢＴ  36.5\n\n{NURSING_NOTE}\n\n{NURSING_NOTE}"
+        result = preprocess_karte(text)
+
+        assert result["text"] == text
+        assert result["chars_saved"] == 0
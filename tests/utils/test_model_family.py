@@ -0,0 +1,20 @@
+import pytest
+
+from utils.model_family import classify_model_family
+
+
+class TestClassifyModelFamily:
+
+    @pytest.mark.parametrize("model_detail, expected", [
+        ("Claude", "Claude"),
+        ("anthropic.claude-sonnet-4", "Claude"),
+        ("gemini-2.5-pro", "Gemini_Pro"),
+        ("gemini-2.5-flash", "Gemini_Flash"),
+        ("GEMINI-2.5-FLASH", "Gemini_Flash"),
+    ])
+    def test_known_models(self, model_detail, expected):
+        assert classify_model_family(model_detail) == expected
+
+    def test_unknown_defaults_to_gemini_pro(self):
+        assert classify_model_family(None) == "Gemini_Pro"
+        assert classify_model_family("unknown-model") == "Gemini_Pro"
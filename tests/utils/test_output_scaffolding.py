@@ -0,0 +1,49 @@
+from utils.constants import DEFAULT_SECTION_NAMES
+from utils.generation_profiles import get_provider_settings
+from utils.output_scaffolding import (
+    apply_output_options,
+    build_header_prefill,
+    build_scaffold_instruction,
+    get_scaffold_sections,
+)
+
+
+class TestOutputScaffolding:
+
+    def test_scaffold_sections_exclude_prefilled(self):
+        sections = get_scaffold_sections("退院時サマリ", {"入院期間": "2024年4月1日～2024年4月28日（28日間）"})
+
+        assert sections == [section for section in DEFAULT_SECTION_NAMES if section != "入院期間"]
+
+    def test_scaffold_sections_for_other_document_type(self):
+        assert get_scaffold_sections("現病歴") == []
+
+    def test_scaffold_instruction_lists_headers_in_order(self):
+        instruction = build_scaffold_instruction(["現病歴", "備考"])
+
+        assert instruction.startswith("\n【出力形式】")
+        assert instruction.endswith("\n【現病歴】\n【備考】")
+        assert build_scaffold_instruction([]) == ""
+
+    def test_header_prefill_has_no_trailing_whitespace(self):
+        assert build_header_prefill(["現病歴", "備考"]) == "【現病歴】"
+        assert build_header_prefill([]) == ""
+
+    def test_apply_output_options_claude_standard(self):
+        options = apply_output_options(get_provider_settings("standard", "claude"), "退院時サマリ")
+
+        assert options["prefill"] == f"【{DEFAULT_SECTION_NAMES[0]}】"
+        assert options["instruction"].endswith(f"【{DEFAULT_SECTION_NAMES[-1]}】")
+        # 区切り線は項目の間にも出力されるため、停止シーケンスにはしない
+        assert options["stop_sequences"] == []
+
+    def test_apply_output_options_gemini_has_no_prefill(self):
+        options = apply_output_options(get_provider_settings("standard", "gemini"), "退院時サマリ")
+
+        assert options["prefill"] == ""
+        assert options["instruction"]
+
+    def test_apply_output_options_disabled(self):
+        options = apply_output_options(get_provider_settings("standard", "other"), "退院時サマリ")
+
+        assert options == {"instruction": "", "prefill": "", "stop_sequences": []}
@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+from utils.exceptions import AppError
+from utils.prompt_io import detect_format, read_prompts, validate_prompt_rows, write_prompts
+
+
+class TestPromptIO:
+
+    def setup_method(self):
+        self.rows = [
+            {'department': '内科', 'document_type': '退院時サマリ', 'doctor': '田中医師',
+             'selected_model': 'Claude', 'generation_profile': 'short', 'content': '# 役割\n医師として作成'},
+            {'department': '内科', 'document_type': '現病歴', 'doctor': 'default',
+             'selected_model': None, 'generation_profile': None, 'content': '現病歴を作成'},
+        ]
+
+    def test_detect_format(self):
+        assert detect_format("prompts.csv") == "csv"
+        assert detect_format("prompts.YAML") == "yaml"
+        assert detect_format("prompts.yml") == "yaml"
+
+    def test_detect_format_unsupported(self):
+        with pytest.raises(AppError) as exc_info:
+            detect_format("prompts.json")
+        assert "未対応のファイル形式" in str(exc_info.value)
+
+    @pytest.mark.parametrize("file_format", ["csv", "yaml"])
+    def test_round_trip(self, file_format):
+        buffer = io.StringIO()
+
+        count = write_prompts(iter(self.rows), buffer, file_format)
+        buffer.seek(0)
+        result = read_prompts(buffer, file_format)
+
+        assert count == 2
+        assert result == self.rows
+
+    def test_write_yaml_empty(self):
+        buffer = io.StringIO()
+
+        count = write_prompts(iter([]), buffer, "yaml")
+        buffer.seek(0)
+
+        assert count == 0
+        assert read_prompts(buffer, "yaml") == []
+
+    def test_read_yaml_plain_list(self):
+        text = "- department: 内科\n  document_type: 現病歴\n  doctor: default\n  content: 本文\n"
+
+        result = read_prompts(io.StringIO(text), "yaml")
+
+        assert result[0]['department'] == '内科'
+        assert result[0]['selected_model'] is None
+
+    def test_validate_missing_fields(self):
+        with pytest.raises(AppError) as exc_info:
+            validate_prompt_rows([{'department': '内科', 'document_type': '現病歴', 'doctor': '', 'content': 'x'}])
+        assert "1件目" in str(exc_info.value)
+        assert "doctor" in str(exc_info.value)
@@ -1,8 +1,10 @@
 import datetime
+import time
 from unittest.mock import Mock, patch
 
 import pytest
 
+from database.read_routing import reads_from_primary, restore_primary_reads
 from database.repositories import PromptRepository
 from utils.exceptions import DatabaseError, AppError
 from utils.prompt_manager import PromptManager, get_prompt_manager
@@ -46,6 +48,7 @@ class TestPromptManager:
         mock_prompt.doctor = "doctor"
         mock_prompt.content = "prompt content"
         mock_prompt.selected_model = "model"
+        mock_prompt.generation_profile = "short"
         mock_prompt.is_default = False
         mock_prompt.created_at = datetime.datetime(2023, 1, 1)
         mock_prompt.updated_at = datetime.datetime(2023, 1, 2)
@@ -61,6 +64,7 @@ class TestPromptManager:
             'doctor': "doctor",
             'content': "prompt content",
             'selected_model': "model",
+            'generation_profile': "short",
             'is_default': False,
             'created_at': datetime.datetime(2023, 1, 1),
             'updated_at': datetime.datetime(2023, 1, 2)
@@ -77,6 +81,7 @@ class TestPromptManager:
         mock_default_prompt.doctor = "default"
         mock_default_prompt.content = "default content"
         mock_default_prompt.selected_model = None
+        mock_default_prompt.generation_profile = None
         mock_default_prompt.is_default = True
         mock_default_prompt.created_at = datetime.datetime(2023, 1, 1)
         mock_default_prompt.updated_at = datetime.datetime(2023, 1, 1)
@@ -93,6 +98,7 @@ class TestPromptManager:
             'doctor': "default",
             'content': "default content",
             'selected_model': None,
+            'generation_profile': None,
             'is_default': True,
             'created_at': datetime.datetime(2023, 1, 1),
             'updated_at': datetime.datetime(2023, 1, 1)
@@ -138,13 +144,13 @@ class TestPromptManager:
         self.mock_repo.create_or_update.return_value = (True, "作成しました")
         
         success, message = self.prompt_manager.create_or_update_prompt(
-            "dept", "doc_type", "doctor", "content", "model"
+            "dept", "doc_type", "doctor", "content", "model", "short"
         )
         
         assert success is True
         assert message == "作成しました"
         self.mock_repo.create_or_update.assert_called_once_with(
-            "dept", "doc_type", "doctor", "content", "model"
+            "dept", "doc_type", "doctor", "content", "model", "short"
         )
 
     def test_create_or_update_prompt_missing_fields(self):
@@ -209,11 +215,11 @@ class TestPromptManager:
     def test_get_all_prompts_success(self):
         mock_prompts = [
             Mock(id=1, department="dept1", document_type="type1", doctor="doctor1",
-                 content="content1", selected_model="model1", is_default=False,
+                 content="content1", selected_model="model1", generation_profile=None, is_default=False,
                  created_at=datetime.datetime(2023, 1, 1),
                  updated_at=datetime.datetime(2023, 1, 2)),
             Mock(id=2, department="dept2", document_type="type2", doctor="doctor2",
-                 content="content2", selected_model="model2", is_default=True,
+                 content="content2", selected_model="model2", generation_profile="short", is_default=True,
                  created_at=datetime.datetime(2023, 2, 1),
                  updated_at=datetime.datetime(2023, 2, 2))
         ]
@@ -226,13 +232,13 @@ class TestPromptManager:
             {
                 'id': 1, 'department': "dept1", 'document_type': "type1",
                 'doctor': "doctor1", 'content': "content1", 'selected_model': "model1",
-                'is_default': False, 'created_at': datetime.datetime(2023, 1, 1),
+                'generation_profile': None, 'is_default': False, 'created_at': datetime.datetime(2023, 1, 1),
                 'updated_at': datetime.datetime(2023, 1, 2)
             },
             {
                 'id': 2, 'department': "dept2", 'document_type': "type2",
                 'doctor': "doctor2", 'content': "content2", 'selected_model': "model2",
-                'is_default': True, 'created_at': datetime.datetime(2023, 2, 1),
+                'generation_profile': "short", 'is_default': True, 'created_at': datetime.datetime(2023, 2, 1),
                 'updated_at': datetime.datetime(2023, 2, 2)
             }
         ]
@@ -538,4 +544,167 @@ class TestGetPromptManager:
         for i, expected_method in enumerate(expected_order):
             assert call_order[i] == expected_method
         
-        assert result['department'] == "default"
\ No newline at end of file
+        assert result['department'] == "default"
+
+class TestPromptCatalogSnapshot:
+
+    def setup_method(self):
+        with patch('utils.prompt_manager.get_prompt_repository') as mock_get_repo, \
+             patch('utils.prompt_manager.get_config') as mock_get_config:
+
+            self.mock_repo = Mock(spec=PromptRepository)
+            mock_get_repo.return_value = self.mock_repo
+            mock_get_config.return_value = {'PROMPTS': {'summary': 'Default prompt content'}}
+
+            self.prompt_manager = PromptManager()
+
+        self.mock_repo.get_all.return_value = [
+            self._make_prompt(1, "default", "退院時サマリ", "default", "デフォルト", is_default=True),
+            self._make_prompt(2, "内科", "現病歴", "田中医師", "内科現病歴", selected_model="Claude"),
+        ]
+
+    @staticmethod
+    def _make_prompt(prompt_id, department, document_type, doctor, content,
+                     selected_model=None, is_default=False):
+        prompt = Mock()
+        prompt.id = prompt_id
+        prompt.department = department
+        prompt.document_type = document_type
+        prompt.doctor = doctor
+        prompt.content = content
+        prompt.selected_model = selected_model
+        prompt.generation_profile = None
+        prompt.is_default = is_default
+        prompt.created_at = datetime.datetime(2024, 1, 1)
+        prompt.updated_at = datetime.datetime(2024, 1, 1)
+        return prompt
+
+    def test_get_prompt_uses_snapshot_without_db(self):
+        self.prompt_manager.load_snapshot()
+        self.mock_repo.reset_mock()
+
+        result = self.prompt_manager.get_prompt("内科", "現病歴", "田中医師")
+
+        assert result['content'] == "内科現病歴"
+        assert result['selected_model'] == "Claude"
+        self.mock_repo.get_by_keys.assert_not_called()
+        self.mock_repo.get_default_prompt.assert_not_called()
+
+    def test_get_prompt_snapshot_falls_back_to_default(self):
+        self.prompt_manager.load_snapshot()
+
+        result = self.prompt_manager.get_prompt("外科", "退院時サマリ", "default")
+
+        assert result['id'] == 1
+        assert result['is_default'] is True
+
+    def test_snapshot_returns_copies(self):
+        self.prompt_manager.load_snapshot()
+
+        result = self.prompt_manager.get_prompt("内科", "現病歴", "田中医師")
+        result['content'] = "changed"
+
+        assert self.prompt_manager.get_prompt("内科", "現病歴", "田中医師")['content'] == "内科現病歴"
+
+    def test_snapshot_without_default_prompt(self):
+        self.mock_repo.get_all.return_value = []
+        self.prompt_manager.load_snapshot()
+
+        assert self.prompt_manager.get_prompt("内科", "現病歴", "田中医師") is None
+
+    def test_create_or_update_swaps_snapshot(self):
+        old_snapshot = self.prompt_manager.load_snapshot()
+        self.mock_repo.create_or_update.return_value = (True, "プロンプトを更新しました")
+        self.mock_repo.get_all.return_value = [
+            self._make_prompt(2, "内科", "現病歴", "田中医師", "更新後"),
+        ]
+
+        self.prompt_manager.create_or_update_prompt("内科", "現病歴", "田中医師", "更新後")
+
+        assert self.prompt_manager.snapshot is not old_snapshot
+        assert self.prompt_manager.get_prompt("内科", "現病歴", "田中医師")['content'] == "更新後"
+
+    def test_delete_failure_keeps_snapshot(self):
+        snapshot = self.prompt_manager.load_snapshot()
+        self.mock_repo.delete_by_keys.return_value = (False, "プロンプトが見つかりません")
+
+        self.prompt_manager.delete_prompt("内科", "現病歴", "田中医師")
+
+        assert self.prompt_manager.snapshot is snapshot
+
+    def test_refresh_failure_disables_snapshot(self):
+        self.prompt_manager.load_snapshot()
+        self.mock_repo.get_all.side_effect = Exception("DB down")
+
+        self.prompt_manager.refresh_snapshot()
+
+        assert self.prompt_manager.snapshot is None
+
+    def test_older_load_does_not_replace_newer_snapshot(self):
+        stale_prompts = list(self.mock_repo.get_all.return_value)
+        updated_prompts = [self._make_prompt(2, "内科", "現病歴", "田中医師", "更新後")]
+
+        def get_all_during_save():
+            # 読み込み中に保存後の再読み込みが先に完了した場合
+            self.mock_repo.get_all.side_effect = None
+            self.mock_repo.get_all.return_value = updated_prompts
+            self.prompt_manager.load_snapshot()
+            return stale_prompts
+
+        self.mock_repo.get_all.side_effect = get_all_during_save
+        self.prompt_manager.load_snapshot()
+
+        assert self.prompt_manager.get_prompt("内科", "現病歴", "田中医師")['content'] == "更新後"
+
+    def test_background_refresh_reads_from_primary(self):
+        restore_primary_reads(0.0)
+        self.prompt_manager.load_snapshot()
+        reads = []
+        self.mock_repo.get_all.side_effect = lambda: reads.append(reads_from_primary()) or []
+
+        self.prompt_manager._refresh_in_background()
+        for _ in range(100):
+            if reads:
+                break
+            time.sleep(0.01)
+
+        assert reads == [True]
+        assert not reads_from_primary()
+
+    def test_refresh_without_snapshot_is_noop(self):
+        self.prompt_manager.refresh_snapshot()
+
+        self.mock_repo.get_all.assert_not_called()
+
+    def test_stale_snapshot_refreshes_in_background(self):
+        snapshot = self.prompt_manager.load_snapshot()
+
+        with patch('utils.prompt_manager.PROMPT_SNAPSHOT_TTL', 10), \
+             patch.object(snapshot, 'is_stale', return_value=True), \
+             patch.object(self.prompt_manager, '_refresh_in_background') as mock_refresh:
+            result = self.prompt_manager.get_prompt("内科", "現病歴", "田中医師")
+
+        assert result['content'] == "内科現病歴"
+        mock_refresh.assert_called_once()
+
+    def test_warm_up_prompt_catalog(self):
+        import utils.prompt_manager
+        utils.prompt_manager._prompt_manager = self.prompt_manager
+
+        try:
+            snapshot = utils.prompt_manager.warm_up_prompt_catalog()
+            assert len(snapshot) == 2
+            assert utils.prompt_manager.warm_up_prompt_catalog() is snapshot
+            self.mock_repo.get_all.assert_called_once()
+        finally:
+            utils.prompt_manager._prompt_manager = None
+
+    def test_warm_up_prompt_catalog_failure(self):
+        import utils.prompt_manager
+        utils.prompt_manager._prompt_manager = self.prompt_manager
+        self.mock_repo.get_all.side_effect = Exception("DB down")
+
+        try:
+            assert utils.prompt_manager.warm_up_prompt_catalog() is None
+        finally:
+            utils.prompt_manager._prompt_manager = None
@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+from utils.rule_based_sections import extract_admission_period, extract_rule_based_sections
+
+
+class TestExtractAdmissionPeriod:
+
+    def test_period_notation(self):
+        text = "入院期間：2024/4/1～2024/4/28"
+        assert extract_admission_period(text) == "2024年4月1日～2024年4月28日（28日間）"
+
+    def test_admission_and_discharge_dates(self):
+        text = "入院日: 2024年4月1日\n4/10 経過良好\n退院予定日: 4/20\n退院日: 4/22"
+        assert extract_admission_period(text) == "2024年4月1日～2024年4月22日（22日間）"
+
+    def test_year_boundary(self):
+        text = "入院日 12/25\n退院日 2025/1/5"
+        assert extract_admission_period(text) == "2024年12月25日～2025年1月5日（12日間）"
+
+    def test_additional_info_takes_precedence(self):
+        karte = "入院日: 2024/4/1\n退院予定日: 2024/4/30"
+        assert extract_admission_period(karte, "退院日: 2024/4/25") == "2024年4月1日～2024年4月25日（25日間）"
+
+    def test_missing_year_returns_none(self):
+        assert extract_admission_period("入院日: 4/1\n退院日: 4/20") is None
+
+    def test_missing_discharge_returns_none(self):
+        assert extract_admission_period("入院日: 2024/4/1\n4/2 経過観察") is None
+
+    def test_invalid_order_returns_none(self):
+        assert extract_admission_period("入院期間: 2024/4/20～2024/4/1") is None
+
+    def test_invalid_date_returns_none(self):
+        assert extract_admission_period("入院期間: 2024/2/30～2024/3/5") is None
+
+
+class TestExtractRuleBasedSections:
+
+    def test_extracts_configured_sections(self):
+        result = extract_rule_based_sections("入院期間: 2024/4/1-2024/4/3")
+        assert result == {"入院期間": "2024年4月1日～2024年4月3日（3日間）"}
+
+    def test_no_match(self):
+        assert extract_rule_based_sections("4/1 入院") == {}
+
+    @patch('utils.rule_based_sections.RULE_BASED_SECTION_NAMES', [])
+    def test_disabled_sections(self):
+        assert extract_rule_based_sections("入院期間: 2024/4/1-2024/4/3") == {}
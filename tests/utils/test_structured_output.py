@@ -0,0 +1,68 @@
+import json
+from unittest.mock import patch
+
+from utils.constants import DEFAULT_SECTION_NAMES
+from utils.structured_output import (build_claude_summary_tool, build_summary_schema,
+                                     is_structured_output_enabled, parse_structured_summary,
+                                     render_structured_summary)
+from utils.text_processor import parse_output_summary
+
+
+class TestStructuredOutput:
+
+    def setup_method(self):
+        self.sections = {name: f"記載{i}\n続き{i}" for i, name in enumerate(DEFAULT_SECTION_NAMES)}
+        self.sections["備考"] = ""
+
+    def test_build_summary_schema(self):
+        schema = build_summary_schema()
+
+        assert schema["type"] == "object"
+        assert list(schema["properties"]) == DEFAULT_SECTION_NAMES
+        assert schema["required"] == DEFAULT_SECTION_NAMES
+
+    def test_build_claude_summary_tool(self):
+        tool = build_claude_summary_tool()
+
+        assert tool["name"] == "record_discharge_summary"
+        assert tool["input_schema"] == build_summary_schema()
+
+    def test_parse_structured_summary_valid(self):
+        result = parse_structured_summary(json.dumps(self.sections, ensure_ascii=False))
+
+        assert result == self.sections
+
+    def test_parse_structured_summary_code_fence_and_asterisks(self):
+        data = dict(self.sections, 現病歴="**胸痛**で来院")
+        text = "```json\n" + json.dumps(data, ensure_ascii=False) + "\n```"
+
+        result = parse_structured_summary(text)
+
+        assert result["現病歴"] == "胸痛で来院"
+
+    def test_parse_structured_summary_missing_section_falls_back(self):
+        data = dict(self.sections)
+        del data["備考"]
+
+        assert parse_structured_summary(json.dumps(data, ensure_ascii=False)) is None
+
+    def test_parse_structured_summary_invalid_inputs(self):
+        assert parse_structured_summary("入院期間\n2024/04/01") is None
+        assert parse_structured_summary("{broken json") is None
+        assert parse_structured_summary("[]") is None
+        assert parse_structured_summary(json.dumps(dict(self.sections, 備考=None))) is None
+        assert parse_structured_summary("") is None
+
+    def test_render_structured_summary_round_trip(self):
+        rendered = render_structured_summary(self.sections)
+
+        assert rendered.startswith("【入院期間】\n記載0\n続き0")
+        assert parse_output_summary(rendered) == self.sections
+
+    def test_is_structured_output_enabled(self):
+        with patch('utils.structured_output.STRUCTURED_OUTPUT', True):
+            assert is_structured_output_enabled("退院時サマリ") is True
+            assert is_structured_output_enabled("現病歴") is False
+
+        with patch('utils.structured_output.STRUCTURED_OUTPUT', False):
+            assert is_structured_output_enabled("退院時サマリ") is False
@@ -1,6 +1,9 @@
 from unittest.mock import patch
 
-from utils.text_processor import parse_output_summary, format_output_summary, section_aliases
+from utils.constants import DEFAULT_SECTION_NAMES
+from utils.text_processor import (StreamingSectionParser, extract_section_content, format_output_summary,
+                                  get_first_section, merge_continuation, parse_output_summary,
+                                  section_aliases, splice_section)
 
 
 class TestTextProcessor:
@@ -266,6 +269,67 @@ ACE阻害薬を処方"""
         result = parse_output_summary("\n\n\n")
         assert result["テストセクション"] == ""
 
+    def test_parse_output_summary_bracketed_headers(self):
+        """【】で囲まれたセクション見出しのテスト"""
+        summary_text = """【入院期間】
+2024年4月1日～2024年4月20日
+
+【現病歴】：高血圧で通院中。
+胸痛を主訴に来院。
+
+[入院時検査]
+トロポニン陽性
+
+## 入院中の治療経過
+PCIを施行。
+
+【退院申し送り】 外来でフォロー
+【備考】"""
+
+        result = parse_output_summary(summary_text)
+
+        assert result["入院期間"] == "2024年4月1日～2024年4月20日"
+        assert result["現病歴"] == "高血圧で通院中。\n胸痛を主訴に来院。"
+        assert result["入院時検査"] == "トロポニン陽性"
+        assert result["入院中の治療経過"] == "PCIを施行。"
+        assert result["退院申し送り"] == "外来でフォロー"
+        assert result["備考"] == ""
+
+    def test_parse_output_summary_keeps_colons_in_content(self):
+        """見出し直後以外のコロンを保持するテスト"""
+        result = parse_output_summary("入院期間：2024/04/01 10:30 入院")
+
+        assert result["入院期間"] == "2024/04/01 10:30 入院"
+
+    def test_parse_output_summary_alias_requires_separator(self):
+        """エイリアスで始まる本文行を見出しと誤認しないテスト"""
+        summary_text = """入院中の治療経過
+抗菌薬を開始。
+その他の合併症なし。
+補足: 退院後も内服継続"""
+
+        result = parse_output_summary(summary_text)
+
+        assert result["入院中の治療経過"] == "抗菌薬を開始。\nその他の合併症なし。"
+        assert result["備考"] == "退院後も内服継続"
+
+    def test_parse_output_summary_ignores_alias_to_hidden_section(self):
+        """表示対象外セクションへのエイリアスを無視するテスト"""
+        summary_text = """退院申し送り
+処方:
+アムロジピン 5mg"""
+
+        result = parse_output_summary(summary_text)
+
+        assert result["退院申し送り"] == "処方:\nアムロジピン 5mg"
+        assert set(result) == set(DEFAULT_SECTION_NAMES)
+
+    def test_parse_output_summary_appends_repeated_inline_header(self):
+        """同じ見出しが再出現した場合に内容を失わないテスト"""
+        result = parse_output_summary("備考 一点目\n現病歴\n本文\n備考 二点目")
+
+        assert result["備考"] == "一点目\n二点目"
+
     def test_format_output_summary_asterisk_removal(self):
         """アスタリスク除去のテスト"""
         test_cases = [
@@ -310,6 +374,21 @@ ACE阻害薬を処方"""
         result = format_output_summary(summary_text)
         assert result == expected
 
+    def test_format_output_summary_strips_trailing_epilogue(self):
+        summary_text = "【治療経過】\n以上、利尿薬で改善した。\n【備考】\n特記事項なし\n\n---\n以上が退院時サマリです。ご確認ください。\n"
+
+        assert format_output_summary(summary_text) == "【治療経過】\n以上、利尿薬で改善した。\n【備考】\n特記事項なし"
+
+    def test_format_output_summary_keeps_separator_between_sections(self):
+        summary_text = "【治療経過】\n利尿薬で改善した。\n---\n【備考】\n特記事項なし\n---"
+
+        assert format_output_summary(summary_text) == "【治療経過】\n利尿薬で改善した。\n---\n【備考】\n特記事項なし"
+
+    def test_format_output_summary_keeps_body_starting_with_ijou(self):
+        summary_text = "【退院申し送り】\n外来で経過観察。\n以上、ご家族にも説明済み。"
+
+        assert format_output_summary(summary_text) == summary_text
+
     def test_section_aliases_mapping(self):
         """セクションエイリアスマッピングの確認テスト"""
         expected_aliases = {
@@ -366,4 +445,122 @@ ACE阻害剤を増量。
         assert "エナラプリル" in result["現在の処方"]
         assert "カルベジロール" in result["現在の処方"]
         assert "外来にて経過観察予定" in result["備考"]
-        assert "体重管理指導実施済み" in result["備考"]
\ No newline at end of file
+        assert "体重管理指導実施済み" in result["備考"]
+
+class TestStreamingSectionParser:
+
+    SAMPLE = """前置きの文章
+【入院期間】2024年4月1日～2024年4月20日
+【現病歴】
+高血圧で通院中。
+胸痛を主訴に来院。
+入院中の治療経過: PCIを施行。
+その他: 特記なし
+ステント留置後経過良好。"""
+
+    def _feed_in_chunks(self, text, size):
+        parser = StreamingSectionParser()
+        updates = []
+        for i in range(0, len(text), size):
+            updates.extend(parser.feed(text[i:i + size]))
+        updates.extend(parser.close())
+        return parser, updates
+
+    def test_matches_batch_parser_for_any_chunk_size(self):
+        """任意の分割サイズで一括解析と同じ結果になるテスト"""
+        expected = parse_output_summary(self.SAMPLE)
+
+        for size in [1, 2, 3, 7, 16, len(self.SAMPLE)]:
+            parser, _ = self._feed_in_chunks(self.SAMPLE, size)
+            assert parser.get_sections() == expected, f"chunk size {size}"
+
+    def test_partial_line_is_buffered(self):
+        """改行前の行が確定まで保留されるテスト"""
+        parser = StreamingSectionParser()
+
+        assert parser.feed("【現病") == []
+        assert parser.feed("歴】高血圧") == []
+        assert parser.pending_text == "【現病歴】高血圧"
+        assert parser.get_section("現病歴") == ""
+
+        assert parser.feed("症\n胸") == [("現病歴", "高血圧症")]
+        assert parser.pending_text == "胸"
+        assert parser.current_section == "現病歴"
+
+    def test_emits_incremental_updates(self):
+        """確定した行ごとに更新イベントが出るテスト"""
+        _, updates = self._feed_in_chunks(self.SAMPLE, 5)
+
+        assert updates[0] == ("入院期間", "2024年4月1日～2024年4月20日")
+        assert ("入院中の治療経過", "PCIを施行。") in updates
+        assert updates[-1] == ("備考", "ステント留置後経過良好。")
+        assert not any(line == "前置きの文章" for _, line in updates)
+
+    def test_close_flushes_last_line(self):
+        """最終行が close で確定するテスト"""
+        parser = StreamingSectionParser()
+        parser.feed("備考\n最終行")
+
+        assert parser.get_section("備考") == ""
+        assert parser.close() == [("備考", "最終行")]
+        assert parser.get_section("備考") == "最終行"
+        assert parser.close() == []
+
+
+class TestSpliceSection:
+
+    def test_replaces_existing_section(self):
+        text = "【入院期間】\n誤った期間\n\n【現病歴】\n心不全"
+        assert splice_section(text, "入院期間", "正しい期間") == "【入院期間】\n正しい期間\n\n【現病歴】\n心不全"
+
+    def test_replaces_inline_header(self):
+        text = "入院期間: 4/1～4/3\n【現病歴】\n心不全"
+        assert splice_section(text, "入院期間", "期間") == "【入院期間】\n期間\n【現病歴】\n心不全"
+
+    def test_inserts_missing_section_in_display_order(self):
+        text = "【現病歴】\n心不全\n\n【備考】\nなし"
+        result = splice_section(text, "入院期間", "期間")
+
+        assert result == "【入院期間】\n期間\n\n【現病歴】\n心不全\n\n【備考】\nなし"
+        assert parse_output_summary(result)["入院期間"] == "期間"
+
+    def test_appends_when_no_following_section(self):
+        assert splice_section("【現病歴】\n心不全\n", "備考", "なし") == "【現病歴】\n心不全\n\n【備考】\nなし"
+
+    def test_removes_duplicate_sections(self):
+        text = "【入院期間】\nA\n【現病歴】\nB\n【入院期間】\nC"
+        assert splice_section(text, "入院期間", "D") == "【入院期間】\nD\n【現病歴】\nB"
+
+
+class TestMergeContinuation:
+
+    def test_appends_without_overlap(self):
+        assert merge_continuation("【現病歴】\n高血圧で", "通院中。") == "【現病歴】\n高血圧で通院中。"
+
+    def test_removes_repeated_tail(self):
+        partial = "【入院中の治療経過】\nフロセミド静注を開始し、第5病日には"
+        continuation = "フロセミド静注を開始し、第5病日には酸素投与を終了した。"
+
+        assert merge_continuation(partial, continuation) == partial + "酸素投与を終了した。"
+
+    def test_short_overlap_is_kept(self):
+        assert merge_continuation("退院時処方", "処方の継続") == "退院時処方処方の継続"
+
+
+class TestExtractSectionContent:
+
+    def test_get_first_section(self):
+        assert get_first_section("\n【入院期間】2024年4月1日\n【現病歴】\n高血圧") == "入院期間"
+        assert get_first_section("承知しました。\n【現病歴】") is None
+        assert get_first_section("") is None
+
+    def test_strips_header_and_other_sections(self):
+        text = "【備考】\nキーパーソンは**長女**。\n【退院申し送り】\n外来フォロー"
+        assert extract_section_content(text, "備考") == "キーパーソンは長女。"
+
+    def test_text_without_header(self):
+        assert extract_section_content("  キーパーソンは長女。\n", "備考") == "キーパーソンは長女。"
+
+    def test_header_only(self):
+        assert extract_section_content("【備考】", "備考") == ""
+        assert extract_section_content("【備考】\n", "備考") == ""
@@ -0,0 +1,148 @@
+import datetime
+import json
+import time
+from unittest.mock import Mock
+
+import pytz
+from sqlalchemy import exc
+
+from utils.exceptions import DatabaseError
+from utils.usage_recorder import UsageRecorder
+
+JST = pytz.timezone('Asia/Tokyo')
+
+
+def _usage(request_id: str) -> dict:
+    return {
+        "date": JST.localize(datetime.datetime(2024, 4, 1, 10, 0)),
+        "model_detail": "claude",
+        "input_tokens": 100,
+        "output_tokens": 200,
+        "request_id": request_id
+    }
+
+
+def _recorder(tmp_path, repository, **kwargs) -> UsageRecorder:
+    return UsageRecorder(lambda: repository, str(tmp_path / "spool.jsonl"), **kwargs)
+
+
+class TestUsageRecorder:
+
+    def test_flush_saves_batch(self, tmp_path):
+        repository = Mock()
+        recorder = _recorder(tmp_path, repository)
+
+        assert recorder.flush([_usage("a"), _usage("b")]) is True
+
+        repository.bulk_save_usage.assert_called_once()
+        assert [row["request_id"] for row in repository.bulk_save_usage.call_args[0][0]] == ["a", "b"]
+        assert not (tmp_path / "spool.jsonl").exists()
+
+    def test_flush_failure_spools_rows(self, tmp_path):
+        repository = Mock()
+        repository.bulk_save_usage.side_effect = Exception("接続エラー")
+        recorder = _recorder(tmp_path, repository)
+
+        assert recorder.flush([_usage("a")]) is False
+
+        lines = (tmp_path / "spool.jsonl").read_text(encoding="utf-8").splitlines()
+        assert json.loads(lines[0])["request_id"] == "a"
+        assert json.loads(lines[0])["date"] == "2024-04-01T10:00:00+09:00"
+
+    def test_replay_after_recovery(self, tmp_path):
+        repository = Mock()
+        repository.bulk_save_usage.side_effect = [Exception("接続エラー"), None, None]
+        recorder = _recorder(tmp_path, repository)
+
+        recorder.flush([_usage("a")])
+        recorder.flush([_usage("b")])
+
+        replayed = repository.bulk_save_usage.call_args_list[2][0][0]
+        assert [row["request_id"] for row in replayed] == ["a"]
+        assert replayed[0]["date"] == _usage("a")["date"]
+        assert not (tmp_path / "spool.jsonl").exists()
+
+    def test_replay_failure_keeps_spool(self, tmp_path):
+        repository = Mock()
+        repository.bulk_save_usage.side_effect = Exception("接続エラー")
+        recorder = _recorder(tmp_path, repository)
+        recorder.spool([_usage("a")])
+
+        assert recorder.replay_spool() == 0
+        assert (tmp_path / "spool.jsonl").exists()
+
+    def test_replay_skips_truncated_line(self, tmp_path):
+        repository = Mock()
+        recorder = _recorder(tmp_path, repository)
+        recorder.spool([_usage("a")])
+        with open(tmp_path / "spool.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"request_id": "b", "da')
+
+        assert recorder.replay_spool() == 1
+
+    def test_replay_quarantines_invalid_row(self, tmp_path):
+        def bulk_save_usage(rows):
+            if any(row["request_id"] == "bad" for row in rows):
+                try:
+                    raise exc.DataError("INSERT", {}, Exception("value too long"))
+                except Exception as e:
+                    raise DatabaseError(f"使用統計の一括保存に失敗しました: {str(e)}")
+
+        repository = Mock()
+        repository.bulk_save_usage.side_effect = bulk_save_usage
+        recorder = _recorder(tmp_path, repository)
+        recorder.spool([_usage("a"), _usage("bad"), _usage("b")])
+
+        assert recorder.replay_spool() == 2
+        assert not (tmp_path / "spool.jsonl").exists()
+        rejected = (tmp_path / "spool.jsonl.rejected").read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["request_id"] for line in rejected] == ["bad"]
+
+    def test_replay_keeps_rows_after_transient_failure(self, tmp_path):
+        repository = Mock()
+        repository.bulk_save_usage.side_effect = [
+            Exception("一括保存エラー"), None, Exception("接続エラー")
+        ]
+        recorder = _recorder(tmp_path, repository)
+        recorder.spool([_usage("a"), _usage("b"), _usage("c")])
+
+        assert recorder.replay_spool() == 1
+        lines = (tmp_path / "spool.jsonl").read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["request_id"] for line in lines] == ["b", "c"]
+        assert repository.bulk_save_usage.call_count == 3
+        assert not (tmp_path / "spool.jsonl.rejected").exists()
+
+    def test_next_batch_limited_by_size(self, tmp_path):
+        recorder = _recorder(tmp_path, Mock(), batch_size=2, flush_interval=10)
+        for request_id in ["a", "b", "c"]:
+            recorder._queue.put(_usage(request_id))
+
+        assert [row["request_id"] for row in recorder._next_batch()] == ["a", "b"]
+
+    def test_next_batch_limited_by_time(self, tmp_path):
+        recorder = _recorder(tmp_path, Mock(), batch_size=10, flush_interval=0.01)
+        recorder._queue.put(_usage("a"))
+
+        assert [row["request_id"] for row in recorder._next_batch()] == ["a"]
+
+    def test_drain_flushes_pending_rows(self, tmp_path):
+        repository = Mock()
+        recorder = _recorder(tmp_path, repository)
+        recorder._queue.put(_usage("a"))
+        recorder._in_flight = [_usage("b")]
+
+        recorder.drain()
+
+        saved = repository.bulk_save_usage.call_args[0][0]
+        assert {row["request_id"] for row in saved} == {"a", "b"}
+
+    def test_record_saves_in_background(self, tmp_path):
+        repository = Mock()
+        recorder = _recorder(tmp_path, repository, flush_interval=0.01)
+
+        recorder.record(_usage("a"))
+        deadline = time.monotonic() + 2
+        while not repository.bulk_save_usage.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        repository.bulk_save_usage.assert_called_once()
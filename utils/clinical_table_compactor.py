@@ -0,0 +1,220 @@
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+DATE_PATTERN = re.compile(
+    r'^(?:(?P<year>\d{4})[/.\-年](?P<month>\d{1,2})[/.\-月](?P<day>\d{1,2})'
+    r'|(?P<short_month>\d{1,2})[/月](?P<short_day>\d{1,2}))日?'
+    r'(?:\s+(?P<time>\d{1,2}:\d{2}))?$'
+)
+UNIT_HEADERS = ("単位",)
+MISSING_VALUE = "-"
+
+RP_MARKER = re.compile(r'^\s*(?P<marker>Rp\.?\s*\d+|\d+[).]|\(\d+\))\s*', re.IGNORECASE)
+RP_ONLY_MARKER = re.compile(r'^\s*(?P<marker>Rp\.?\s*\d+)\s*', re.IGNORECASE)
+USAGE_LINE = re.compile(r'^(?:1日\d+回|分\d+|毎食|朝|昼|夕|就寝|頓用|外用|\d+日分|\d+回分)')
+# メーカー名は規格・剤形の直後に付くもののみ省く（注意書きや患者の発言の「…」は残す）
+MAKER_NAME = re.compile(
+    r'(?P<drug>(?:mg|μg|g|mL|%|錠|OD|カプセル|散|顆粒|液|シロップ|軟膏|クリーム|テープ|パップ|注|キット))'
+    r'「[^」]{1,20}」',
+    re.IGNORECASE
+)
+
+_CELL = re.compile(r'\S+(?: \S+)*')
+_VALUE_FLAG = re.compile(r'^(?P<value>\S+)\s+(?P<flag>[HL]|↑|↓|\*)$')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _match_date(cell: str) -> Optional[str]:
+    match = DATE_PATTERN.match(cell.strip())
+    if not match:
+        return None
+
+    if match.group('year'):
+        date = f"{int(match.group('year'))}/{int(match.group('month'))}/{int(match.group('day'))}"
+    else:
+        date = f"{int(match.group('short_month'))}/{int(match.group('short_day'))}"
+
+    if match.group('time'):
+        date += f" {match.group('time')}"
+    return date
+
+
+def _display_width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+
+
+def _split_cells(line: str) -> List[Tuple[int, int, str]]:
+    if '\t' in line:
+        return [(index, index, cell.strip()) for index, cell in enumerate(line.split('\t'))]
+
+    # 桁揃えは等幅フォントでの表示幅で行われるため、位置は表示幅で数える
+    cells = []
+    position = 0
+    consumed = 0
+    for match in _CELL.finditer(line):
+        position += _display_width(line[consumed:match.start()])
+        width = _display_width(match.group())
+        cells.append((position, position + width, match.group()))
+        position += width
+        consumed = match.end()
+    return cells
+
+
+def _parse_header(line: str) -> Optional[Dict[str, Any]]:
+    cells = _split_cells(line)
+    if len(cells) < 3 or _match_date(cells[0][2]):
+        return None
+
+    dates = {index: _match_date(cell[2]) for index, cell in enumerate(cells)}
+    date_indexes = [index for index, date in dates.items() if date]
+    if len(date_indexes) < 2:
+        return None
+
+    def find_column(keywords):
+        for index, cell in enumerate(cells):
+            if index not in date_indexes and any(keyword in cell[2] for keyword in keywords):
+                return index
+        return None
+
+    return {
+        "tabbed": '\t' in line,
+        "cells": cells,
+        "title": cells[0][2],
+        "dates": [dates[index] for index in date_indexes],
+        "date_indexes": date_indexes,
+        "unit_index": find_column(UNIT_HEADERS),
+    }
+
+
+def _assign_columns(line: str, header: Dict[str, Any]) -> Dict[int, str]:
+    columns: Dict[int, List[str]] = {}
+    header_cells = header["cells"]
+
+    if header["tabbed"]:
+        for index, cell in enumerate(_split_cells(line)[:len(header_cells)]):
+            if cell[2]:
+                columns.setdefault(index, []).append(cell[2])
+    else:
+        # 見出しと重なりが最も大きい列に割り当て、重ならなければ最も近い列とする
+        for start, end, text in _split_cells(line):
+            index = min(
+                range(len(header_cells)),
+                key=lambda i: (
+                    -(min(end, header_cells[i][1]) - max(start, header_cells[i][0])),
+                    max(header_cells[i][0] - end, start - header_cells[i][1], 0),
+                )
+            )
+            columns.setdefault(index, []).append(text)
+
+    return {index: " ".join(values) for index, values in columns.items()}
+
+
+def _format_value(value: Optional[str]) -> str:
+    if not value:
+        return MISSING_VALUE
+    match = _VALUE_FLAG.match(value)
+    if match:
+        return match.group('value') + match.group('flag')
+    return value
+
+
+def _parse_row(line: str, header: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not line.strip() or _parse_header(line):
+        return None
+
+    columns = _assign_columns(line, header)
+    name = columns.get(0)
+    values = [columns.get(index) for index in header["date_indexes"]]
+    if not name or not any(values):
+        return None
+
+    unit_index = header["unit_index"]
+    return {
+        "name": name,
+        "unit": columns.get(unit_index) if unit_index is not None else None,
+        "values": [_format_value(value) for value in values],
+    }
+
+
+def _render_lab_table(header: Dict[str, Any], rows: List[Dict[str, Any]]) -> List[str]:
+    lines = [f"{header['title']} ({' | '.join(header['dates'])})"]
+    for row in rows:
+        line = f"{row['name']}: {' | '.join(row['values'])}"
+        if row["unit"]:
+            line += f" ({row['unit']})"
+        lines.append(line)
+    return lines
+
+
+def compact_lab_tables(text: str) -> str:
+    # 日付を列見出しに持つ検査表を、項目ごと1行・日付順の値に書き換える（基準値の列は省く）
+    lines = text.split('\n')
+    output = []
+    i = 0
+
+    while i < len(lines):
+        header = _parse_header(lines[i])
+        if header is None:
+            output.append(lines[i])
+            i += 1
+            continue
+
+        rows = []
+        j = i + 1
+        while j < len(lines):
+            row = _parse_row(lines[j], header)
+            if row is None:
+                break
+            rows.append(row)
+            j += 1
+
+        if not rows:
+            output.append(lines[i])
+            i += 1
+            continue
+
+        output.extend(_render_lab_table(header, rows))
+        i = j
+
+    return '\n'.join(output)
+
+
+def _compact_line(text: str, strip_maker: bool = False) -> str:
+    if strip_maker:
+        text = MAKER_NAME.sub(r'\g<drug>', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def compact_prescriptions(text: str, rp_only: bool = False) -> str:
+    # Rp単位で薬剤名と用法の行をまとめて1行にし、メーカー名「…」を省く
+    marker_pattern = RP_ONLY_MARKER if rp_only else RP_MARKER
+    output: List[Any] = []
+    current: Optional[List[str]] = None
+
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if not stripped:
+            current = None
+            output.append("")
+            continue
+
+        marker = marker_pattern.match(line)
+        if marker:
+            number = re.sub(r'\D', '', marker.group('marker'))
+            current = [_compact_line(line[marker.end():], strip_maker=True)]
+            output.append((number, current))
+        elif current is not None and (line[0].isspace() or USAGE_LINE.match(stripped)):
+            current.append(_compact_line(stripped))
+        else:
+            current = None
+            output.append(_compact_line(stripped) if not rp_only else line)
+
+    rendered = []
+    for item in output:
+        if isinstance(item, tuple):
+            number, parts = item
+            rendered.append(f"{number}) " + " ".join(part for part in parts if part))
+        else:
+            rendered.append(item)
+    return '\n'.join(rendered)
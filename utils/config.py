@@ -18,7 +18,7 @@ def get_config():
 
 def parse_database_url():
     database_url = os.environ.get("DATABASE_URL")
-    if database_url:
+    if database_url and not database_url.startswith("sqlite"):
         parsed = urlparse(database_url)
         return {
             "host": parsed.hostname,
@@ -30,19 +30,31 @@ def parse_database_url():
     return None
 
 
-db_config = parse_database_url()
+# DATABASE_URLが未設定の場合やSQLiteの場合は、PostgreSQLの接続情報を使用しない
+db_config = parse_database_url() or {}
 
-POSTGRES_HOST = db_config["host"]
-POSTGRES_PORT = db_config["port"]
-POSTGRES_USER = db_config["user"]
-POSTGRES_PASSWORD = db_config["password"]
-POSTGRES_DB = db_config["database"]
+POSTGRES_HOST = db_config.get("host")
+POSTGRES_PORT = db_config.get("port")
+POSTGRES_USER = db_config.get("user")
+POSTGRES_PASSWORD = db_config.get("password")
+POSTGRES_DB = db_config.get("database")
 POSTGRES_SSL = "require"
 
 DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
 DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
 DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
 DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "3600"))
+DB_PGBOUNCER_MODE = os.environ.get("DB_PGBOUNCER_MODE", "False").lower() == "true"
+DB_READ_AFTER_WRITE_SECONDS = float(os.environ.get("DB_READ_AFTER_WRITE_SECONDS", "10"))
+
+USAGE_RECORDER = os.environ.get("USAGE_RECORDER", "True").lower() == "true"
+USAGE_BATCH_SIZE = int(os.environ.get("USAGE_BATCH_SIZE", "50"))
+USAGE_FLUSH_INTERVAL = float(os.environ.get("USAGE_FLUSH_INTERVAL", "5"))
+USAGE_SPOOL_PATH = os.environ.get("USAGE_SPOOL_PATH", "usage_spool.jsonl")
+USAGE_ROLLUP = os.environ.get("USAGE_ROLLUP", "True").lower() == "true"
+USAGE_PARTITION_MONTHS_AHEAD = int(os.environ.get("USAGE_PARTITION_MONTHS_AHEAD", "3"))
+USAGE_RETENTION_MONTHS = int(os.environ.get("USAGE_RETENTION_MONTHS", "0"))
+USAGE_ARCHIVE_DIR = os.environ.get("USAGE_ARCHIVE_DIR", "")
 
 AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
@@ -62,6 +74,20 @@ SELECTED_AI_MODEL = os.environ.get("SELECTED_AI_MODEL", "claude")
 MAX_INPUT_TOKENS = int(os.environ.get("MAX_INPUT_TOKENS", "300000"))
 MIN_INPUT_TOKENS = int(os.environ.get("MIN_INPUT_TOKENS", "100"))
 MAX_TOKEN_THRESHOLD = int(os.environ.get("MAX_TOKEN_THRESHOLD", "100000"))
+MAX_CONTINUATIONS = int(os.environ.get("MAX_CONTINUATIONS", "2"))
+
+KARTE_PREPROCESSING = os.environ.get("KARTE_PREPROCESSING", "True").lower() == "true"
+CONTEXT_SELECTION = os.environ.get("CONTEXT_SELECTION", "False").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "80000"))
+
+STRUCTURED_OUTPUT = os.environ.get("STRUCTURED_OUTPUT", "False").lower() == "true"
+RULE_BASED_SECTIONS = os.environ.get("RULE_BASED_SECTIONS", "False").lower() == "true"
+SECTION_COMPLETENESS_CHECK = os.environ.get("SECTION_COMPLETENESS_CHECK", "False").lower() == "true"
+
+SPECULATIVE_PREPARATION = os.environ.get("SPECULATIVE_PREPARATION", "True").lower() == "true"
+PREPARATION_CACHE_SIZE = int(os.environ.get("PREPARATION_CACHE_SIZE", "16"))
 
 APP_TYPE = os.environ.get("APP_TYPE", "dischargesummary")
 PROMPT_MANAGEMENT = os.environ.get("PROMPT_MANAGEMENT", "True").lower() == "true"
+PROMPT_CATALOG_WARMUP = os.environ.get("PROMPT_CATALOG_WARMUP", "False").lower() == "true"
+PROMPT_SNAPSHOT_TTL = int(os.environ.get("PROMPT_SNAPSHOT_TTL", "300"))
@@ -15,10 +15,94 @@ DOCUMENT_NAME_OPTIONS = ["退院時サマリ", "現病歴", "すべて"]
 
 MODEL_OPTIONS =  ["すべて", "Claude", "Gemini_Pro", "Gemini_Flash"]
 
+# model_detailに含まれる語句とモデル系統の対応（上から順に判定する）
+MODEL_FAMILY_PATTERNS = [
+    ("flash", "Gemini_Flash"),
+    ("gemini", "Gemini_Pro"),
+    ("claude", "Claude"),
+]
+DEFAULT_MODEL_FAMILY = "Gemini_Pro"
+
 DEFAULT_SECTION_NAMES = [
     "入院期間", "現病歴", "入院時検査", "入院中の治療経過", "退院申し送り", "備考"
 ]
 
+STRUCTURED_OUTPUT_DOCUMENT_TYPES = ["退院時サマリ"]
+
+# 文書の長さに応じた出力トークン上限・思考レベル・停止シーケンス（プロバイダー別）
+DEFAULT_GENERATION_PROFILE = "standard"
+GENERATION_PROFILES = {
+    "standard": {
+        "label": "標準（退院時サマリ）",
+        "claude": {"max_tokens": 6000, "stop_sequences": [], "prefill_header": True, "scaffold_sections": True},
+        "gemini": {"max_tokens": None, "thinking_level": None, "stop_sequences": [], "scaffold_sections": True},
+    },
+    "short": {
+        "label": "短文（現病歴など）",
+        "claude": {"max_tokens": 2000, "stop_sequences": []},
+        # Geminiは思考のトークンも出力上限に含まれ、思考の量は指定できないため上限を設けない
+        "gemini": {"max_tokens": None, "thinking_level": "LOW", "stop_sequences": []},
+    },
+}
+DOCUMENT_TYPE_GENERATION_PROFILES = {
+    "退院時サマリ": "standard",
+    "現病歴": "short",
+}
+
+# 見出しの順序を指定して出力させる文書（前置き・指示の復唱・装飾記号を書かせない）
+OUTPUT_SCAFFOLD_DOCUMENT_TYPES = ["退院時サマリ"]
+OUTPUT_SCAFFOLD_INSTRUCTION = "\n【出力形式】前置き・指示の復唱・締めくくりの文・装飾記号（*や#）は書かず、以下の見出しの順に本文のみを出力してください。"
+# 出力の末尾から取り除く締めくくりの文と区切り線
+# （区切り線は項目の間にも出力され、「以上、」で始まる本文もあるため、停止シーケンスにはせず出力後に取り除く）
+OUTPUT_EPILOGUE_PATTERN = (
+    r'^(?:-{3,}|以上です。?|以上となります。?'
+    r'|以上が.*(?:サマリ|文書|内容|要約).*'
+    r'|以上、.*(?:ご確認|ご参照|ご不明|ご活用).*)$'
+)
+
+# 出力上限で途中終了した生成の続きを依頼する指示（Geminiはプリフィルできないため会話で依頼する）
+CONTINUATION_INSTRUCTION = "直前の出力は出力上限で途中終了しました。最後の文字の直後から続きのみを出力してください。既に出力した内容の繰り返しや前置きは不要です。"
+CONTINUATION_MIN_OVERLAP = 8
+
+# 作成後に空欄であれば、その項目のみを再作成するセクション（文書名別）
+REQUIRED_SECTION_NAMES = {
+    "退院時サマリ": ["現病歴", "入院時検査", "入院中の治療経過", "退院申し送り"],
+}
+SECTION_REGENERATION_PROFILE = "short"
+SECTION_REGENERATION_INSTRUCTION = "\n上記のカルテ情報と作成済みの項目をもとに、【{section}】の項目のみを作成してください。他の項目・前置き・装飾記号は出力せず、見出しに続けて本文のみを出力してください。"
+
+# 作成済みの文書への修正指示（前回の出力に続く会話として送信する）
+REFINEMENT_INSTRUCTION = "【修正指示】{instruction}\n上記の指示に従って直前の文書を修正し、修正後の文書全体を同じ見出し形式で出力してください。前置きや修正内容の説明は不要です。"
+
+# カルテから規則で抽出し、モデルには作成させないセクション
+RULE_BASED_SECTION_NAMES = ["入院期間"]
+
+# 診療科ごとの設定は default に上書きでマージされる
+KARTE_PREPROCESSING_SETTINGS = {
+    "default": {
+        "enabled": True,
+        "normalize": True,
+        "collapse_whitespace": True,
+        "compact_tables": True,
+        "remove_duplicates": True,
+        "dedupe_unit": "paragraph",
+        # 1.0 は完全一致のみ除去する。類似した記載もまとめる場合は 0.9 程度に下げる
+        "near_duplicate_threshold": 1.0,
+        "min_dedupe_length": 20,
+    },
+}
+
+# 長いカルテから記載を選ぶ際に、各セクションで必要となる語句
+CONTEXT_SECTION_QUERIES = {
+    "現病歴": ["主訴", "現病歴", "既往歴", "入院", "来院", "受診", "発症", "紹介"],
+    "入院時検査": ["検査", "採血", "血液", "CT", "MRI", "X線", "エコー", "心電図", "培養", "所見"],
+    "入院中の治療経過": ["治療", "投与", "開始", "中止", "変更", "改善", "増悪", "経過", "手術", "リハビリ"],
+    "退院申し送り": ["退院", "外来", "処方", "継続", "予定", "指導", "転院", "フォロー", "申し送り"],
+}
+CONTEXT_ADMISSION_KEYWORDS = ["入院時", "入院となった", "主訴", "現病歴", "入院日"]
+CONTEXT_PROCEDURE_KEYWORDS = ["手術", "術後", "施行", "内視鏡", "カテーテル", "PCI", "ドレナージ", "穿刺", "生検", "挿管"]
+CONTEXT_RECENT_ENTRY_COUNT = 3
+
 TAB_NAMES = {
     "ALL": "全文",
     "ADMISSION_PERIOD": "【入院期間】",
@@ -51,4 +135,10 @@ MESSAGES = {
     "VERTEX_AI_API_ERROR": "Vertex AI Gemini APIエラー: {error}",
     "COPY_INSTRUCTION": "💡 テキストエリアの右上にマウスを合わせて左クリックでコピーできます",
     "PROCESSING_TIME": "⏱️ 処理時間: {processing_time:.0f}秒",
+    "CONTEXT_TRIMMED": "✂️ 入力が長いため、関連の低い記載{count}件（約{tokens:,}トークン）を除いて作成しました",
+    "INPUT_REDUCED": "✂️ 重複・空白の整理で入力を{chars_saved:,}文字（約{tokens_saved:,}トークン）削減しました",
+    "SECTIONS_REGENERATED": "🔁 空欄だった項目（{sections}）を再作成しました",
+    "SECTION_REGENERATING": "{section}を再作成中...",
+    "SUMMARY_REFINING": "修正指示を反映中...",
+    "REFINEMENT_EMPTY": "⚠️ 修正指示を入力してください",
 }
@@ -0,0 +1,165 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+from utils.constants import (
+    CONTEXT_ADMISSION_KEYWORDS,
+    CONTEXT_PROCEDURE_KEYWORDS,
+    CONTEXT_RECENT_ENTRY_COUNT,
+    CONTEXT_SECTION_QUERIES,
+)
+from utils.token_estimator import estimate_tokens
+
+ENTRY_DATE_PATTERN = re.compile(
+    r'^\s*[【\[(]?(?P<date>(?:\d{4}[/.\-年])?\d{1,2}[/月]\d{1,2}日?)(?=$|[\s)\]】(])'
+)
+PREVIEW_LENGTH = 40
+
+_ASCII_WORD = re.compile(r'[A-Za-z0-9]+')
+_JAPANESE_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u9fff]+')
+
+PRIORITY_ADMISSION = 0
+PRIORITY_RECENT = 1
+PRIORITY_PROCEDURE = 2
+PRIORITY_RELEVANCE = 3
+
+
+def tokenize(text: str) -> List[str]:
+    # 形態素解析器を使わず、日本語は文字bigram、英数字は単語単位で索引する
+    tokens = [word.lower() for word in _ASCII_WORD.findall(text)]
+    for run in _JAPANESE_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class BM25Index:
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_frequencies = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = (sum(self.lengths) / len(documents)) if documents else 0
+        self.document_frequencies = Counter(term for tf in self.term_frequencies for term in tf)
+        self.document_count = len(documents)
+
+    def idf(self, term: str) -> float:
+        df = self.document_frequencies.get(term, 0)
+        return math.log((self.document_count - df + 0.5) / (df + 0.5) + 1)
+
+    def score(self, query: List[str]) -> List[float]:
+        query_terms = [(term, self.idf(term)) for term in set(query) if term in self.document_frequencies]
+        scores = []
+        for tf, length in zip(self.term_frequencies, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.average_length) if self.average_length else self.k1
+            scores.append(sum(
+                idf * tf[term] * (self.k1 + 1) / (tf[term] + norm)
+                for term, idf in query_terms if term in tf
+            ))
+        return scores
+
+
+def split_entries(text: str) -> List[Dict[str, Any]]:
+    entries: List[Dict[str, Any]] = []
+    current_lines: List[str] = []
+    current_date = None
+
+    def flush():
+        body = "\n".join(current_lines).strip("\n")
+        if body.strip():
+            entries.append({"date": current_date, "text": body})
+
+    for line in text.split('\n'):
+        match = ENTRY_DATE_PATTERN.match(line)
+        if match:
+            flush()
+            current_lines = []
+            current_date = match.group('date')
+        current_lines.append(line)
+    flush()
+
+    for index, entry in enumerate(entries):
+        entry["index"] = index
+        entry["tokens"] = estimate_tokens(entry["text"])
+    return entries
+
+
+def score_entries(entries: List[Dict[str, Any]]) -> List[float]:
+    index = BM25Index([tokenize(entry["text"]) for entry in entries])
+    totals = [0.0] * len(entries)
+
+    # セクションごとに正規化して合算し、特定セクションの語句だけに偏らないようにする
+    for terms in CONTEXT_SECTION_QUERIES.values():
+        scores = index.score([token for term in terms for token in tokenize(term)])
+        best = max(scores, default=0)
+        if best > 0:
+            totals = [total + score / best for total, score in zip(totals, scores)]
+    return totals
+
+
+def _priority(entry: Dict[str, Any], entry_count: int) -> int:
+    if any(keyword in entry["text"] for keyword in CONTEXT_ADMISSION_KEYWORDS):
+        return PRIORITY_ADMISSION
+    if entry["index"] >= entry_count - CONTEXT_RECENT_ENTRY_COUNT:
+        return PRIORITY_RECENT
+    if any(keyword in entry["text"] for keyword in CONTEXT_PROCEDURE_KEYWORDS):
+        return PRIORITY_PROCEDURE
+    return PRIORITY_RELEVANCE
+
+
+def _selection_order(entry: Dict[str, Any]):
+    recency = -entry["index"] if entry["priority"] == PRIORITY_RECENT else 0
+    return entry["priority"], recency, -entry["score"]
+
+
+def _preview(text: str) -> str:
+    flattened = " ".join(text.split())
+    return flattened if len(flattened) <= PREVIEW_LENGTH else flattened[:PREVIEW_LENGTH] + "…"
+
+
+def select_context(text: str, token_budget: int) -> Dict[str, Any]:
+    original_tokens = estimate_tokens(text)
+    if original_tokens <= token_budget:
+        return {"text": text, "applied": False, "dropped": [],
+                "original_tokens": original_tokens, "selected_tokens": original_tokens}
+
+    entries = split_entries(text)
+    scores = score_entries(entries)
+    for entry, score in zip(entries, scores):
+        entry["score"] = score
+        entry["priority"] = _priority(entry, len(entries))
+
+    # 日付のない冒頭部分と最初の日付の記載（入院日）は常に残す
+    first_dated = next((entry["index"] for entry in entries if entry["date"] is not None), len(entries))
+    selected = {entry["index"] for entry in entries if entry["index"] <= first_dated}
+    used_tokens = sum(entry["tokens"] for entry in entries if entry["index"] in selected)
+
+    # 入院時・直近・処置・関連度の順に、予算に収まる記載を追加する
+    for entry in sorted(entries, key=_selection_order):
+        if entry["index"] not in selected and used_tokens + entry["tokens"] <= token_budget:
+            selected.add(entry["index"])
+            used_tokens += entry["tokens"]
+
+    kept = [entry for entry in entries if entry["index"] in selected]
+    dropped = [
+        {
+            "date": entry["date"],
+            "preview": _preview(entry["text"]),
+            "tokens": entry["tokens"],
+            "score": round(entry["score"], 3),
+        }
+        for entry in entries if entry["index"] not in selected
+    ]
+    selected_text = "\n\n".join(entry["text"] for entry in kept)
+
+    return {
+        "text": selected_text,
+        "applied": bool(dropped),
+        "dropped": dropped,
+        "original_tokens": original_tokens,
+        "selected_tokens": estimate_tokens(selected_text),
+    }
@@ -6,3 +6,6 @@ class APIError(AppError):
 
 class DatabaseError(AppError):
     pass
+
+class DatabaseCommitError(DatabaseError):
+    pass
@@ -0,0 +1,26 @@
+from typing import Any, Dict, Optional
+
+from utils.constants import DEFAULT_GENERATION_PROFILE, DOCUMENT_TYPE_GENERATION_PROFILES, GENERATION_PROFILES
+
+
+def resolve_generation_profile(document_type: str, prompt_profile: Optional[str] = None) -> str:
+    if prompt_profile in GENERATION_PROFILES:
+        return prompt_profile
+    return DOCUMENT_TYPE_GENERATION_PROFILES.get(document_type, DEFAULT_GENERATION_PROFILE)
+
+
+def get_provider_settings(profile_name: Optional[str], provider: str) -> Dict[str, Any]:
+    profile = GENERATION_PROFILES.get(profile_name) or GENERATION_PROFILES[DEFAULT_GENERATION_PROFILE]
+    settings = {
+        "max_tokens": None,
+        "thinking_level": None,
+        "stop_sequences": [],
+        "prefill_header": False,
+        "scaffold_sections": False,
+    }
+    settings.update(profile.get(provider, {}))
+    return settings
+
+
+def get_profile_label(profile_name: str) -> str:
+    return GENERATION_PROFILES.get(profile_name, {}).get("label", profile_name)
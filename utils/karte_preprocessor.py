@@ -0,0 +1,171 @@
+import re
+import unicodedata
+from typing import Any, Dict, List, Set, Tuple
+
+from utils.clinical_table_compactor import compact_lab_tables, compact_prescriptions
+from utils.config import KARTE_PREPROCESSING
+from utils.constants import KARTE_PREPROCESSING_SETTINGS
+from utils.token_estimator import estimate_tokens
+
+SHINGLE_SIZE = 5
+SKETCH_SIZE = 8
+_HASH_BASE = 257
+_HASH_MOD = (1 << 61) - 1
+
+_INLINE_WHITESPACE = re.compile(r'[^\S\n]+')
+_EXCESS_BLANK_LINES = re.compile(r'\n{3,}')
+_PARAGRAPH_SEPARATOR = re.compile(r'\n[^\S\n]*\n')
+_NUMERIC_TOKEN = re.compile(r'\d+(?:[./:]\d+)*')
+
+
+def get_preprocessing_settings(department: str = "default") -> Dict[str, Any]:
+    settings = dict(KARTE_PREPROCESSING_SETTINGS["default"])
+    settings.update(KARTE_PREPROCESSING_SETTINGS.get(department, {}))
+    return settings
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text)
+
+
+def collapse_whitespace(text: str) -> str:
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = [_INLINE_WHITESPACE.sub(' ', line).strip() for line in text.split('\n')]
+    return _EXCESS_BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def split_units(text: str, unit: str) -> Tuple[List[str], str]:
+    if unit == "line":
+        return [line for line in text.split('\n') if line.strip()], '\n'
+    return [p.strip('\n') for p in _PARAGRAPH_SEPARATOR.split(text) if p.strip()], '\n\n'
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    compact = text.replace(' ', '').replace('\n', '')
+    if len(compact) <= size:
+        return {hash(compact) % _HASH_MOD}
+
+    high_order = pow(_HASH_BASE, size - 1, _HASH_MOD)
+    rolling = 0
+    for char in compact[:size]:
+        rolling = (rolling * _HASH_BASE + ord(char)) % _HASH_MOD
+
+    hashes = {rolling}
+    for i in range(size, len(compact)):
+        rolling = ((rolling - ord(compact[i - size]) * high_order) * _HASH_BASE + ord(compact[i])) % _HASH_MOD
+        hashes.add(rolling)
+    return hashes
+
+
+def jaccard_similarity(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def numeric_tokens(text: str) -> Tuple[str, ...]:
+    return tuple(_NUMERIC_TOKEN.findall(normalize_text(text)))
+
+
+def remove_duplicate_units(units: List[str], near_duplicate_threshold: float,
+                           min_length: int) -> Tuple[List[str], int]:
+    # コピー&ペーストされた記載は新しいものほど情報が追記されているため、末尾から走査して最新を残す
+    kept_reversed = []
+    seen_exact = set()
+    kept_shingles: List[Set[int]] = []
+    kept_numbers: List[Tuple[str, ...]] = []
+    sketch_index: Dict[int, List[int]] = {}
+    removed = 0
+
+    for unit in reversed(units):
+        if len(unit) < min_length:
+            kept_reversed.append(unit)
+            continue
+
+        if unit in seen_exact:
+            removed += 1
+            continue
+        seen_exact.add(unit)
+
+        if near_duplicate_threshold < 1:
+            shingles = shingle_hashes(unit)
+            numbers = numeric_tokens(unit)
+            sketch = sorted(shingles)[:SKETCH_SIZE]
+            candidates = {index for value in sketch for index in sketch_index.get(value, ())}
+
+            # 検査値や日付が異なる記載は臨床的に別の情報のため、数値がすべて一致する場合のみ重複とみなす
+            if any(kept_numbers[index] == numbers
+                   and jaccard_similarity(shingles, kept_shingles[index]) >= near_duplicate_threshold
+                   for index in candidates):
+                removed += 1
+                continue
+
+            for value in sketch:
+                sketch_index.setdefault(value, []).append(len(kept_shingles))
+            kept_shingles.append(shingles)
+            kept_numbers.append(numbers)
+
+        kept_reversed.append(unit)
+
+    kept_reversed.reverse()
+    return kept_reversed, removed
+
+
+def _build_result(original: str, processed: str, removed_units: int = 0) -> Dict[str, Any]:
+    original_tokens = estimate_tokens(original)
+    processed_tokens = estimate_tokens(processed)
+
+    return {
+        "text": processed,
+        "original_chars": len(original),
+        "processed_chars": len(processed),
+        "chars_saved": max(len(original) - len(processed), 0),
+        "tokens_saved": max(original_tokens - processed_tokens, 0),
+        "removed_units": removed_units,
+    }
+
+
+def preprocess_karte(text: str, department: str = "default") -> Dict[str, Any]:
+    original = text or ""
+    settings = get_preprocessing_settings(department)
+    processed = original
+    removed_units = 0
+
+    if KARTE_PREPROCESSING and settings["enabled"]:
+        # 表の桁揃えは正規化前の表示幅に依存するため、表の書き換えを先に行う
+        if settings["compact_tables"]:
+            processed = compact_prescriptions(compact_lab_tables(processed), rp_only=True)
+
+        if settings["normalize"]:
+            processed = normalize_text(processed)
+
+        if settings["collapse_whitespace"]:
+            processed = collapse_whitespace(processed)
+
+        if settings["remove_duplicates"]:
+            units, separator = split_units(processed, settings["dedupe_unit"])
+            units, removed_units = remove_duplicate_units(
+                units, settings["near_duplicate_threshold"], settings["min_dedupe_length"]
+            )
+            if removed_units:
+                processed = separator.join(units)
+
+    return _build_result(original, processed, removed_units)
+
+
+def preprocess_prescription(text: str, department: str = "default") -> Dict[str, Any]:
+    original = text or ""
+    settings = get_preprocessing_settings(department)
+    processed = original
+
+    if KARTE_PREPROCESSING and settings["enabled"]:
+        if settings["compact_tables"]:
+            processed = compact_prescriptions(processed)
+
+        if settings["normalize"]:
+            processed = normalize_text(processed)
+
+        if settings["collapse_whitespace"]:
+            processed = collapse_whitespace(processed)
+
+    return _build_result(original, processed)
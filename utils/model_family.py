@@ -0,0 +1,13 @@
+from typing import Optional
+
+from utils.constants import DEFAULT_MODEL_FAMILY, MODEL_FAMILY_PATTERNS
+
+MODEL_FAMILIES = [family for _, family in MODEL_FAMILY_PATTERNS]
+
+
+def classify_model_family(model_detail: Optional[str]) -> str:
+    model_detail = str(model_detail or "").lower()
+    for pattern, family in MODEL_FAMILY_PATTERNS:
+        if pattern in model_detail:
+            return family
+    return DEFAULT_MODEL_FAMILY
@@ -0,0 +1,36 @@
+from typing import Any, Dict, List, Optional
+
+from utils.constants import (
+    DEFAULT_SECTION_NAMES,
+    OUTPUT_SCAFFOLD_DOCUMENT_TYPES,
+    OUTPUT_SCAFFOLD_INSTRUCTION,
+)
+
+
+def get_scaffold_sections(document_type: str, prefilled_sections: Optional[Dict[str, str]] = None) -> List[str]:
+    if document_type not in OUTPUT_SCAFFOLD_DOCUMENT_TYPES:
+        return []
+    prefilled = prefilled_sections or {}
+    return [section for section in DEFAULT_SECTION_NAMES if section not in prefilled]
+
+
+def build_scaffold_instruction(sections: List[str]) -> str:
+    if not sections:
+        return ""
+    return OUTPUT_SCAFFOLD_INSTRUCTION + "\n" + "\n".join(f"【{section}】" for section in sections)
+
+
+def build_header_prefill(sections: List[str]) -> str:
+    # 末尾に空白を含むプリフィルはAPIで拒否されるため見出しのみとする
+    return f"【{sections[0]}】" if sections else ""
+
+
+def apply_output_options(settings: Dict[str, Any],
+                         document_type: str,
+                         prefilled_sections: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    sections = get_scaffold_sections(document_type, prefilled_sections)
+    return {
+        "instruction": build_scaffold_instruction(sections) if settings["scaffold_sections"] else "",
+        "prefill": build_header_prefill(sections) if settings["prefill_header"] else "",
+        "stop_sequences": list(settings["stop_sequences"]),
+    }
@@ -0,0 +1,88 @@
+import csv
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, TextIO
+
+from utils.exceptions import AppError
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - PyYAML未導入環境
+    yaml = None
+
+PROMPT_FIELDS = ['department', 'document_type', 'doctor', 'selected_model', 'generation_profile', 'content']
+REQUIRED_PROMPT_FIELDS = ['department', 'document_type', 'doctor', 'content']
+SUPPORTED_FORMATS = {'.csv': 'csv', '.yaml': 'yaml', '.yml': 'yaml'}
+
+
+def detect_format(path: str) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix not in SUPPORTED_FORMATS:
+        raise AppError(f"未対応のファイル形式です: {suffix or path}（csv/yaml/yml のみ対応）")
+    return SUPPORTED_FORMATS[suffix]
+
+
+def _require_yaml():
+    if yaml is None:
+        raise AppError("YAML形式を扱うには PyYAML をインストールしてください")
+    return yaml
+
+
+def validate_prompt_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    validated = []
+    for index, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            raise AppError(f"{index}件目のプロンプト定義が不正です")
+
+        missing = [field for field in REQUIRED_PROMPT_FIELDS if not str(row.get(field) or "").strip()]
+        if missing:
+            raise AppError(f"{index}件目のプロンプトに必須項目がありません: {', '.join(missing)}")
+
+        validated.append({
+            'department': str(row['department']).strip(),
+            'document_type': str(row['document_type']).strip(),
+            'doctor': str(row['doctor']).strip(),
+            'selected_model': str(row.get('selected_model') or "").strip() or None,
+            'generation_profile': str(row.get('generation_profile') or "").strip() or None,
+            'content': str(row['content']),
+        })
+    return validated
+
+
+def read_prompts(stream: TextIO, file_format: str) -> List[Dict[str, Any]]:
+    if file_format == 'csv':
+        rows = list(csv.DictReader(stream))
+    else:
+        loaded = _require_yaml().safe_load(stream) or []
+        if isinstance(loaded, dict):
+            loaded = loaded.get('prompts', [])
+        if not isinstance(loaded, list):
+            raise AppError("YAMLはプロンプトのリストまたは prompts キーを持つ形式で記述してください")
+        rows = loaded
+
+    return validate_prompt_rows(rows)
+
+
+def write_prompts(rows: Iterable[Dict[str, Any]], stream: TextIO, file_format: str) -> int:
+    count = 0
+
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=PROMPT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({field: row.get(field) or "" for field in PROMPT_FIELDS})
+            count += 1
+        return count
+
+    yaml_module = _require_yaml()
+    for row in rows:
+        if count == 0:
+            stream.write("prompts:\n")
+        # 1件ずつ書き出して全件をメモリに載せない
+        item = {field: row.get(field) for field in PROMPT_FIELDS}
+        stream.write(yaml_module.safe_dump([item], allow_unicode=True, sort_keys=False, width=1000))
+        count += 1
+
+    if count == 0:
+        stream.write("prompts: []\n")
+
+    return count
@@ -1,51 +1,137 @@
 import datetime
+import threading
+import time
+from types import MappingProxyType
 from typing import Dict, Any, Optional, Tuple, List
 
 from database.db import get_prompt_repository
+from database.read_routing import mark_primary_reads
 from database.repositories import PromptRepository
-from utils.config import get_config
+from utils.config import get_config, PROMPT_SNAPSHOT_TTL
 from utils.constants import DEFAULT_DEPARTMENT, DOCUMENT_TYPES, DEPARTMENT_DOCTORS_MAPPING, DEFAULT_DOCUMENT_TYPE
 from utils.exceptions import DatabaseError, AppError
 
 
+def _prompt_to_dict(prompt) -> Dict[str, Any]:
+    return {
+        'id': prompt.id,
+        'department': prompt.department,
+        'document_type': prompt.document_type,
+        'doctor': prompt.doctor,
+        'content': prompt.content,
+        'selected_model': prompt.selected_model,
+        'generation_profile': prompt.generation_profile,
+        'is_default': prompt.is_default,
+        'created_at': prompt.created_at,
+        'updated_at': prompt.updated_at
+    }
+
+
+class PromptCatalogSnapshot:
+
+    def __init__(self, prompts: List[Dict[str, Any]]):
+        catalog = {}
+        default_prompt = None
+
+        for prompt in prompts:
+            key = (prompt['department'], prompt['document_type'], prompt['doctor'])
+            catalog[key] = MappingProxyType(dict(prompt))
+            if default_prompt is None and prompt['department'] == "default" and prompt['is_default']:
+                default_prompt = catalog[key]
+
+        self._catalog = MappingProxyType(catalog)
+        self._default_prompt = default_prompt
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._catalog)
+
+    def resolve(self, department: str, document_type: str, doctor: str) -> Optional[Dict[str, Any]]:
+        prompt = self._catalog.get((department, document_type, doctor)) or self._default_prompt
+        return dict(prompt) if prompt is not None else None
+
+    def is_stale(self, ttl_seconds: int) -> bool:
+        return ttl_seconds > 0 and time.monotonic() - self.loaded_at > ttl_seconds
+
+
 class PromptManager:
 
     def __init__(self):
         self.prompt_repository: PromptRepository = get_prompt_repository()
         self.default_prompt_content = get_config()['PROMPTS']['summary']
+        self._snapshot: Optional[PromptCatalogSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self._refreshing = False
+        # 読み込みを開始した順の番号と、現在のスナップショットの読み込み開始時の番号
+        self._load_generation = 0
+        self._snapshot_generation = 0
+
+    @property
+    def snapshot(self) -> Optional[PromptCatalogSnapshot]:
+        return self._snapshot
+
+    def load_snapshot(self) -> Optional[PromptCatalogSnapshot]:
+        with self._snapshot_lock:
+            self._load_generation += 1
+            generation = self._load_generation
+
+        prompts = [_prompt_to_dict(p) for p in self.prompt_repository.get_all()]
+        snapshot = PromptCatalogSnapshot(prompts)
+
+        with self._snapshot_lock:
+            # 後から読み込みを開始したスナップショットが既に反映されていれば、古い内容で上書きしない
+            if generation < self._snapshot_generation:
+                return self._snapshot
+            # 参照の差し替えのみで切り替えるため、読み取り側はロック不要
+            self._snapshot = snapshot
+            self._snapshot_generation = generation
+        return snapshot
+
+    def refresh_snapshot(self) -> None:
+        if self._snapshot is None:
+            return
+
+        try:
+            self.load_snapshot()
+        except Exception as e:
+            # 古いスナップショットを使い続けないようDB参照に戻す
+            self._snapshot = None
+            print(f"プロンプトスナップショットの更新に失敗しました: {str(e)}")
+
+    def _refresh_in_background(self) -> None:
+        with self._snapshot_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                # 別スレッドには読み取り先の指定が引き継がれないため、遅延のあるレプリカを避けてプライマリから読み込む
+                mark_primary_reads()
+                self.refresh_snapshot()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
 
     def get_prompt(self, department: str = "default",
                    document_type: str = DEFAULT_DOCUMENT_TYPE,
                    doctor: str = "default") -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if snapshot.is_stale(PROMPT_SNAPSHOT_TTL):
+                self._refresh_in_background()
+            return snapshot.resolve(department, document_type, doctor)
+
         try:
             prompt = self.prompt_repository.get_by_keys(department, document_type, doctor)
 
             if prompt:
-                return {
-                    'id': prompt.id,
-                    'department': prompt.department,
-                    'document_type': prompt.document_type,
-                    'doctor': prompt.doctor,
-                    'content': prompt.content,
-                    'selected_model': prompt.selected_model,
-                    'is_default': prompt.is_default,
-                    'created_at': prompt.created_at,
-                    'updated_at': prompt.updated_at
-                }
+                return _prompt_to_dict(prompt)
 
             default_prompt = self.prompt_repository.get_default_prompt()
             if default_prompt:
-                return {
-                    'id': default_prompt.id,
-                    'department': default_prompt.department,
-                    'document_type': default_prompt.document_type,
-                    'doctor': default_prompt.doctor,
-                    'content': default_prompt.content,
-                    'selected_model': default_prompt.selected_model,
-                    'is_default': default_prompt.is_default,
-                    'created_at': default_prompt.created_at,
-                    'updated_at': default_prompt.updated_at
-                }
+                return _prompt_to_dict(default_prompt)
 
             return None
 
@@ -56,14 +142,17 @@ class PromptManager:
 
     def create_or_update_prompt(self, department: str, document_type: str,
                                 doctor: str, content: str,
-                                selected_model: Optional[str] = None) -> Tuple[bool, str]:
+                                selected_model: Optional[str] = None,
+                                generation_profile: Optional[str] = None) -> Tuple[bool, str]:
         try:
             if not all([department, document_type, doctor, content]):
                 return False, "すべての項目を入力してください"
 
-            return self.prompt_repository.create_or_update(
-                department, document_type, doctor, content, selected_model
+            result = self.prompt_repository.create_or_update(
+                department, document_type, doctor, content, selected_model, generation_profile
             )
+            self.refresh_snapshot()
+            return result
 
         except DatabaseError as e:
             return False, str(e)
@@ -78,7 +167,10 @@ class PromptManager:
                     doctor == "default"):
                 return False, "デフォルトプロンプトは削除できません"
 
-            return self.prompt_repository.delete_by_keys(department, document_type, doctor)
+            result = self.prompt_repository.delete_by_keys(department, document_type, doctor)
+            if result[0]:
+                self.refresh_snapshot()
+            return result
 
         except DatabaseError as e:
             return False, str(e)
@@ -88,26 +180,14 @@ class PromptManager:
     def get_all_prompts(self) -> List[Dict[str, Any]]:
         try:
             prompts = self.prompt_repository.get_all()
-            return [
-                {
-                    'id': p.id,
-                    'department': p.department,
-                    'document_type': p.document_type,
-                    'doctor': p.doctor,
-                    'content': p.content,
-                    'selected_model': p.selected_model,
-                    'is_default': p.is_default,
-                    'created_at': p.created_at,
-                    'updated_at': p.updated_at
-                }
-                for p in prompts
-            ]
+            return [_prompt_to_dict(p) for p in prompts]
         except Exception as e:
             raise DatabaseError(f"プロンプト一覧の取得に失敗しました: {str(e)}")
 
     def initialize_default_prompt(self):
         try:
             self.prompt_repository.create_default_prompt(self.default_prompt_content)
+            self.refresh_snapshot()
         except Exception as e:
             raise DatabaseError(f"デフォルトプロンプトの初期化に失敗しました: {str(e)}")
 
@@ -130,6 +210,7 @@ class PromptManager:
                         })
 
             self.prompt_repository.bulk_create_prompts(prompts_data)
+            self.refresh_snapshot()
 
         except Exception as e:
             raise DatabaseError(f"プロンプト初期化に失敗しました: {str(e)}")
@@ -143,3 +224,15 @@ def get_prompt_manager() -> PromptManager:
     if _prompt_manager is None:
         _prompt_manager = PromptManager()
     return _prompt_manager
+
+
+def warm_up_prompt_catalog() -> Optional[PromptCatalogSnapshot]:
+    prompt_manager = get_prompt_manager()
+    if prompt_manager.snapshot is not None:
+        return prompt_manager.snapshot
+
+    try:
+        return prompt_manager.load_snapshot()
+    except Exception as e:
+        print(f"プロンプトカタログの事前読み込みに失敗しました: {str(e)}")
+        return None
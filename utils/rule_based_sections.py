@@ -0,0 +1,83 @@
+import datetime
+import re
+from typing import Callable, Dict, List, Optional
+
+from utils.constants import RULE_BASED_SECTION_NAMES
+
+
+def _date_pattern(prefix: str) -> str:
+    return (
+        rf'(?:(?P<{prefix}_year>\d{{4}})\s*[/.\-年]\s*)?'
+        rf'(?P<{prefix}_month>\d{{1,2}})\s*[/.\-月]\s*(?P<{prefix}_day>\d{{1,2}})日?'
+    )
+
+
+PERIOD_PATTERN = re.compile(
+    r'入院期間\s*[:：]?\s*' + _date_pattern('start') + r'\s*(?:[～~〜\-－ー]|から)\s*' + _date_pattern('end')
+)
+ADMISSION_DATE_PATTERN = re.compile(r'(?:入院日|入院年月日)\s*[:：]?\s*' + _date_pattern('start'))
+DISCHARGE_DATE_PATTERN = re.compile(r'(?:退院日|退院年月日|退院予定日)\s*[:：]?\s*' + _date_pattern('end'))
+
+
+def _date_parts(match: re.Match, prefix: str) -> List[Optional[int]]:
+    year = match.group(f'{prefix}_year')
+    return [int(year) if year else None, int(match.group(f'{prefix}_month')), int(match.group(f'{prefix}_day'))]
+
+
+def _resolve_period(start: List[Optional[int]], end: List[Optional[int]]) -> Optional[str]:
+    # 年の記載がない側は、もう一方の年から補う（年をまたぐ入院も考慮する）
+    if start[0] is None and end[0] is None:
+        return None
+    if start[0] is None:
+        start[0] = end[0] - 1 if (start[1], start[2]) > (end[1], end[2]) else end[0]
+    if end[0] is None:
+        end[0] = start[0] + 1 if (end[1], end[2]) < (start[1], start[2]) else start[0]
+
+    try:
+        admission = datetime.date(*start)
+        discharge = datetime.date(*end)
+    except ValueError:
+        return None
+
+    if discharge < admission:
+        return None
+
+    days = (discharge - admission).days + 1
+    return (f"{admission.year}年{admission.month}月{admission.day}日～"
+            f"{discharge.year}年{discharge.month}月{discharge.day}日（{days}日間）")
+
+
+def extract_admission_period(medical_text: str, additional_info: str = "") -> Optional[str]:
+    # 追加情報の記載をカルテより優先し、退院日は最後に記載されたものを採用する
+    for text in (additional_info or "", medical_text or ""):
+        period = PERIOD_PATTERN.search(text)
+        if period:
+            return _resolve_period(_date_parts(period, 'start'), _date_parts(period, 'end'))
+
+    admission = None
+    discharge = None
+    for text in (additional_info or "", medical_text or ""):
+        admission = admission or ADMISSION_DATE_PATTERN.search(text)
+        if discharge is None:
+            matches = list(DISCHARGE_DATE_PATTERN.finditer(text))
+            discharge = matches[-1] if matches else None
+
+    if admission is None or discharge is None:
+        return None
+
+    return _resolve_period(_date_parts(admission, 'start'), _date_parts(discharge, 'end'))
+
+
+RULE_BASED_EXTRACTORS: Dict[str, Callable[[str, str], Optional[str]]] = {
+    "入院期間": extract_admission_period,
+}
+
+
+def extract_rule_based_sections(medical_text: str, additional_info: str = "") -> Dict[str, str]:
+    sections = {}
+    for section in RULE_BASED_SECTION_NAMES:
+        extractor = RULE_BASED_EXTRACTORS.get(section)
+        content = extractor(medical_text, additional_info) if extractor else None
+        if content:
+            sections[section] = content
+    return sections
@@ -0,0 +1,66 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from utils.config import STRUCTURED_OUTPUT
+from utils.constants import DEFAULT_SECTION_NAMES, STRUCTURED_OUTPUT_DOCUMENT_TYPES
+
+SUMMARY_TOOL_NAME = "record_discharge_summary"
+SUMMARY_TOOL_DESCRIPTION = "作成した退院時サマリを項目ごとに記録します。該当する記載がない項目は空文字にしてください。"
+
+
+def is_structured_output_enabled(document_type: str) -> bool:
+    return STRUCTURED_OUTPUT and document_type in STRUCTURED_OUTPUT_DOCUMENT_TYPES
+
+
+def build_summary_schema(section_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    section_names = section_names or DEFAULT_SECTION_NAMES
+    return {
+        "type": "object",
+        "properties": {name: {"type": "string", "description": f"{name}の記載内容"} for name in section_names},
+        "required": list(section_names),
+    }
+
+
+def build_claude_summary_tool() -> Dict[str, Any]:
+    return {
+        "name": SUMMARY_TOOL_NAME,
+        "description": SUMMARY_TOOL_DESCRIPTION,
+        "input_schema": build_summary_schema(),
+    }
+
+
+def _strip_code_fence(text: str) -> str:
+    if not text.startswith("```"):
+        return text
+    first_newline = text.find("\n")
+    closing = text.rfind("```")
+    if first_newline == -1 or closing <= first_newline:
+        return text
+    return text[first_newline + 1:closing].strip()
+
+
+def parse_structured_summary(summary_text: str) -> Optional[Dict[str, str]]:
+    text = (summary_text or "").strip()
+    if not text.startswith(("{", "```")):
+        return None
+
+    try:
+        data = json.loads(_strip_code_fence(text))
+    except ValueError:
+        return None
+
+    if not isinstance(data, dict):
+        return None
+
+    sections = {}
+    for name in DEFAULT_SECTION_NAMES:
+        value = data.get(name)
+        if not isinstance(value, str):
+            return None
+        sections[name] = value.replace('*', '').replace('＊', '').strip()
+
+    return sections
+
+
+def render_structured_summary(sections: Dict[str, str]) -> str:
+    return "\n\n".join(f"【{name}】\n{sections.get(name, '')}".rstrip() for name in DEFAULT_SECTION_NAMES)
@@ -1,4 +1,8 @@
-from utils.constants import DEFAULT_SECTION_NAMES
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from utils.constants import CONTINUATION_MIN_OVERLAP, DEFAULT_SECTION_NAMES, OUTPUT_EPILOGUE_PATTERN
 
 section_aliases = {
     "治療内容": "治療経過",
@@ -11,50 +15,229 @@ section_aliases = {
     "メモ": "備考",
 }
 
+MAX_INLINE_CONTENT_LENGTH = 100
+HEADER_SEPARATORS = ":："
+EPILOGUE_LINE = re.compile(OUTPUT_EPILOGUE_PATTERN)
+
+
+class SectionMatcher:
+
+    def __init__(self, section_names: Tuple[str, ...], aliases: Tuple[Tuple[str, str], ...]):
+        self.section_names = section_names
+        self.targets: Dict[str, str] = {name: name for name in section_names}
+        self.alias_names = set()
+
+        for alias, target in aliases:
+            # 表示対象外のセクションへのエイリアスは後続行を取り込んでしまうため無視する
+            if target in self.targets and alias not in self.targets:
+                self.targets[alias] = target
+                self.alias_names.add(alias)
+
+        names = sorted(self.targets, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'^(?:#{1,6}\s*)?(?P<open>[【\[［])?(?P<name>' + "|".join(map(re.escape, names)) +
+            r')(?(open)[】\]］])(?P<rest>.*)$'
+        ) if names else None
+
+    def match(self, line: str) -> Optional[Tuple[str, str]]:
+        if self.pattern is None:
+            return None
+
+        matched = self.pattern.match(line)
+        if not matched:
+            return None
+
+        name = matched.group('name')
+        rest = matched.group('rest')
+        bracketed = matched.group('open') is not None
+
+        if name in self.alias_names:
+            if rest and not bracketed and rest[0] not in HEADER_SEPARATORS and not rest[0].isspace():
+                return None
+        elif len(rest.strip()) >= MAX_INLINE_CONTENT_LENGTH:
+            return None
+
+        content = rest.strip().lstrip(HEADER_SEPARATORS).strip()
+        return self.targets[name], content
+
+
+@lru_cache(maxsize=8)
+def _compile_matcher(section_names: Tuple[str, ...],
+                     aliases: Tuple[Tuple[str, str], ...]) -> SectionMatcher:
+    return SectionMatcher(section_names, aliases)
+
+
+def get_section_matcher() -> SectionMatcher:
+    return _compile_matcher(tuple(DEFAULT_SECTION_NAMES), tuple(section_aliases.items()))
+
+
+def strip_epilogue(summary_text: str) -> str:
+    # 末尾の締めくくりの文と区切り線のみを取り除き、本文中の「以上、」は残す
+    lines = summary_text.rstrip().split('\n')
+    end = len(lines)
+    while end > 0 and (not lines[end - 1].strip() or EPILOGUE_LINE.match(lines[end - 1].strip())):
+        end -= 1
+    if end == len(lines):
+        return summary_text
+    return '\n'.join(lines[:end])
+
 
 def format_output_summary(summary_text):
     processed_text = (
         summary_text.replace('*', '')
         .replace('＊', '')
     )
-    return processed_text
+    return strip_epilogue(processed_text)
 
 
 def parse_output_summary(summary_text):
-    sections = {section: "" for section in DEFAULT_SECTION_NAMES}
-    lines = summary_text.split('\n')
-    current_section = None
+    matcher = get_section_matcher()
+    section_lines: Dict[str, List[str]] = {section: [] for section in matcher.section_names}
+    current_lines: Optional[List[str]] = None
 
-    for line in lines:
+    for line in summary_text.split('\n'):
         line = line.strip()
         if not line:
             continue
 
-        found_section = False
-
-        for section in DEFAULT_SECTION_NAMES:
-            if line == section or (line.startswith(section) and len(line.replace(section, "").strip()) < 100):
-                current_section = section
-                content = line.replace(section, "").replace(":", "").replace("：", "").strip()
-                if content:
-                    sections[current_section] = content
-                found_section = True
-                break
-
-        if not found_section:
-            for alias, target_section in section_aliases.items():
-                if line.startswith(alias) or line == alias:
-                    current_section = target_section
-                    content = line.replace(alias, "").replace(":", "").replace("：", "").strip()
-                    if content:
-                        sections[current_section] = content
-                    found_section = True
-                    break
-
-        if current_section and line and not found_section:
-            if sections[current_section]:
-                sections[current_section] += "\n" + line
-            else:
-                sections[current_section] = line
-
-    return sections
+        header = matcher.match(line)
+        if header:
+            section, content = header
+            current_lines = section_lines[section]
+            if content:
+                current_lines.append(content)
+        elif current_lines is not None:
+            current_lines.append(line)
+
+    return {section: "\n".join(lines) for section, lines in section_lines.items()}
+
+
+def get_first_section(summary_text: str) -> Optional[str]:
+    matcher = get_section_matcher()
+    for line in summary_text.split('\n'):
+        if line.strip():
+            header = matcher.match(line.strip())
+            return header[0] if header else None
+    return None
+
+
+def extract_section_content(section_text: str, section: str) -> str:
+    # 見出し付きで出力された場合は該当項目の本文のみを取り出す
+    formatted = format_output_summary(section_text)
+    content = parse_output_summary(formatted).get(section, "")
+    # 見出しのみで本文がない場合は空欄として扱う
+    if content or get_first_section(formatted) is not None:
+        return content
+    return formatted.strip()
+
+
+def merge_continuation(partial_text: str, continuation: str) -> str:
+    # 続きの冒頭で直前の出力末尾を繰り返している場合は重複部分を除いて連結する
+    max_overlap = min(len(partial_text), len(continuation))
+    for length in range(max_overlap, CONTINUATION_MIN_OVERLAP - 1, -1):
+        if partial_text.endswith(continuation[:length]):
+            return partial_text + continuation[length:]
+    return partial_text + continuation
+
+
+def splice_section(summary_text: str, section: str, content: str) -> str:
+    matcher = get_section_matcher()
+    lines = summary_text.split('\n')
+    headers = []
+    for index, line in enumerate(lines):
+        header = matcher.match(line.strip())
+        if header:
+            headers.append((index, header[0]))
+
+    block = [f"【{section}】"] + (content.split('\n') if content else [])
+    spans = [
+        (start, headers[i + 1][0] if i + 1 < len(headers) else len(lines))
+        for i, (start, name) in enumerate(headers) if name == section
+    ]
+
+    if spans:
+        for start, end in reversed(spans[1:]):
+            del lines[start:end]
+        start, end = spans[0]
+        # 次の見出しとの間の空行は残す
+        while end > start + 1 and not lines[end - 1].strip():
+            end -= 1
+        lines[start:end] = block
+        return '\n'.join(lines)
+
+    # 未出力のセクションは、表示順で後ろにあるセクションの直前に挿入する
+    order = {name: i for i, name in enumerate(matcher.section_names)}
+    position = order.get(section, len(order))
+    following = next((index for index, name in headers if order[name] > position), None)
+    if following is None:
+        text = summary_text.rstrip('\n')
+        return (text + "\n\n" if text else "") + '\n'.join(block)
+
+    lines[following:following] = block + [""]
+    return '\n'.join(lines)
+
+
+class StreamingSectionParser:
+
+    def __init__(self):
+        self._matcher = get_section_matcher()
+        self._section_lines: Dict[str, List[str]] = {section: [] for section in self._matcher.section_names}
+        self._current_section: Optional[str] = None
+        self._pending: List[str] = []
+
+    @property
+    def current_section(self) -> Optional[str]:
+        return self._current_section
+
+    @property
+    def pending_text(self) -> str:
+        return "".join(self._pending)
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        # 改行は新しく届いた差分の中だけを探索し、既に受信済みのテキストは再走査しない
+        newline_index = delta.rfind('\n')
+        if newline_index == -1:
+            if delta:
+                self._pending.append(delta)
+            return []
+
+        self._pending.append(delta[:newline_index])
+        completed = "".join(self._pending)
+        rest = delta[newline_index + 1:]
+        self._pending = [rest] if rest else []
+
+        updates = []
+        for line in completed.split('\n'):
+            update = self._consume_line(line)
+            if update:
+                updates.append(update)
+        return updates
+
+    def close(self) -> List[Tuple[str, str]]:
+        remaining = "".join(self._pending)
+        self._pending = []
+        update = self._consume_line(remaining)
+        return [update] if update else []
+
+    def get_section(self, section: str) -> str:
+        return "\n".join(self._section_lines.get(section, []))
+
+    def get_sections(self) -> Dict[str, str]:
+        return {section: "\n".join(lines) for section, lines in self._section_lines.items()}
+
+    def _consume_line(self, line: str) -> Optional[Tuple[str, str]]:
+        line = line.strip()
+        if not line:
+            return None
+
+        header = self._matcher.match(line)
+        if header:
+            self._current_section, content = header
+            if not content:
+                return None
+            line = content
+        elif self._current_section is None:
+            return None
+
+        self._section_lines[self._current_section].append(line)
+        return self._current_section, line
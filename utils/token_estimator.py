@@ -0,0 +1,10 @@
+ASCII_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    # 日本語はおおむね1文字1トークン、英数字は約4文字で1トークンとして概算する
+    if not text:
+        return 0
+
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return (len(text) - ascii_chars) + -(-ascii_chars // ASCII_CHARS_PER_TOKEN)
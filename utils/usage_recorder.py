@@ -0,0 +1,201 @@
+import atexit
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import exc
+
+from database.db import get_usage_statistics_repository
+from database.repositories import UsageStatisticsRepository
+from utils.config import USAGE_BATCH_SIZE, USAGE_FLUSH_INTERVAL, USAGE_SPOOL_PATH
+
+DATETIME_FIELDS = ("date",)
+
+# 行の内容が原因で、再送しても保存できないエラー
+PERMANENT_ERRORS = (exc.DataError, exc.IntegrityError)
+
+
+def _serialize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value.isoformat() if isinstance(value, datetime.datetime) else value
+            for key, value in row.items()}
+
+
+def _deserialize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(row)
+    for field in DATETIME_FIELDS:
+        if isinstance(row.get(field), str):
+            row[field] = datetime.datetime.fromisoformat(row[field])
+    return row
+
+
+def _is_permanent_error(error: BaseException) -> bool:
+    # リポジトリは DatabaseError に包んで送出するため、元の例外まで遡って判定する
+    while error is not None:
+        if isinstance(error, PERMANENT_ERRORS):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _write_rows(f, rows: List[Dict[str, Any]]) -> None:
+    for row in rows:
+        f.write(json.dumps(_serialize_row(row), ensure_ascii=False) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class UsageRecorder:
+
+    def __init__(self,
+                 repository_factory: Callable[[], UsageStatisticsRepository] = get_usage_statistics_repository,
+                 spool_path: str = USAGE_SPOOL_PATH,
+                 batch_size: int = USAGE_BATCH_SIZE,
+                 flush_interval: float = USAGE_FLUSH_INTERVAL,
+                 quarantine_path: Optional[str] = None):
+        self.repository_factory = repository_factory
+        self.spool_path = spool_path
+        self.quarantine_path = quarantine_path or f"{spool_path}.rejected"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._in_flight: List[Dict[str, Any]] = []
+
+    def record(self, usage_data: Dict[str, Any]) -> None:
+        self._queue.put(dict(usage_data))
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="usage-recorder", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        self.replay_spool()
+        while True:
+            self.flush(self._next_batch())
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        # 最初の1件を受け取ってから、件数または経過時間のいずれかに達するまでまとめる
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self, batch: List[Dict[str, Any]]) -> bool:
+        if not batch:
+            return True
+
+        self._in_flight = batch
+        try:
+            self.repository_factory().bulk_save_usage(batch)
+        except Exception as e:
+            print(f"使用統計の保存に失敗したため、ローカルファイルに退避します: {str(e)}")
+            self.spool(batch)
+            return False
+        finally:
+            self._in_flight = []
+
+        self.replay_spool()
+        return True
+
+    def spool(self, rows: List[Dict[str, Any]]) -> None:
+        with self._spool_lock:
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                _write_rows(f, rows)
+
+    def replay_spool(self) -> int:
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                return 0
+
+            rows = []
+            with open(self.spool_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        rows.append(_deserialize_row(json.loads(line)))
+                    except (json.JSONDecodeError, ValueError) as e:
+                        # 書き込み途中で停止した行は読み飛ばす
+                        print(f"退避した使用統計の読み込みに失敗しました: {str(e)}")
+
+            repository = self.repository_factory()
+            try:
+                repository.bulk_save_usage(rows)
+                remaining, rejected = [], []
+            except Exception as e:
+                # 保存できない行が1行でもあると全体が失敗し続けるため、1行ずつ保存し直して原因の行を切り分ける
+                print(f"退避した使用統計の一括再送に失敗したため、1行ずつ再送します: {str(e)}")
+                remaining, rejected = self._replay_rows(repository, rows)
+
+            if rejected:
+                with open(self.quarantine_path, "a", encoding="utf-8") as f:
+                    _write_rows(f, rejected)
+
+            # request_idで重複を除外するため、再送後に削除できずに再度送っても二重には記録されない
+            if remaining:
+                self._rewrite_spool(remaining)
+            else:
+                os.remove(self.spool_path)
+            return len(rows) - len(remaining) - len(rejected)
+
+    def _replay_rows(self, repository: UsageStatisticsRepository,
+                     rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        rejected = []
+        for index, row in enumerate(rows):
+            try:
+                repository.bulk_save_usage([row])
+            except Exception as e:
+                if not _is_permanent_error(e):
+                    # 接続障害などは残りの行も失敗するため、未送信の行をまとめて次回に回す
+                    print(f"退避した使用統計の再送に失敗しました: {str(e)}")
+                    return rows[index:], rejected
+                print(f"保存できない使用統計を {self.quarantine_path} に移動します: {str(e)}")
+                rejected.append(row)
+        return [], rejected
+
+    def _rewrite_spool(self, rows: List[Dict[str, Any]]) -> None:
+        temp_path = f"{self.spool_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            _write_rows(f, rows)
+        os.replace(temp_path, self.spool_path)
+
+    def drain(self) -> None:
+        pending = list(self._in_flight)
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        if pending:
+            self.flush(pending)
+
+
+_usage_recorder = None
+_usage_recorder_lock = threading.Lock()
+
+
+def get_usage_recorder() -> UsageRecorder:
+    global _usage_recorder
+    with _usage_recorder_lock:
+        if _usage_recorder is None:
+            _usage_recorder = UsageRecorder()
+            # 終了時に未送信の使用統計を保存し、保存できなければローカルファイルに退避する
+            atexit.register(_usage_recorder.drain)
+    return _usage_recorder
@@ -13,6 +13,8 @@ def clear_inputs():
     st.session_state.output_summary = ""
     st.session_state.parsed_summary = {}
     st.session_state.summary_generation_time = None
+    st.session_state.input_reduction = None
+    st.session_state.dropped_entries = []
     st.session_state.clear_input = True
     st.session_state.selected_document_type = DOCUMENT_TYPES[0]
 
@@ -28,19 +30,22 @@ def render_input_section():
     current_prescription = st.text_area(
         "退院時処方(現在の処方)",
         height=70,
-        key="current_prescription"
+        key="current_prescription",
+        on_change=SummaryService.start_background_preparation
     )
 
     input_text = st.text_area(
         "カルテ記載",
         height=70,
-        key="input_text"
+        key="input_text",
+        on_change=SummaryService.start_background_preparation
     )
 
     additional_info = st.text_area(
         "追加情報",
         height=70,
-        key="additional_info"
+        key="additional_info",
+        on_change=SummaryService.start_background_preparation
     )
 
     col1, col2 = st.columns(2)
@@ -79,6 +84,10 @@ def render_summary_results():
                     st.code(section_content,
                             language=None,
                             height=150)
+                    if st.button("この項目を再作成", key=f"regenerate_section_{section}"):
+                        SummaryService.process_section_regeneration(section)
+
+        render_refinement_input()
 
         st.info(MESSAGES["COPY_INSTRUCTION"])
 
@@ -86,6 +95,36 @@ def render_summary_results():
             processing_time = st.session_state.summary_generation_time
             st.info(MESSAGES["PROCESSING_TIME"].format(processing_time=processing_time))
 
+        input_reduction = st.session_state.get("input_reduction")
+        if input_reduction and input_reduction["chars_saved"] > 0:
+            st.info(MESSAGES["INPUT_REDUCED"].format(**input_reduction))
+
+        render_dropped_entries()
+
+
+def render_refinement_input():
+    with st.form("refinement_form", clear_on_submit=True):
+        instruction = st.text_input(
+            "修正指示",
+            placeholder="例: もっと簡潔に / 抗菌薬の投与経過を追記して",
+            key="refinement_instruction"
+        )
+        if st.form_submit_button("修正"):
+            SummaryService.process_refinement(instruction)
+
+
+def render_dropped_entries():
+    dropped_entries = st.session_state.get("dropped_entries") or []
+    if not dropped_entries:
+        return
+
+    dropped_tokens = sum(entry["tokens"] for entry in dropped_entries)
+    st.warning(MESSAGES["CONTEXT_TRIMMED"].format(count=len(dropped_entries), tokens=dropped_tokens))
+
+    with st.expander(f"除外した記載（{len(dropped_entries)}件）"):
+        for entry in dropped_entries:
+            st.markdown(f"- **{entry['date'] or '日付なし'}** {entry['preview']}（約{entry['tokens']:,}トークン）")
+
 
 @handle_error
 def main_page_app():
@@ -1,8 +1,10 @@
 import streamlit as st
 
-from utils.constants import DEPARTMENT_DOCTORS_MAPPING, DOCUMENT_TYPES, DEFAULT_DOCUMENT_TYPE
+from database.read_routing import primary_reads_deadline
+from utils.constants import DEPARTMENT_DOCTORS_MAPPING, DOCUMENT_TYPES, DEFAULT_DOCUMENT_TYPE, GENERATION_PROFILES
 from utils.error_handlers import handle_error
 from utils.exceptions import AppError
+from utils.generation_profiles import get_profile_label, resolve_generation_profile
 from utils.prompt_manager import get_prompt_manager
 from utils.config import get_config
 from ui_components.navigation import change_page
@@ -171,6 +173,20 @@ def render_selectors():
     return selected_dept, selected_doc_type, selected_doctor, prompt_data, prompt_model
 
 
+def render_generation_profile_selector(prompt_data, selected_doc_type, key_suffix):
+    profiles = list(GENERATION_PROFILES.keys())
+    prompt_profile = prompt_data.get("generation_profile") if prompt_data else None
+    current_profile = resolve_generation_profile(selected_doc_type, prompt_profile)
+
+    return st.selectbox(
+        "生成プロファイル",
+        profiles,
+        index=profiles.index(current_profile),
+        format_func=get_profile_label,
+        key=f"prompt_profile_{key_suffix}"
+    )
+
+
 def get_prompt_content(prompt_data):
     if prompt_data:
         return prompt_data.get("content", "")
@@ -180,7 +196,7 @@ def get_prompt_content(prompt_data):
 
 
 def handle_prompt_save(selected_dept, selected_doc_type, selected_doctor,
-                       prompt_content, prompt_model):
+                       prompt_content, prompt_model, generation_profile=None):
     if prompt_model:
         st.session_state.document_model_mapping[selected_doc_type] = prompt_model
 
@@ -190,11 +206,13 @@ def handle_prompt_save(selected_dept, selected_doc_type, selected_doctor,
         selected_doc_type,
         selected_doctor,
         prompt_content,
-        prompt_model
+        prompt_model,
+        generation_profile
     )
 
     if success:
         st.session_state.success_message = message
+        st.session_state.primary_reads_until = primary_reads_deadline()
         st.rerun()
     else:
         raise AppError(message)
@@ -212,12 +230,16 @@ def render_prompt_form(selected_dept, selected_doc_type, selected_doctor,
             key=f"prompt_content_{selected_dept}_{selected_doc_type}_{selected_doctor}"
         )
 
+        generation_profile = render_generation_profile_selector(
+            prompt_data, selected_doc_type, f"{selected_dept}_{selected_doc_type}_{selected_doctor}"
+        )
+
         submit = st.form_submit_button("保存")
 
         if submit:
             handle_prompt_save(
                 selected_dept, selected_doc_type, selected_doctor,
-                prompt_content, prompt_model
+                prompt_content, prompt_model, generation_profile
             )
 
 
@@ -226,6 +248,7 @@ def handle_prompt_deletion(selected_dept, selected_doc_type, selected_doctor):
     success, message = prompt_manager.delete_prompt(selected_dept, selected_doc_type, selected_doctor)
     if success:
         st.session_state.success_message = message
+        st.session_state.primary_reads_until = primary_reads_deadline()
         st.session_state.selected_dept_for_prompt = "default"
         st.session_state.selected_doc_type_for_prompt = DEFAULT_DOCUMENT_TYPE
         st.session_state.selected_doctor_for_prompt = "default"
@@ -4,20 +4,15 @@ import pytz
 import pandas as pd
 import streamlit as st
 
-from database.db import get_usage_statistics_repository
+from database.db import get_pool_metrics, get_usage_statistics_repository
 from database.repositories import UsageStatisticsRepository
 from utils.constants import DOCUMENT_NAME_OPTIONS, MESSAGES, MODEL_OPTIONS
 from utils.error_handlers import handle_error
+from utils.model_family import classify_model_family
 from ui_components.navigation import change_page
 
 JST = pytz.timezone('Asia/Tokyo')
 
-MODEL_MAPPING = {
-    "Gemini_Pro": {"pattern": "gemini", "exclude": "flash"},
-    "Gemini_Flash": {"pattern": "flash", "exclude": None},
-    "Claude": {"pattern": "claude", "exclude": None},
-}
-
 
 @handle_error
 def usage_statistics_ui():
@@ -50,6 +45,9 @@ def usage_statistics_ui():
     model_filter = selected_model if selected_model != "すべて" else None
     document_type_filter = selected_document_type if selected_document_type != "すべて" else None
 
+    with st.expander("データベース接続プール"):
+        st.json(get_pool_metrics())
+
     try:
         total_summary = usage_repo.get_usage_summary(
             start_datetime, end_datetime, model_filter, document_type_filter
@@ -89,18 +87,7 @@ def usage_statistics_ui():
 
         detail_data = []
         for record in usage_records:
-            model_detail = str(record.model_detail or "").lower()
-            model_info = "Gemini_Pro"  # デフォルト
-
-            for model_name, config in MODEL_MAPPING.items():
-                pattern = config["pattern"]
-                exclude = config["exclude"]
-
-                if pattern in model_detail:
-                    if exclude and exclude in model_detail:
-                        continue
-                    model_info = model_name
-                    break
+            model_info = record.model_family or classify_model_family(record.model_detail)
 
             if record.date.tzinfo:
                 jst_date = record.date.astimezone(JST)